@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Targeted backfill of ledger fields
+Selects ledger rows with column predicates (the confidence rule ops) or by
+stored field confidence, re-extracts only the requested fields from cached
+text - PDFs stop being read once those fields are found - and applies the
+new values as one keyed ledger transaction. After fixing one pattern,
+re-running that field over the affected rows touches nothing else
+
+  python backfill.py --field quantity --where "Ticket Quantity" missing
+  python backfill.py --field price --where "Ticket Price" eq 0 --dry-run
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from text_cache import TextCache
+from ledger_store import LedgerStore
+from batch_process import FIELD_COLUMNS, KEY_FIELDS, csv_path, locate_invoice
+from confidence_scoring import NUMERIC_OPS, rule_mask
+from extraction_result import (MEDIUM_CONFIDENCE, ExtractionResult, FieldResult, confidence_level,
+                               field_confidence)
+from extraction_engine import ExtractionStats, extract_texts, field_source
+from field_extractor import FIELDS, is_fee_invoice
+from extract_quantities import extract_quantity
+from vendor_parsers import REGISTRY
+
+WHERE_OPS = ('eq', 'ne', 'in', 'missing', 'present', 'true', 'contains') + tuple(NUMERIC_OPS)
+# Values the extractors write when they find nothing; rows without stored
+# provenance only have these replaced unless --overwrite is given
+PLACEHOLDERS = (None, '', 0, 'Unknown', 'General', 'Not specified', 'Various')
+
+def _found_to_result(found, source):
+    return FieldResult(found['value'], source, found['pattern'], found['span'],
+                       field_confidence(source, found['priority']))
+
+def is_fee_row(row, text):
+    """Fee invoice by its text, its file name or the ledger's own Event/Match label"""
+    return is_fee_invoice(text, row['File Name']) or 'Convenience Fee' in str(row.get('Event/Match') or '')
+
+def extract_pattern_field(field, text, row, source):
+    """One field_extractor field with the row's vendor parser (fee rows price from their fee total)"""
+    _, found = REGISTRY.parse(text, row['File Name'], fields=(field,), fee=is_fee_row(row, text))
+    return _found_to_result(found[field], source) if field in found else None
+
+def extract_company(text, row, source):
+    vendor = REGISTRY.match(row['File Name'], text)
+    if vendor is None:
+        return None
+    return FieldResult(vendor['parser'].name, source if vendor['source'] == 'text' else 'filename',
+                       vendor['keyword'], None, field_confidence(source if vendor['source'] == 'text' else 'filename'))
+
+def extract_quantity_field(text, row, source):
+    """Vendor patterns first, then extract_quantities' fee, seat and table heuristics"""
+    found = extract_pattern_field('quantity', text, row, source)
+    if found is not None:
+        return found
+    price = row.get('Ticket Price')
+    quantity = extract_quantity(text, row['File Name'], price if isinstance(price, (int, float)) else None)
+    return FieldResult(quantity, source, 'extract_quantity', None, MEDIUM_CONFIDENCE) if quantity else None
+
+# field -> extractor(text, row, source) returning a FieldResult or None.
+# Match labels depend on the schedule and fee rules in batch_process, so
+# they are not backfilled field by field
+EXTRACTORS = {
+    'company': extract_company,
+    'invoice_date': lambda text, row, source: extract_pattern_field('invoice_date', text, row, source),
+    'price': lambda text, row, source: extract_pattern_field('price', text, row, source),
+    'stand': lambda text, row, source: extract_pattern_field('stand', text, row, source),
+    'quantity': extract_quantity_field,
+}
+
+def same_value(new, stored):
+    """Compare an extracted value with one read back from the CSV (27 == '27' == 27.0)"""
+    if stored is None:
+        return new is None
+    try:
+        return float(new) == float(stored)
+    except (TypeError, ValueError):
+        return str(new).strip() == str(stored).strip()
+
+def parse_value(raw):
+    """'0' -> 0, '1.5' -> 1.5, 'true' -> True, anything else stays a string"""
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return raw
+
+def parse_where(terms):
+    """['Ticket Quantity', 'in', 'Not specified,Various'] -> a confidence_scoring rule dict"""
+    if len(terms) < 2 or terms[1] not in WHERE_OPS:
+        raise ValueError(f"--where needs COLUMN OP [VALUE] with OP one of {', '.join(WHERE_OPS)}: {terms}")
+    column, op = terms[0], terms[1]
+    rule = {'column': column, 'op': op}
+    if op in ('missing', 'present', 'true'):
+        return rule
+    if len(terms) != 3:
+        raise ValueError(f"--where {column} {op} needs a value")
+    rule['value'] = [parse_value(item) for item in terms[2].split(',')] if op == 'in' else parse_value(terms[2])
+    return rule
+
+def select_rows(df, where=(), fields=(), below_confidence=None):
+    """
+    Boolean mask over df: every where rule matches and, with below_confidence,
+    at least one of fields has stored provenance scoring below it.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    for rule in where:
+        column = df[rule['column']] if rule['column'] in df else pd.Series([None] * len(df), index=df.index)
+        mask &= rule_mask(column, rule)
+    if below_confidence is not None:
+        provenance = df['Field Provenance'] if 'Field Provenance' in df else pd.Series([None] * len(df), index=df.index)
+        low = np.zeros(len(df), dtype=bool)
+        for position, compact in enumerate(provenance.tolist()):
+            if isinstance(compact, str) and compact:
+                result = ExtractionResult.from_compact(compact)
+                low[position] = any(field in result and result[field].confidence < below_confidence
+                                    for field in fields)
+        mask &= low
+    return mask
+
+def backfill(ledger, fields, where=(), below_confidence=None, workers=None, cache=None, dry_run=False,
+             overwrite=False):
+    """
+    Re-extract fields for the selected ledger rows and apply the changes.
+
+    Only rows whose value actually changes are updated. With overwrite
+    off, a new value must also be at least as confident as the stored one,
+    and rows without stored provenance only have placeholders replaced.
+    Returns {file name: {column: new value}}.
+    """
+    df = ledger.read()
+    rows = df[select_rows(df, where, fields, below_confidence)].to_dict('records')
+    rows = [{key: (None if not isinstance(value, (list, dict)) and pd.isna(value) else value)
+             for key, value in row.items()} for row in rows]
+    print(f"Selected {len(rows)} of {len(df)} rows for {', '.join(fields)}\n")
+
+    pending = []
+    for row in rows:
+        file_path = locate_invoice(row)
+        if not os.path.exists(file_path):
+            print(f"File not found: {row['File Name']}")
+            continue
+        pending.append((row, file_path))
+
+    # PDFs are only read until the requested fields are found
+    stats = ExtractionStats()
+    required = tuple(field for field in fields if field in FIELDS)
+    results = extract_texts([file_path for _, file_path in pending], workers=workers, stats=stats, cache=cache,
+                            required_fields=required or None)
+
+    updates = {}
+    for (row, _), extraction in zip(pending, results):
+        source = field_source(extraction['source'])
+        compact = row.get('Field Provenance')
+        stored = ExtractionResult.from_compact(compact) if isinstance(compact, str) and compact else None
+        changes = {}
+        for field in fields:
+            found = EXTRACTORS[field](extraction['text'], row, source) if extraction['text'] else None
+            column = FIELD_COLUMNS[field]
+            if found is None or same_value(found.value, row.get(column)):
+                continue
+            if stored is not None and field in stored:
+                if not overwrite and found.confidence < stored[field].confidence:
+                    continue
+                stored.fields[field] = found
+            elif not overwrite and row.get(column) not in PLACEHOLDERS:
+                continue
+            changes[column] = found.value
+        if not changes:
+            print(f"{row['File Name']}: unchanged")
+            continue
+        print(f"{row['File Name']}: " + ', '.join(f"{column} {row.get(column)!r} -> {value!r}"
+                                                  for column, value in changes.items()))
+        if stored is not None:
+            changes['Confidence Level'] = confidence_level(stored.confidence(KEY_FIELDS))
+            changes['Field Provenance'] = stored.to_compact()
+        updates[row['File Name']] = changes
+
+    print(f"\nExtraction throughput:\n{stats.report()}")
+    if cache is not None:
+        print(cache.report())
+
+    # One keyed transaction for the whole backfill
+    if updates and not dry_run:
+        ledger.update_rows(updates)
+        ledger.maybe_compact()
+    return updates
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Re-extract selected fields for selected ledger rows')
+    parser.add_argument('--field', action='append', required=True, choices=sorted(EXTRACTORS),
+                        help='field to re-extract (repeatable)')
+    parser.add_argument('--where', action='append', nargs='+', default=[], metavar='TERM',
+                        help=f"row filter COLUMN OP [VALUE], OP in {', '.join(WHERE_OPS)}; "
+                             "'in' takes comma-separated values (repeatable, all must match)")
+    parser.add_argument('--below-confidence', type=int, default=None,
+                        help='only rows where one of the fields has stored confidence below this')
+    parser.add_argument('--overwrite', action='store_true', help='apply new values even if less confident')
+    parser.add_argument('--dry-run', action='store_true', help='print the changes without writing them')
+    parser.add_argument('--csv', default=csv_path)
+    parser.add_argument('--workers', type=int, default=None, help='extraction processes (default: CPU count)')
+    parser.add_argument('--no-cache', action='store_true', help='always re-extract instead of using the text cache')
+    args = parser.parse_args(argv)
+
+    try:
+        where = [parse_where(terms) for terms in args.where]
+    except ValueError as e:
+        parser.error(str(e))
+    fields = tuple(dict.fromkeys(args.field))
+    updates = backfill(LedgerStore(args.csv), fields, where, args.below_confidence, workers=args.workers,
+                       cache=None if args.no_cache else TextCache(), dry_run=args.dry_run, overwrite=args.overwrite)
+    if not updates:
+        print("\nNothing to update")
+    elif args.dry_run:
+        print(f"\nDry run: {len(updates)} rows would be updated")
+    else:
+        print(f"\nLedger updated for {len(updates)} rows")
+
+if __name__ == "__main__":
+    main()
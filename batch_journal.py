@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Write-ahead journal for batch runs
+Each extracted file's ledger row is journalled as soon as it is ready, and
+files are committed in checkpoints: the checkpoint intent is journalled,
+its rows go to the ledger as one tagged transaction, the files are moved to
+processed/, and a done marker closes it. A restarted run finishes any open
+checkpoint and reuses journalled rows instead of extracting those files again;
+files whose move failed stay journalled as committed until they are filed
+"""
+
+import json
+import os
+import uuid
+
+from invoice_manifest import DEFAULT_MANIFEST_DIR
+
+DEFAULT_CHECKPOINT_EVERY = 50
+
+def default_journal_path(name):
+    """Return the journal location for a script, e.g. 'batch_process'"""
+    return os.path.join(DEFAULT_MANIFEST_DIR, f"{name}_journal.jsonl")
+
+class BatchJournal:
+    """
+    Journal of extracted-but-unfiled invoices and open checkpoints.
+
+    Records are fsync'd JSON lines:
+      {'op': 'extracted', 'path', 'row'}   row ready, nothing committed
+      {'op': 'checkpoint', 'tag', 'paths'} about to commit these rows
+      {'op': 'done', 'tag', 'unmoved'?}    rows in the ledger, files moved but unmoved
+      {'op': 'moved', 'path'}              an unmoved file filed (or gone) after all
+      {'op': 'dropped', 'path'}            file vanished before it was committed
+    A torn last line (crash mid-append) is truncated on open, as in
+    LedgerStore. The journal is removed once nothing is outstanding.
+
+    move(path) files one invoice away (e.g. into processed/); it is only
+    called for paths that still exist, so replaying a checkpoint is safe.
+    A file whose move fails is already in the ledger: it is kept in unmoved
+    (callers must not ingest it again) and retried by retry_moves.
+    """
+
+    def __init__(self, journal_path, ledger, move):
+        self.journal_path = journal_path
+        self.ledger = ledger
+        self.move = move
+        # path -> row for extracted files not yet in a finished checkpoint
+        self.rows = {}
+        # tag -> paths for checkpoints without a done marker
+        self.open_checkpoints = {}
+        # committed files still waiting to be moved
+        self.unmoved = set()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.journal_path):
+            return
+        valid_end = 0
+        with open(self.journal_path, 'rb') as f:
+            offset = 0
+            for line in f:
+                offset += len(line)
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                valid_end = offset
+                if record['op'] == 'extracted':
+                    self.rows[record['path']] = record['row']
+                elif record['op'] == 'checkpoint':
+                    self.open_checkpoints[record['tag']] = record['paths']
+                elif record['op'] == 'done':
+                    for path in self.open_checkpoints.pop(record['tag'], []):
+                        self.rows.pop(path, None)
+                    self.unmoved.update(record.get('unmoved', ()))
+                elif record['op'] == 'moved':
+                    self.unmoved.discard(record['path'])
+                elif record['op'] == 'dropped':
+                    self.rows.pop(record['path'], None)
+        if valid_end != os.path.getsize(self.journal_path):
+            with open(self.journal_path, 'r+b') as f:
+                f.truncate(valid_end)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _append(self, records):
+        os.makedirs(os.path.dirname(self.journal_path) or '.', exist_ok=True)
+        lines = [json.dumps(record, ensure_ascii=False, default=str) for record in records]
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def has_work(self):
+        """Rows not yet committed; unmoved files are committed and do not count"""
+        return bool(self.rows or self.open_checkpoints)
+
+    def pending(self):
+        """{path: row} for files extracted by an earlier run but not yet checkpointed"""
+        checkpointed = {path for paths in self.open_checkpoints.values() for path in paths}
+        return {path: row for path, row in self.rows.items() if path not in checkpointed}
+
+    def record_extracted(self, path, row):
+        """Journal one file's row so a crash does not cost its extraction"""
+        self._append([{'op': 'extracted', 'path': path, 'row': row}])
+        self.rows[path] = row
+
+    def drop(self, paths):
+        """Forget journalled rows for files that are gone without being committed"""
+        paths = [path for path in paths if path in self.rows]
+        if paths:
+            self._append([{'op': 'dropped', 'path': path} for path in paths])
+            for path in paths:
+                del self.rows[path]
+
+    def checkpoint(self, paths, rows=None):
+        """
+        Commit the journalled rows for paths to the ledger, then move the files.
+
+        rows ({path: row}) journals rows that were not recorded one by one,
+        in the same append as the checkpoint. Returns paths whose move failed.
+        """
+        records = [{'op': 'extracted', 'path': path, 'row': row} for path, row in (rows or {}).items()]
+        self.rows.update(rows or {})
+        paths = [path for path in paths if path in self.rows]
+        if not paths:
+            return []
+        tag = uuid.uuid4().hex
+        self._append(records + [{'op': 'checkpoint', 'tag': tag, 'paths': paths}])
+        self.open_checkpoints[tag] = paths
+        return self._finish(tag)
+
+    def _finish(self, tag, replay=False):
+        paths = self.open_checkpoints[tag]
+        # Rows land before files move; on replay the tag tells whether they already did
+        if not (replay and self.ledger.has_tag(tag)):
+            self.ledger.append_rows([self.rows[path] for path in paths], tag=tag)
+        failed = []
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            try:
+                self.move(path)
+            except Exception as e:
+                print(f"  ✗ Error moving {os.path.basename(path)}: {e}")
+                failed.append(path)
+        done = {'op': 'done', 'tag': tag}
+        if failed:
+            done['unmoved'] = failed
+        self._append([done])
+        del self.open_checkpoints[tag]
+        for path in paths:
+            self.rows.pop(path, None)
+        self.unmoved.update(failed)
+        return failed
+
+    def retry_moves(self):
+        """Move committed files whose move failed before; returns those that still cannot be moved"""
+        moved = []
+        for path in sorted(self.unmoved):
+            if os.path.exists(path):
+                try:
+                    self.move(path)
+                except Exception as e:
+                    print(f"  ✗ Error moving {os.path.basename(path)}: {e}")
+                    continue
+            moved.append(path)
+        if moved:
+            self._append([{'op': 'moved', 'path': path} for path in moved])
+            self.unmoved.difference_update(moved)
+        return sorted(self.unmoved)
+
+    def recover(self):
+        """
+        Finish checkpoints left open by a crash and retry unmoved files;
+        returns the number of files the checkpoints covered.
+        """
+        files = 0
+        for tag in list(self.open_checkpoints):
+            files += len(self.open_checkpoints[tag])
+            self._finish(tag, replay=True)
+        self.retry_moves()
+        return files
+
+    def clear(self):
+        """Drop the journal once every journalled row is committed and every file moved"""
+        if self.has_work() or self.unmoved or not os.path.exists(self.journal_path):
+            return False
+        os.remove(self.journal_path)
+        return True
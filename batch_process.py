@@ -1,195 +1,258 @@
 import os
-import pandas as pd
+import argparse
 import shutil
-import fitz  # PyMuPDF
-from PIL import Image
-import pytesseract
-import re
-from datetime import datetime
-
-# IPL 2024 Schedule for matching
-IPL_2024_SCHEDULE = {
-    "LSG vs GT": "2024-04-07",
-    "GT vs LSG": "2024-04-07",
-    "LSG vs PBKS": "2024-03-30",
-    "PBKS vs LSG": "2024-03-30",
-    "KKR vs SRH": "2024-03-23",
-    "SRH vs KKR": "2024-03-23",
+
+from text_cache import TextCache
+from ledger_store import LedgerStore
+from batch_journal import DEFAULT_CHECKPOINT_EVERY, BatchJournal, default_journal_path
+from ipl_schedule import default_schedule
+from date_inference import infer_invoice_date
+from field_extractor import extract_fields, field_value, is_fee_invoice
+from vendor_parsers import REGISTRY, UNKNOWN
+from extraction_result import MEDIUM_CONFIDENCE, ExtractionResult, confidence_level
+from invoice_manifest import InvoiceManifest, default_manifest_path
+from extraction_engine import (EXTRACTOR_VERSION, INVOICE_EXTENSIONS, REQUIRED_FIELDS, ExtractionStats, extract_texts,
+                               field_source)
+
+# Fields whose confidence decides the row's Confidence Level; a missing
+# stand or match date does not make the invoice itself doubtful
+KEY_FIELDS = ('company', 'match', 'invoice_date', 'quantity', 'price')
+
+# Ledger column holding each field's value
+FIELD_COLUMNS = {
+    'invoice_date': 'Invoice Date',
+    'company': 'Company',
+    'match': 'Event/Match',
+    'stand': 'Stand Name',
+    'match_date': 'Match Date',
+    'quantity': 'Ticket Quantity',
+    'price': 'Ticket Price'
 }
 
-def extract_text_from_pdf(pdf_path):
-    """Extract text from PDF using PyMuPDF"""
-    try:
-        doc = fitz.open(pdf_path)
-        text = ""
-        for page in doc:
-            text += page.get_text()
-        doc.close()
-        return text
-    except:
-        return ""
-
-def extract_text_from_image(image_path):
-    """Extract text from image using OCR"""
-    try:
-        image = Image.open(image_path)
-        text = pytesseract.image_to_string(image)
-        return text
-    except:
-        return ""
-
-def extract_invoice_details(text, filename):
-    """Extract invoice details from text"""
-    details = {
-        'Invoice Date': None,
-        'Company': 'Unknown',
-        'Event/Match': 'Unknown',
-        'Stand Name': 'General',
-        'Match Date': None,
-        'Ticket Quantity': 'Not specified',
-        'Ticket Price': 0,
-        'Confidence Level': 'High'
-    }
-    
-    # Extract company
-    if 'BookMyShow' in text or 'BigTree' in text:
-        details['Company'] = 'BookMyShow'
-    elif 'Paytm' in text:
-        details['Company'] = 'Paytm Insider'
-    elif 'TicketGenie' in text:
-        details['Company'] = 'TicketGenie'
-    
+def extract_fields_with_provenance(text, filename, source='text', file_path=None):
+    """
+    Extract invoice fields as an ExtractionResult.
+
+    source is 'text' for a PDF text layer or 'ocr' for recognised images;
+    it lowers the confidence of every text match accordingly. file_path
+    lets an invoice without a printed date take its year from the folder.
+    """
+    result = ExtractionResult()
+    # Fee invoices also print the whole booking payment; their price is the fee total only
+    fee = is_fee_invoice(text, filename)
+
+    # Identify the vendor, then extract every field we need with its parser
+    vendor = REGISTRY.match(filename, text)
+    if vendor is None:
+        result.set('company', UNKNOWN, 'default')
+        fields = extract_fields(text, fields=('match', 'stand', 'invoice_date', 'quantity', 'price'), fee=fee)
+    else:
+        result.set('company', vendor['parser'].name, source if vendor['source'] == 'text' else 'filename',
+                   pattern=vendor['keyword'])
+        fields = vendor['parser'].parse(text, ('match', 'stand', 'invoice_date', 'quantity', 'price'), fee=fee)
+    result.add_matches({field: found for field, found in fields.items() if field != 'match'}, source)
+
     # Extract event/match
+    match = field_value(fields, 'match')
+
+    # No printed date: day/month from the filename, year from folder, fixtures or season calendar
+    if 'invoice_date' not in result:
+        inferred = infer_invoice_date(filename, file_path, match=match)
+        if inferred['date']:
+            result.set('invoice_date', inferred['date'], 'filename', inferred['source'],
+                       confidence=MEDIUM_CONFIDENCE if inferred['source'] == 'default' else None)
+
     if 'WINNER OF SEMI-FINAL' in text and '19 Nov 2023' in text:
-        details['Event/Match'] = 'Cricket World Cup 2023 Final'
-        details['Match Date'] = '2023-11-19'
-    elif 'Lucknow Super Giants vs Gujarat Titans' in text:
-        details['Event/Match'] = 'LSG vs GT'
-        details['Match Date'] = '2024-04-07'
-    elif 'Lucknow Super Giants vs Punjab Kings' in text:
-        details['Event/Match'] = 'LSG vs PBKS'
-        details['Match Date'] = '2024-03-30'
+        marker = text.index('WINNER OF SEMI-FINAL')
+        result.set('match', 'Cricket World Cup 2023 Final', source, 'cwc_final', (marker, marker + 20))
+        result.set('match_date', '2023-11-19', source, 'cwc_final', (marker, marker + 20))
+    elif match and fields['match']['pattern'] == 'teams':
+        # Team names resolve to codes; the schedule handles either order
+        result.add_matches({'match': fields['match']}, source)
+        match_date = default_schedule().lookup_match(match, near=result.value('invoice_date'))
+        if match_date:
+            result.set('match_date', match_date, 'schedule', 'teams')
     elif 'Cricket World Cup' in text or 'CWC' in text:
-        details['Event/Match'] = 'Cricket World Cup 2023 Match'
-    
-    # Check if it's a convenience fee invoice
-    if 'fee' in filename.lower() or 'Convenience Fee' in text:
-        if details['Event/Match'] != 'Unknown':
-            details['Event/Match'] += ' (Convenience Fee)'
+        result.set('match', 'Cricket World Cup 2023 Match', source, 'cwc', confidence=MEDIUM_CONFIDENCE)
+
+    # Check if it's a convenience fee invoice; fee invoices have no stand
+    fee_source = source if 'Convenience Fee' in text else 'filename' if 'fee' in filename.lower() else None
+    if fee_source is not None:
+        if 'match' in result:
+            result['match'].value += ' (Convenience Fee)'
         else:
-            details['Event/Match'] = 'Convenience Fee'
-        details['Stand Name'] = 'N/A'
-    
-    # Extract stand information
-    stand_match = re.search(r'(BLOCK [A-Z] BAY \d+-[A-Z]+|BKT Tires Lower Block \d+|Knights Pav Corp)', text)
-    if stand_match:
-        details['Stand Name'] = stand_match.group(0)
-    
-    # Extract invoice date
-    date_match = re.search(r'Date of issue[:\s]+([^,\n]+)', text)
-    if date_match:
-        try:
-            date_str = date_match.group(1).strip()
-            parsed_date = datetime.strptime(date_str, '%a, %d %b %Y')
-            details['Invoice Date'] = parsed_date.strftime('%Y-%m-%d')
-        except:
-            pass
-    
-    # Extract quantity
-    qty_match = re.search(r'Quantity[:\s]+(\d+)', text) or re.search(r'(\d+) tickets?', text)
-    if qty_match:
-        details['Ticket Quantity'] = qty_match.group(1)
-    
-    # Extract price
-    price_match = re.search(r'Payment Amount: ₹([0-9,]+\.?\d*)', text) or re.search(r'Amount Paid[:\s]+₹([0-9,]+\.?\d*)', text)
-    if price_match:
-        details['Ticket Price'] = float(price_match.group(1).replace(',', ''))
-    
+            result.set('match', 'Convenience Fee', fee_source, 'fee')
+        if 'stand' not in result:
+            result.set('stand', 'N/A', fee_source, 'fee')
+
+    for field, default in (('match', 'Unknown'), ('stand', 'General'), ('match_date', None),
+                           ('invoice_date', None), ('quantity', 'Not specified'), ('price', 0)):
+        if field not in result:
+            result.set(field, default, 'default')
+    return result
+
+def extract_invoice_details(text, filename, source='text', file_path=None):
+    """Extract invoice details from text"""
+    result = extract_fields_with_provenance(text, filename, source, file_path)
+    details = {FIELD_COLUMNS[field]: result.value(field) for field in FIELD_COLUMNS}
+    details['Confidence Level'] = confidence_level(result.confidence(KEY_FIELDS))
+    details['Field Provenance'] = result.to_compact()
     return details
 
-# Find next 10 unprocessed files
-base_path = '/Users/sumitjha/Dropbox/Mac/Documents/Projects/fpl-auction/Invoices'
-processed_path = '/Users/sumitjha/Dropbox/Mac/Documents/Projects/fpl-auction/Invoices/processed'
-csv_path = '/Users/sumitjha/Dropbox/Mac/Documents/Projects/fpl-auction/IPL_Event_Invoices_Complete.csv'
-
-# Read existing CSV to check processed files
-df = pd.read_csv(csv_path)
-processed_files = set(df['File Name'].tolist())
-
-# Find unprocessed files
-unprocessed_files = []
-for root, dirs, files in os.walk(base_path):
-    if 'processed' in root:
-        continue
-    for file in files:
-        if file.lower().endswith(('.pdf', '.png', '.jpg', '.jpeg')):
-            if file not in processed_files:
-                unprocessed_files.append((os.path.join(root, file), file))
-                if len(unprocessed_files) >= 10:
-                    break
-    if len(unprocessed_files) >= 10:
-        break
-
-print(f"Processing {len(unprocessed_files)} files...\n")
-
-# Process each file
-new_rows = []
-for file_path, filename in unprocessed_files:
-    print(f"Processing: {filename}")
-    
-    # Extract text based on file type
-    if filename.lower().endswith('.pdf'):
-        text = extract_text_from_pdf(file_path)
-    else:
-        text = extract_text_from_image(file_path)
-    
-    if text:
-        details = extract_invoice_details(text, filename)
-        
-        # Determine month from path
-        month = 'Unknown'
-        if 'Mar_24' in file_path:
-            month = 'March'
-        elif 'Apr_24' in file_path:
-            month = 'April'
-        elif 'May_24' in file_path:
-            month = 'May'
-        elif 'Jun_24' in file_path:
-            month = 'June'
-        
-        # Create row
-        new_row = {
-            'File Name': filename,
-            'Month': month,
-            'Invoice Date': details['Invoice Date'],
-            'Company': details['Company'],
-            'Event/Match': details['Event/Match'],
-            'Stand Name': details['Stand Name'],
-            'Match Date': details['Match Date'],
-            'Ticket Quantity': details['Ticket Quantity'],
-            'Ticket Price': details['Ticket Price'],
-            'Confidence Level': details['Confidence Level'],
-            'File Path': file_path.replace('/Users/sumitjha/Dropbox/Mac/Documents/Projects/fpl-auction', '')
-        }
-        new_rows.append(new_row)
-        
-        # Move file to processed folder
-        dest = os.path.join(processed_path, filename)
-        try:
-            shutil.move(file_path, dest)
-            print(f"  ✓ Extracted and moved to processed")
-        except Exception as e:
-            print(f"  ✗ Error moving file: {e}")
-    else:
-        print(f"  ✗ Could not extract text")
-
-# Add new rows to dataframe
-if new_rows:
-    new_df = pd.DataFrame(new_rows)
-    df = pd.concat([df, new_df], ignore_index=True)
-    
-    # Save updated CSV
-    df.to_csv(csv_path, index=False)
-    print(f"\nAdded {len(new_rows)} invoices to CSV")
-
-print(f"Total invoices in CSV: {len(df)}")
\ No newline at end of file
+PROJECT_ROOT = '/Users/sumitjha/Dropbox/Mac/Documents/Projects/fpl-auction'
+base_path = PROJECT_ROOT + '/Invoices'
+processed_path = PROJECT_ROOT + '/Invoices/processed'
+csv_path = PROJECT_ROOT + '/IPL_Event_Invoices_Complete.csv'
+
+def find_unprocessed_files(manifest, processed_files, batch_size, journalled=()):
+    """Return up to batch_size new or changed files outside processed/, in walk order"""
+    unprocessed_files = []
+    for file_path in manifest.scan(INVOICE_EXTENSIONS, skip_dir=lambda name: name == 'processed'):
+        if file_path in journalled:
+            # Extracted by an interrupted run (committed from the journal instead),
+            # or committed already with its move still pending
+            continue
+        file = os.path.basename(file_path)
+        if file in processed_files:
+            # Already in the ledger from before the manifest existed
+            manifest.record(file_path, row_id=file)
+            continue
+        unprocessed_files.append((file_path, file))
+        if batch_size and len(unprocessed_files) >= batch_size:
+            break
+    return unprocessed_files
+
+def get_month_from_path(file_path):
+    """Determine month from path"""
+    if 'Mar_24' in file_path:
+        return 'March'
+    elif 'Apr_24' in file_path:
+        return 'April'
+    elif 'May_24' in file_path:
+        return 'May'
+    elif 'Jun_24' in file_path:
+        return 'June'
+    return 'Unknown'
+
+def build_row(file_path, filename, text, extraction_source=None):
+    """Ledger row for one invoice from its extracted text (extraction_source as in extract_document)"""
+    details = extract_invoice_details(text, filename, field_source(extraction_source), file_path)
+    return {
+        'File Name': filename,
+        'Month': get_month_from_path(file_path),
+        'Invoice Date': details['Invoice Date'],
+        'Company': details['Company'],
+        'Event/Match': details['Event/Match'],
+        'Stand Name': details['Stand Name'],
+        'Match Date': details['Match Date'],
+        'Ticket Quantity': details['Ticket Quantity'],
+        'Ticket Price': details['Ticket Price'],
+        'Confidence Level': details['Confidence Level'],
+        'File Path': file_path.replace(PROJECT_ROOT, ''),
+        'Field Provenance': details['Field Provenance']
+    }
+
+def locate_invoice(row):
+    """Where a ledger row's invoice is now: its recorded path, or processed/ once it was filed"""
+    recorded = PROJECT_ROOT + str(row.get('File Path') or '')
+    return recorded if os.path.isfile(recorded) else os.path.join(processed_path, row['File Name'])
+
+def move_to_processed(file_path, filename, manifest):
+    """Move an extracted invoice into processed/ and drop it from the manifest"""
+    shutil.move(file_path, os.path.join(processed_path, filename))
+    manifest.forget(file_path)
+
+def open_journal(ledger, manifest):
+    """Batch journal whose checkpoints move committed files into processed/"""
+    return BatchJournal(default_journal_path('batch_process'), ledger,
+                        move=lambda file_path: move_to_processed(file_path, os.path.basename(file_path), manifest))
+
+def commit_checkpoint(journal, file_paths):
+    """Commit journalled rows for file_paths and move the files; returns how many rows were added"""
+    failed = journal.checkpoint(file_paths)
+    print(f"  ✓ Checkpoint: {len(file_paths)} invoices added to ledger, "
+          f"{len(file_paths) - len(failed)} moved to processed"
+          + (f" ({len(failed)} left in place until a later run moves them)" if failed else ""))
+    return len(file_paths)
+
+def main():
+    parser = argparse.ArgumentParser(description='Extract and file the next batch of unprocessed invoices')
+    parser.add_argument('--batch-size', type=int, default=1000, help='maximum files per run (0 = all)')
+    parser.add_argument('--checkpoint-every', type=int, default=DEFAULT_CHECKPOINT_EVERY,
+                        help='files committed to the ledger and moved per checkpoint')
+    parser.add_argument('--workers', type=int, default=None, help='extraction processes (default: CPU count)')
+    parser.add_argument('--max-pending', type=int, default=None, help='files in flight at once (default: 4 per worker)')
+    parser.add_argument('--no-cache', action='store_true', help='always re-extract instead of using the text cache')
+    parser.add_argument('--full-text', action='store_true', help='read every PDF page instead of stopping once fields are found')
+    args = parser.parse_args()
+    cache = None if args.no_cache else TextCache()
+
+    ledger = LedgerStore(csv_path)
+
+    # Only new or changed files are listed; the ledger is consulted just once
+    # to seed a fresh manifest
+    manifest = InvoiceManifest(default_manifest_path('batch_process'), base_path, EXTRACTOR_VERSION)
+    processed_files = ledger.keys() if manifest.is_empty() else set()
+
+    # Finish whatever an interrupted run left in the journal before extracting anything
+    journal = open_journal(ledger, manifest)
+    recovered = journal.recover()
+    if recovered:
+        print(f"Recovered an interrupted checkpoint of {recovered} files")
+    journalled = journal.pending()
+    journal.drop([file_path for file_path in journalled if not os.path.exists(file_path)])
+    journalled = journal.pending()
+    added = 0
+    if journalled:
+        print(f"Resuming {len(journalled)} files extracted by an interrupted run")
+        added += commit_checkpoint(journal, list(journalled))
+
+    unprocessed_files = find_unprocessed_files(manifest, processed_files, args.batch_size,
+                                               set(journalled) | journal.unmoved)
+
+    print(f"Processing {len(unprocessed_files)} files...\n")
+
+    # Extract text in parallel; results come back in walk order
+    stats = ExtractionStats()
+    file_paths = [file_path for file_path, _ in unprocessed_files]
+    required_fields = None if args.full_text else REQUIRED_FIELDS
+    results = extract_texts(file_paths, workers=args.workers, max_pending=args.max_pending, stats=stats,
+                            cache=cache, required_fields=required_fields)
+
+    # Each row is journalled as soon as it is extracted; rows and moves are
+    # committed together every checkpoint_every files
+    checkpoint = []
+    for (file_path, filename), result in zip(unprocessed_files, results):
+        print(f"Processing: {filename}")
+        text = result['text']
+
+        if text:
+            journal.record_extracted(file_path, build_row(file_path, filename, text, result['source']))
+            checkpoint.append(file_path)
+            print(f"  ✓ Extracted")
+        else:
+            print(f"  ✗ Could not extract text")
+
+        if len(checkpoint) >= args.checkpoint_every:
+            added += commit_checkpoint(journal, checkpoint)
+            checkpoint = []
+    if checkpoint:
+        added += commit_checkpoint(journal, checkpoint)
+
+    print(f"\nExtraction throughput:\n{stats.report()}")
+    if cache is not None:
+        print(cache.report())
+
+    manifest.save()
+    if added:
+        print(f"\nAdded {added} invoices to ledger")
+
+    # Compaction drops the ledger's checkpoint tags, so it waits for an empty journal
+    journal.clear()
+    if not journal.has_work() and ledger.maybe_compact() is not None:
+        print(f"Compacted ledger into {csv_path}")
+
+    print(f"Ledger operations pending compaction: {ledger.pending_ops}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: single-pass field_extractor vs the per-pattern extractors
+Compares extract_fields() with extract_quantity/extract_price/
+extract_stand_name/extract_match_details/extract_invoice_date from
+process_invoices.py on long multi-page BCCI-style invoice text
+"""
+
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from field_extractor import extract_fields
+import process_invoices
+
+LINE_ITEMS = [
+    "Ticket - {stand} Seat {row}-{seat} 1 OTH 7,500.00 18% 1,350.00",
+    "Hospitality charges for corporate box {seat} 1 EA 25,000.00",
+    "Catering and beverages {seat} pax 1,800.00",
+    "Parking pass level {row} 1 Nos 500.00",
+]
+STANDS = ["BKT Tires Lower Block 4", "Knights Pav Corp", "QATAR AIRWAYS FAN TERRACE N", "BOAT C STAND"]
+
+def make_bcci_invoice(pages, seed=0):
+    """Build a long multi-page invoice text shaped like the BCCI bills"""
+    rng = random.Random(seed)
+    lines = [
+        "BOARD OF CONTROL FOR CRICKET IN INDIA",
+        "TAX INVOICE  GSTIN 27AAATB1234F1Z5",
+        "Invoice No: BCCI/IPL/2024/00871   Invoice Date: 24 May 2024",
+    ]
+    for page in range(pages):
+        lines.append(f"Page {page + 1} of {pages}")
+        lines.append("Description of services  HSN/SAC  Amount")
+        for _ in range(40):
+            template = rng.choice(LINE_ITEMS)
+            lines.append(template.format(stand=rng.choice(STANDS), row=rng.randint(1, 40), seat=rng.randint(1, 400)))
+        lines.append("Terms: tickets are non-transferable. Subject to Mumbai jurisdiction.")
+    lines.append("Qualifier 2 - Rajasthan Royals vs Sunrisers Hyderabad")
+    lines.append("Total Amount Payable ₹ 18,45,200.00")
+    return "\n".join(lines)
+
+def legacy_extract(text, filename):
+    """Run the current per-field extractors the way process_single_invoice does"""
+    return {
+        "invoice_date": process_invoices.extract_invoice_date(text, filename),
+        "match": process_invoices.extract_match_details(text),
+        "stand": process_invoices.extract_stand_name(text),
+        "quantity": process_invoices.extract_quantity(text),
+        "price": process_invoices.extract_price(text),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark single-pass field extraction')
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 5, 20])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--number', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'pages':>6} {'chars':>8} {'legacy ms':>10} {'single-pass ms':>15} {'speedup':>8}")
+    for pages in args.pages:
+        text = make_bcci_invoice(pages)
+        filename = "24.05_BCCI_871.pdf"
+        legacy = min(timeit.repeat(lambda: legacy_extract(text, filename),
+                                   repeat=args.repeat, number=args.number)) / args.number
+        single = min(timeit.repeat(lambda: extract_fields(text),
+                                   repeat=args.repeat, number=args.number)) / args.number
+        print(f"{pages:>6} {len(text):>8} {legacy * 1000:>10.2f} {single * 1000:>15.2f} {legacy / single:>7.1f}x")
+
+    # Show what each approach extracted from the largest document
+    print("\nLegacy:", legacy_extract(text, filename))
+    print("Single-pass:", {field: (found["value"], found["pattern"]) for field, found in extract_fields(text).items()})
+
+if __name__ == "__main__":
+    main()
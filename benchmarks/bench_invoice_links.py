@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark: InvoiceLinkIndex on a synthetic ledger
+Generates ticket invoices, convenience-fee invoices that point at them,
+renamed copies and lightly edited near-duplicate texts, then times a full
+resolve() and checks the planted duplicates and fee links were found
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from invoice_links import InvoiceLinkIndex
+
+VENDORS = [('Big', 'Bigtree Entertainment Pvt. Ltd. BookMyShow TAX INVOICE'),
+           ('Waste', 'Orbgen Technologies Pvt Ltd Paytm Insider Booking Receipt'),
+           ('Ticket', 'TicketGenie E-Ticket Invoice'),
+           ('JSW', 'JSW GMR Cricket Pvt Ltd TAX INVOICE')]
+TEAMS = ['CSK', 'MI', 'RCB', 'DC', 'GT', 'KKR', 'LSG', 'PBKS', 'RR', 'SRH']
+WORDS = ('terms conditions apply tickets non transferable entry closes minutes before start play carry valid '
+         'government photo id gate stand block lounge terrace seat row level upper lower north south').split()
+
+def make_corpus(count, seed):
+    """Return (rows as (file name, text), planted duplicate pairs, planted fee links)"""
+    rng = random.Random(seed)
+    rows = []
+    duplicates = []
+    fees = {}
+    order_ids = rng.sample(range(100, 10 * count + 100), count)
+    while len(rows) < count:
+        token, header = rng.choice(VENDORS)
+        day, month = rng.randint(1, 28), rng.randint(3, 5)
+        order_id = order_ids[len(rows)]
+        amount = f"{rng.randint(1000, 90000)}.{rng.randint(0, 99):02d}"
+        home, away = rng.sample(TEAMS, 2)
+        body = " ".join(rng.choice(WORDS) for _ in range(120))
+        text = (f"{header}\nInvoice Date: {day:02d}/{month:02d}/2024\n{home} vs {away}\n"
+                f"Booking ID: BK{order_id}X\nAmount Paid: ₹ {amount}\n{body}")
+        ticket = f"{day:02d}.{month:02d}_{token}_{order_id}_{amount}.pdf"
+        rows.append((ticket, text))
+        roll = rng.random()
+        if roll < 0.3:
+            fee = f"{day}.{month}_{token}_{order_id}_{amount.rstrip('0')}_fee.pdf"
+            rows.append((fee, f"{header}\nConvenience Fee\nBooking ID: BK{order_id}X\n₹ {rng.randint(100, 900)}"))
+            fees[fee] = ticket
+        elif roll < 0.4:
+            # Re-saved copy: different name, a few words of the body changed
+            words = text.split(' ')
+            for position in rng.sample(range(len(words)), 3):
+                words[position] = rng.choice(WORDS)
+            copy = f"{day}.{month}_{token.lower()}_{order_id}_{amount}_copy.pdf"
+            rows.append((copy, ' '.join(words)))
+            duplicates.append((ticket, copy))
+    return rows, duplicates, fees
+
+def run(count, seed):
+    rows, duplicates, fees = make_corpus(count, seed)
+    started = time.perf_counter()
+    index = InvoiceLinkIndex()
+    for file_name, text in rows:
+        index.add(file_name, text=text)
+    added = time.perf_counter()
+    index.resolve()
+    finished = time.perf_counter()
+
+    canonical, _ = index.resolve()
+    positions = {file_name: position for position, file_name in enumerate(index.file_names)}
+    found_duplicates = sum(1 for ticket, copy in duplicates
+                           if canonical[positions[ticket]] == canonical[positions[copy]])
+    links = index.fee_links()
+    found_fees = sum(1 for fee, ticket in fees.items() if links.get(fee) == ticket)
+    return {
+        "invoices": len(rows),
+        "add_seconds": round(added - started, 3),
+        "resolve_seconds": round(finished - added, 3),
+        "duplicates_found": f"{found_duplicates}/{len(duplicates)}",
+        "fee_links_found": f"{found_fees}/{len(fees)}",
+        "false_duplicates": len(rows) - len(set(canonical)) - found_duplicates,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark duplicate detection and fee linking')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write results as JSON')
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'invoices':>9} {'add s':>8} {'resolve s':>10} {'duplicates':>12} {'fee links':>12} {'false dup':>10}")
+    for count in args.rows:
+        result = run(count, args.seed)
+        results.append(result)
+        print(f"{result['invoices']:>9} {result['add_seconds']:>8.2f} {result['resolve_seconds']:>10.2f} "
+              f"{result['duplicates_found']:>12} {result['fee_links_found']:>12} {result['false_duplicates']:>10}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"✓ Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
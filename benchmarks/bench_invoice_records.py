@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark: list of row dicts vs InvoiceBatch
+Measures memory held per invoice (tracemalloc) and DataFrame build time
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from bench_report_writer import make_rows
+from invoice_records import InvoiceBatch
+
+def held_bytes(build):
+    """Bytes still allocated after build() returns (its result kept alive)"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def run(count, repeat, seed):
+    # Rows are built from JSON, as they arrive from the manifest/ledger, so
+    # strings are not shared between rows the way make_rows() shares them
+    payload = json.dumps(make_rows(count, seed))
+    rows, dict_bytes = held_bytes(lambda: json.loads(payload))
+    batch, batch_bytes = held_bytes(lambda: InvoiceBatch.from_rows(json.loads(payload)))
+
+    dict_df_seconds = best_of(lambda: pd.DataFrame(rows), repeat)
+    batch_df_seconds = best_of(batch.to_pandas, repeat)
+    dict_df_bytes = pd.DataFrame(rows).memory_usage(deep=True).sum()
+    batch_df_bytes = batch.to_pandas().memory_usage(deep=True).sum()
+    return {
+        "rows": count,
+        "dict_bytes_per_invoice": round(dict_bytes / count, 1),
+        "batch_bytes_per_invoice": round(batch_bytes / count, 1),
+        "dict_dataframe_seconds": round(dict_df_seconds, 4),
+        "batch_dataframe_seconds": round(batch_df_seconds, 4),
+        "dict_dataframe_mb": round(dict_df_bytes / 1e6, 1),
+        "batch_dataframe_mb": round(batch_df_bytes / 1e6, 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the columnar invoice store')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write results as JSON')
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'rows':>8} {'dict B/inv':>11} {'batch B/inv':>12} {'dict df s':>10} {'batch df s':>11} "
+          f"{'dict df MB':>11} {'batch df MB':>12}")
+    for count in args.rows:
+        result = run(count, args.repeat, args.seed)
+        results.append(result)
+        print(f"{count:>8} {result['dict_bytes_per_invoice']:>11.0f} {result['batch_bytes_per_invoice']:>12.0f} "
+              f"{result['dict_dataframe_seconds']:>10.4f} {result['batch_dataframe_seconds']:>11.4f} "
+              f"{result['dict_dataframe_mb']:>11.1f} {result['batch_dataframe_mb']:>12.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"✓ Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
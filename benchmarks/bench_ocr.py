@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark: raw Tesseract OCR vs the ocr_pipeline pre-processing pipeline
+Times both over the invoice images in Invoices/processed and checks whether
+the amount (and quantity, when present) encoded in each filename - e.g.
+16.03_Big_zgf_11706.2.png or 2.4_Ticket genie_19800 x 2.png - is recovered
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+import pytesseract
+
+from extraction_engine import IMAGE_EXTENSIONS
+from field_extractor import extract_fields, field_value
+from ocr_pipeline import ocr_image
+from ocr_service import OCRService
+
+DEFAULT_DIR = '/Users/sumitjha/Dropbox/Mac/Documents/Projects/fpl-auction/Invoices/processed'
+
+FILENAME_AMOUNT_RE = re.compile(r'_(\d+(?:\.\d+)?)(?:\s*x\s*(\d+))?$', re.IGNORECASE)
+TEXT_NUMBER_RE = re.compile(r'\d[\d,]*(?:\.\d+)?')
+
+def expected_from_filename(filename):
+    """Return (amount, quantity) encoded in the filename, either may be None"""
+    match = FILENAME_AMOUNT_RE.search(os.path.splitext(filename)[0])
+    if not match:
+        return None, None
+    amount = float(match.group(1))
+    quantity = int(match.group(2)) if match.group(2) else None
+    # Short trailing numbers are order ids (05.05_big_086), not amounts
+    if amount < 100:
+        amount = None
+    return amount, quantity
+
+def amount_found(text, amount):
+    for number in TEXT_NUMBER_RE.findall(text):
+        try:
+            if abs(float(number.replace(',', '')) - amount) < 0.01:
+                return True
+        except ValueError:
+            continue
+    return False
+
+def raw_ocr(image_path):
+    with Image.open(image_path) as image:
+        return pytesseract.image_to_string(image)
+
+def score(text, amount, quantity):
+    result = {"chars": len(text)}
+    if amount is not None:
+        result["amount_hit"] = amount_found(text, amount)
+    if quantity is not None:
+        found = field_value(extract_fields(text, fields=('quantity',)), 'quantity')
+        result["quantity_hit"] = found == quantity
+    return result
+
+def run(image_path, method, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        text = method(image_path)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return text, best
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark OCR pre-processing on invoice images')
+    parser.add_argument('--dir', default=DEFAULT_DIR)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='write per-file results as JSON')
+    args = parser.parse_args()
+
+    images = sorted(name for name in os.listdir(args.dir) if name.lower().endswith(IMAGE_EXTENSIONS))
+    if not images:
+        print(f"No images found in {args.dir}")
+        return
+
+    methods = [("raw", raw_ocr), ("pipeline", ocr_image)]
+    results = []
+    totals = {name: {"seconds": 0.0, "amount_hits": 0, "quantity_hits": 0} for name, _ in methods}
+    amount_cases = 0
+    quantity_cases = 0
+
+    print(f"{'file':<40} {'raw s':>7} {'pipe s':>7} {'raw amt':>8} {'pipe amt':>9}")
+    for filename in images:
+        image_path = os.path.join(args.dir, filename)
+        amount, quantity = expected_from_filename(filename)
+        amount_cases += amount is not None
+        quantity_cases += quantity is not None
+        row = {"file": filename, "amount": amount, "quantity": quantity}
+        for name, method in methods:
+            text, seconds = run(image_path, method, args.repeat)
+            row[name] = dict(score(text, amount, quantity), seconds=round(seconds, 3))
+            totals[name]["seconds"] += seconds
+            totals[name]["amount_hits"] += row[name].get("amount_hit", False)
+            totals[name]["quantity_hits"] += row[name].get("quantity_hit", False)
+        results.append(row)
+        print(f"{filename[:40]:<40} {row['raw']['seconds']:>7.2f} {row['pipeline']['seconds']:>7.2f} "
+              f"{str(row['raw'].get('amount_hit', '-')):>8} {str(row['pipeline'].get('amount_hit', '-')):>9}")
+
+    print()
+    for name, _ in methods:
+        total = totals[name]
+        print(f"{name:>9}: {total['seconds']:.2f}s total, "
+              f"amount {total['amount_hits']}/{amount_cases}, quantity {total['quantity_hits']}/{quantity_cases}")
+    if totals["pipeline"]["seconds"]:
+        print(f"  speedup: {totals['raw']['seconds'] / totals['pipeline']['seconds']:.1f}x")
+
+    # Throughput when every image is queued at once on the warm OCR service
+    with OCRService() as service:
+        started = time.perf_counter()
+        futures = [service.submit(os.path.join(args.dir, filename)) for filename in images]
+        for future in futures:
+            future.result()
+        service_seconds = time.perf_counter() - started
+    print(f"  service ({service.backend.name}): {len(images)} images in {service_seconds:.2f}s")
+    print(service.stats.report())
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"files": results, "totals": totals}, f, indent=2)
+        print(f"✓ Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark: streaming confidence report vs the pandas/openpyxl ExcelWriter
+Each writer runs in a fresh subprocess so peak RSS is measured per writer
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WRITERS = ['legacy', 'xlsxwriter', 'openpyxl']
+
+def make_rows(count, seed=0):
+    """Rows shaped like InvoiceProcessor.process_invoice_file output"""
+    rng = random.Random(seed)
+    companies = ['BookMyShow', 'Paytm Insider', 'TicketGenie', 'JSW GMR', 'Unknown']
+    months = ['March 2024', 'April 2024', 'May 2024', 'Unknown']
+    rows = []
+    for number in range(count):
+        month = rng.choice(months)
+        rows.append({
+            "File Name": f"{rng.randint(1, 28)}.0{rng.randint(3, 5)}_{rng.choice(companies)}_{number:06d}.pdf",
+            "Month": month,
+            "Invoice Date": f"2024-0{rng.randint(3, 5)}-{rng.randint(1, 28):02d}" if rng.random() < 0.9 else "",
+            "Company": rng.choice(companies),
+            "Event Type": rng.choice(['IPL 2024', 'IPL 2024 Playoffs', 'Chelsea FC Match', 'Unknown Event']),
+            "Match/Event": rng.choice(['CSK vs RCB', 'MI vs KKR', 'Final', 'Unknown Event']),
+            "Stand Name": "General",
+            "Match Date": "",
+            "Ticket Quantity": 1,
+            "Ticket Price": rng.choice([0, 1500.0, 3500.0, 11706.2, 19800.0]),
+            "Is Convenience Fee": rng.random() < 0.2,
+            "File Path": f"/Invoices/{month}/{number}.pdf",
+            "Confidence %": rng.choice([35, 50, 65, 80, 90, 100]),
+            "Confidence Notes": rng.choice(['High confidence', 'Price not found', 'Company unclear, Date missing']),
+        })
+    return rows
+
+def legacy_report(rows, output_file):
+    """The previous main(): a DataFrame written sheet by sheet through pd.ExcelWriter"""
+    import pandas as pd
+    df = pd.DataFrame(rows)
+    month_order = {"March 2024": 1, "April 2024": 2, "May 2024": 3, "June 2024": 4, "Unknown": 5}
+    df["Month_Order"] = df["Month"].map(month_order).fillna(5)
+    df = df.sort_values(["Confidence %", "Month_Order", "Invoice Date", "File Name"], ascending=[False, True, True, True])
+    df = df.drop("Month_Order", axis=1)
+    high_confidence = df[df["Confidence %"] >= 80]
+    medium_confidence = df[(df["Confidence %"] >= 50) & (df["Confidence %"] < 80)]
+    low_confidence = df[df["Confidence %"] < 50]
+    with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
+        df.to_excel(writer, sheet_name='All Invoices', index=False)
+        high_confidence.to_excel(writer, sheet_name='High Confidence (80%+)', index=False)
+        medium_confidence.to_excel(writer, sheet_name='Medium Confidence (50-79%)', index=False)
+        low_confidence.to_excel(writer, sheet_name='Low Confidence (<50%)', index=False)
+        pd.DataFrame({'Metric': ['Total Invoices'], 'Value': [len(df)]}).to_excel(writer, sheet_name='Summary', index=False)
+        for column, sheet in (('Company', 'By Company'), ('Month', 'By Month')):
+            grouped = df.groupby(column).agg({'File Name': 'count', 'Ticket Price': 'sum', 'Confidence %': 'mean'}).round(2)
+            grouped.columns = ['Invoice Count', 'Total Amount', 'Avg Confidence %']
+            grouped.to_excel(writer, sheet_name=sheet)
+
+def run_one(writer, rows_count, seed):
+    """Child mode: build rows, write the report, print timing and peak RSS as JSON"""
+    rows = make_rows(rows_count, seed)
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_file = os.path.join(temp_dir, 'report.xlsx')
+        started = time.perf_counter()
+        if writer == 'legacy':
+            legacy_report(rows, output_file)
+        else:
+            from report_writer import write_confidence_report
+            write_confidence_report(rows, output_file, engine=writer)
+        seconds = time.perf_counter() - started
+        size = os.path.getsize(output_file)
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    print(json.dumps({"writer": writer, "rows": rows_count, "seconds": round(seconds, 3),
+                      "peak_rss_mb": round(rss_after, 1), "rss_growth_mb": round(rss_after - rss_before, 1),
+                      "bytes": size}))
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark confidence report writers')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--writers', nargs='+', default=WRITERS, choices=WRITERS)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write results as JSON')
+    parser.add_argument('--child', choices=WRITERS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_one(args.child, args.rows[0], args.seed)
+        return
+
+    results = []
+    print(f"{'writer':<11} {'rows':>8} {'seconds':>8} {'peak RSS MB':>12} {'growth MB':>10}")
+    for rows_count in args.rows:
+        for writer in args.writers:
+            child = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', writer,
+                                    '--rows', str(rows_count), '--seed', str(args.seed)],
+                                   capture_output=True, text=True)
+            if child.returncode != 0:
+                print(f"{writer:<11} {rows_count:>8}  ✗ {child.stderr.strip().splitlines()[-1]}")
+                continue
+            result = json.loads(child.stdout.strip().splitlines()[-1])
+            results.append(result)
+            print(f"{writer:<11} {rows_count:>8} {result['seconds']:>8.2f} {result['peak_rss_mb']:>12.1f} "
+                  f"{result['rss_growth_mb']:>10.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"✓ Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
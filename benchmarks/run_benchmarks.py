@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Pipeline benchmark harness
+Generates (or reuses) a synthetic invoice corpus and times the stages of
+batch_process.py, extract_quantities.py and
+InvoiceProcessor.process_invoice_file, reporting files/sec, p50/p95 latency
+per stage and peak RSS. Results are written as JSON so runs of different
+versions can be compared with --compare
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import batch_process
+import extract_quantities
+from extraction_engine import ExtractionStats, extract_texts
+from process_invoices_with_confidence import InvoiceProcessor
+from synthetic_invoices import generate_corpus
+
+RESULTS_DIR = os.path.join(REPO_ROOT, 'benchmarks', 'results')
+
+def percentile(values, percent):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))]
+
+def peak_rss_mb():
+    """Peak resident set size of this process and its finished children"""
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale
+    return round(max(own, children), 1)
+
+def summarize(name, latencies, wall_seconds):
+    return {
+        "stage": name,
+        "files": len(latencies),
+        "seconds": round(wall_seconds, 4),
+        "files_per_sec": round(len(latencies) / wall_seconds, 2) if wall_seconds else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def time_each(name, items, function):
+    """Run function over items, returning (stage summary, outputs)"""
+    latencies = []
+    outputs = []
+    started = time.perf_counter()
+    for item in items:
+        item_started = time.perf_counter()
+        outputs.append(function(item))
+        latencies.append(time.perf_counter() - item_started)
+    return summarize(name, latencies, time.perf_counter() - started), outputs
+
+def run_stages(entries, workers):
+    stages = []
+
+    # Stage 1: text extraction (PDF parsing + OCR) through the parallel engine
+    stats = ExtractionStats()
+    started = time.perf_counter()
+    results = list(extract_texts([entry["path"] for entry in entries], workers=workers, stats=stats))
+    stage = summarize("extract_texts", [result["seconds"] for result in results], time.perf_counter() - started)
+    stages.append(stage)
+    texts = [result["text"] for result in results]
+
+    # Stage 2: batch_process field extraction on the extracted text
+    stage, details = time_each("batch_process.extract_invoice_details", list(zip(texts, entries)),
+                               lambda item: batch_process.extract_invoice_details(item[0], item[1]["file_name"]))
+    stage["price_hits"] = sum(1 for row, entry in zip(details, entries)
+                              if _same_amount(row["Ticket Price"], entry["amount"]))
+    stages.append(stage)
+
+    # Stage 3: extract_quantities fallback chain
+    stage, quantities = time_each("extract_quantities.extract_quantity", list(zip(texts, entries)),
+                                  lambda item: extract_quantities.extract_quantity(item[0], item[1]["file_name"],
+                                                                                   item[1]["amount"]))
+    stage["quantity_hits"] = sum(1 for quantity, entry in zip(quantities, entries) if quantity == entry["quantity"])
+    stages.append(stage)
+
+    # Stage 4: filename-driven InvoiceProcessor rows with confidence scoring
+    processor = InvoiceProcessor()
+    stage, _ = time_each("InvoiceProcessor.process_invoice_file", [entry["path"] for entry in entries],
+                         processor.process_invoice_file)
+    stages.append(stage)
+    return stages
+
+def _same_amount(found, expected):
+    try:
+        return abs(float(str(found).replace(',', '')) - expected) < 0.01
+    except ValueError:
+        return False
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def load_corpus(corpus_dir, count, image_fraction, seed):
+    manifest_path = os.path.join(corpus_dir, 'corpus.json')
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r') as f:
+            corpus = json.load(f)
+        if corpus["count"] == count and corpus["seed"] == seed:
+            return corpus["files"]
+    return generate_corpus(corpus_dir, count, image_fraction=image_fraction, seed=seed)
+
+def compare(current, previous_path):
+    """Print per-stage throughput and latency deltas against a previous run"""
+    with open(previous_path, 'r') as f:
+        previous = {stage["stage"]: stage for stage in json.load(f)["stages"]}
+    print(f"\nCompared with {previous_path}:")
+    for stage in current["stages"]:
+        before = previous.get(stage["stage"])
+        if not before or not before["files_per_sec"] or not before["p95_ms"]:
+            continue
+        throughput = (stage["files_per_sec"] - before["files_per_sec"]) / before["files_per_sec"] * 100
+        p95 = (stage["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100
+        print(f"  {stage['stage']:<40} files/sec {throughput:+6.1f}%   p95 {p95:+6.1f}%")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the invoice pipeline on a synthetic corpus')
+    parser.add_argument('--count', type=int, default=200, help='invoices in the corpus')
+    parser.add_argument('--image-fraction', type=float, default=0.25)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--corpus', help='corpus directory to create or reuse (default: a temp dir)')
+    parser.add_argument('--workers', type=int, default=None, help='extraction processes (default: CPU count)')
+    parser.add_argument('--output', help='result JSON path (default: benchmarks/results/<timestamp>.json)')
+    parser.add_argument('--compare', help='previous result JSON to diff against')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='invoice_corpus_') as temp_dir:
+        corpus_dir = args.corpus or temp_dir
+        entries = load_corpus(corpus_dir, args.count, args.image_fraction, args.seed)
+        print(f"Benchmarking {len(entries)} invoices from {corpus_dir}\n")
+        stages = run_stages(entries, args.workers)
+
+    print(f"{'stage':<40} {'files/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'RSS MB':>8}")
+    for stage in stages:
+        print(f"{stage['stage']:<40} {stage['files_per_sec']:>9.2f} {stage['p50_ms']:>9.2f} "
+              f"{stage['p95_ms']:>9.2f} {stage['peak_rss_mb']:>8.1f}")
+
+    result = {
+        "timestamp": datetime.now().isoformat(timespec='seconds'),
+        "revision": git_revision(),
+        "python": sys.version.split()[0],
+        "corpus": {"count": len(entries), "image_fraction": args.image_fraction, "seed": args.seed},
+        "workers": args.workers or os.cpu_count(),
+        "stages": stages,
+    }
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, datetime.now().strftime('%Y%m%d_%H%M%S') + '.json')
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"\n✓ Results written to {output}")
+
+    if args.compare:
+        compare(result, args.compare)
+
+if __name__ == "__main__":
+    main()
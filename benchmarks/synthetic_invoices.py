@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Synthetic invoice corpus for benchmarks
+Writes PDFs (PyMuPDF) and PNG screenshots (Pillow) laid out like the
+BookMyShow, Paytm Insider, TicketGenie and JSW GMR invoices, into Mar_24 /
+Apr_24 / May_24 folders with the DD.MM_Vendor_id_amount naming the real
+Invoices/ tree uses, plus a corpus.json with the expected field values
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # PyMuPDF
+from PIL import Image, ImageDraw, ImageFont
+
+from field_extractor import IPL_TEAMS
+from ipl_schedule import SCHEDULE_DIR
+
+MONTH_FOLDERS = {3: 'Mar_24', 4: 'Apr_24', 5: 'May_24'}
+MONTH_ABBR = ['', 'Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+# filename token, header lines, how the amount/quantity/stand are printed
+VENDOR_STYLES = {
+    'BookMyShow': {
+        'token': 'Big',
+        'header': ['Bigtree Entertainment Pvt. Ltd.', 'BookMyShow', 'TAX INVOICE'],
+        'lines': ['Invoice Date: {invoice_date}', 'TATA IPL 2024 - {home_name} vs {away_name}',
+                  'Venue: {stand}', 'No. of tickets: {quantity}', 'Ticket Price ₹ {amount}',
+                  'Amount Paid: ₹ {amount}'],
+    },
+    'Paytm Insider': {
+        'token': 'Waste',
+        'header': ['Orbgen Technologies Pvt Ltd', 'Paytm Insider', 'Booking Receipt'],
+        'lines': ['Date of issue: {invoice_date}', '{home_name} vs {away_name}', '{stand}',
+                  '{quantity} Tickets', 'Payment Amount: ₹{amount}'],
+    },
+    'TicketGenie': {
+        'token': 'Ticket genie',
+        'header': ['TicketGenie', 'E-Ticket Invoice'],
+        'lines': ['Invoice Date: {invoice_date}', 'Match: {home_name} vs {away_name}', 'Stand: {stand}',
+                  'Quantity: {quantity}', 'Total INR {amount}'],
+    },
+    'JSW GMR': {
+        'token': 'JSW',
+        'header': ['JSW GMR Cricket Pvt Ltd', 'TAX INVOICE', 'GSTIN 07AAFCJ1234K1Z2'],
+        'lines': ['Dated: {invoice_date}', 'IPL 2024 {home_name} vs {away_name}', '{stand}',
+                  'Hospitality {quantity} Nos', 'Total Amount Rs. {amount}'],
+    },
+}
+
+STANDS = ['BKT Tires Lower Block 4', 'Knights Pav Corp', 'QATAR AIRWAYS FAN TERRACE', 'North Stand',
+          'Pavilion Lounge', 'BLOCK C BAY 12-UP']
+FILLER = ['Terms and conditions apply. Tickets are non-transferable.',
+          'Entry closes 30 minutes before the start of play.',
+          'Please carry a valid government photo ID.',
+          'This is a computer generated invoice and does not require a signature.']
+
+def _fixtures(schedule_file='ipl_2024.json'):
+    """League fixtures (date, home, away) from a bundled schedule file"""
+    with open(os.path.join(SCHEDULE_DIR, schedule_file), 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return [(fixture['date'], fixture['teams'][0], fixture['teams'][1])
+            for fixture in data['fixtures'] if fixture.get('teams')]
+
+def make_invoice(rng, vendor, fixture, pages=1):
+    """Return (lines, expected) for one synthetic invoice"""
+    style = VENDOR_STYLES[vendor]
+    match_date, home, away = fixture
+    year, month, day = (int(part) for part in match_date.split('-'))
+    # Tickets are bought a few days before the match, within the same month
+    invoice_day = max(1, day - rng.randint(0, 6))
+    quantity = rng.randint(1, 12)
+    amount = round(quantity * rng.choice([1500, 2500, 3500, 5850.1, 7500, 12000]), 2)
+    values = {
+        'invoice_date': f"{invoice_day} {MONTH_ABBR[month]} {year}",
+        'home_name': IPL_TEAMS[home][0],
+        'away_name': IPL_TEAMS[away][0],
+        'stand': rng.choice(STANDS),
+        'quantity': quantity,
+        'amount': f"{amount:,.2f}",
+    }
+    lines = list(style['header'])
+    lines += [line.format(**values) for line in style['lines']]
+    for _ in range(pages * 12):
+        lines.append(rng.choice(FILLER))
+    expected = {
+        'vendor': vendor,
+        'invoice_date': f"{year}-{month:02d}-{invoice_day:02d}",
+        'match': f"{home} vs {away}",
+        'match_date': match_date,
+        'quantity': quantity,
+        'amount': amount,
+        'month': month,
+    }
+    return lines, expected
+
+def write_pdf(path, lines, lines_per_page=48):
+    document = fitz.open()
+    for start in range(0, len(lines), lines_per_page):
+        page = document.new_page()
+        y = 60
+        for line in lines[start:start + lines_per_page]:
+            # The base-14 fonts have no rupee glyph
+            page.insert_text((50, y), line.replace('₹', 'Rs. '), fontsize=10, fontname='helv')
+            y += 15
+    document.save(path)
+    document.close()
+
+def write_png(path, lines, width=1170):
+    """Render a phone-screenshot-like PNG (tall, large type, mostly blank)"""
+    try:
+        font = ImageFont.truetype('DejaVuSans.ttf', 34)
+    except OSError:
+        font = ImageFont.load_default()
+    line_height = 56
+    image = Image.new('RGB', (width, 200 + line_height * len(lines) * 2), 'white')
+    draw = ImageDraw.Draw(image)
+    y = 120
+    for line in lines:
+        draw.text((60, y), line, fill='black', font=font)
+        y += line_height * 2
+    image.save(path)
+
+def generate_corpus(out_dir, count, image_fraction=0.25, max_pages=3, seed=0):
+    """Write count invoices under out_dir and return the corpus entries"""
+    rng = random.Random(seed)
+    fixtures = [fixture for fixture in _fixtures() if int(fixture[0][5:7]) in MONTH_FOLDERS]
+    vendors = sorted(VENDOR_STYLES)
+    entries = []
+    for number in range(count):
+        vendor = vendors[number % len(vendors)]
+        fixture = rng.choice(fixtures)
+        lines, expected = make_invoice(rng, vendor, fixture, pages=rng.randint(1, max_pages))
+        is_image = rng.random() < image_fraction
+        day, month = expected['invoice_date'][8:], expected['month']
+        amount = f"{expected['amount']:g}"
+        filename = (f"{int(day)}.{month:02d}_{VENDOR_STYLES[vendor]['token']}_{number:04d}_{amount}"
+                    f"{'.png' if is_image else '.pdf'}")
+        folder = os.path.join(out_dir, MONTH_FOLDERS[month])
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, filename)
+        if is_image:
+            write_png(path, lines[:12])
+        else:
+            write_pdf(path, lines)
+        entries.append(dict(expected, path=path, file_name=filename))
+    with open(os.path.join(out_dir, 'corpus.json'), 'w') as f:
+        json.dump({'seed': seed, 'count': count, 'files': entries}, f, indent=2)
+    return entries
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic invoice corpus')
+    parser.add_argument('--out', required=True, help='output directory')
+    parser.add_argument('--count', type=int, default=200)
+    parser.add_argument('--image-fraction', type=float, default=0.25, help='share of PNG screenshots')
+    parser.add_argument('--max-pages', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    entries = generate_corpus(args.out, args.count, args.image_fraction, args.max_pages, args.seed)
+    images = sum(entry['file_name'].endswith('.png') for entry in entries)
+    print(f"✓ Wrote {len(entries)} invoices ({images} PNG, {len(entries) - images} PDF) to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Rule-based confidence scoring for invoice rows
+Weights live in confidence_rules.json; score_frame applies every rule as a
+column-wide mask so the whole history can be re-scored in milliseconds
+after a weight change, and score_row applies the same rules to one row
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'confidence_rules.json')
+TRUE_VALUES = [True, 1, 'True', 'true', 'TRUE']
+NUMERIC_OPS = {'gt': np.greater, 'ge': np.greater_equal, 'lt': np.less, 'le': np.less_equal}
+
+def load_rules(path=DEFAULT_RULES_PATH):
+    """Read a rules file: {"base", "min", "max", "default_note", "rules": [...]}"""
+    with open(path, 'r', encoding='utf-8') as f:
+        rules = json.load(f)
+    for rule in rules['rules']:
+        if rule['op'] not in ('eq', 'ne', 'in', 'missing', 'present', 'true', 'contains') + tuple(NUMERIC_OPS):
+            raise ValueError(f"Unknown confidence rule op: {rule['op']}")
+    return rules
+
+def _missing(series):
+    return series.isna() | series.eq("")
+
+def rule_mask(series, rule):
+    """Boolean array: rows of a column matched by one rule"""
+    op = rule['op']
+    if op == 'eq':
+        return series.eq(rule['value']).to_numpy()
+    if op == 'ne':
+        return series.ne(rule['value']).to_numpy()
+    if op == 'in':
+        return series.isin(rule['value']).to_numpy()
+    if op == 'missing':
+        return _missing(series).to_numpy()
+    if op == 'present':
+        return (~_missing(series)).to_numpy()
+    if op == 'true':
+        return series.isin(TRUE_VALUES).to_numpy()
+    if op == 'contains':
+        return series.astype(str).str.contains(rule['value'], regex=False).to_numpy()
+    numbers = pd.to_numeric(series, errors='coerce').to_numpy(dtype=float)
+    with np.errstate(invalid='ignore'):
+        return NUMERIC_OPS[op](numbers, rule['value'])
+
+def score_frame(df, rules=None):
+    """
+    Return (confidence, notes) Series for every row of df.
+
+    Each rule contributes weight * mask; noted rules set one bit of a per-row
+    code, and only the distinct codes are turned into note strings.
+    """
+    rules = rules or load_rules()
+    rows = len(df)
+    score = np.full(rows, rules['base'], dtype=np.int64)
+    codes = np.zeros(rows, dtype=np.int64)
+    notes = []
+    for rule in rules['rules']:
+        column = df[rule['column']] if rule['column'] in df else pd.Series([None] * rows, index=df.index)
+        mask = rule_mask(column, rule)
+        score += rule['weight'] * mask
+        if rule.get('note'):
+            codes |= mask.astype(np.int64) << len(notes)
+            notes.append(rule['note'])
+    score = np.clip(score, rules['min'], rules['max'])
+
+    labels = {}
+    for code in np.unique(codes):
+        matched = [note for bit, note in enumerate(notes) if code >> bit & 1]
+        labels[code] = ', '.join(matched) if matched else rules['default_note']
+    return (pd.Series(score, index=df.index, name='Confidence %'),
+            pd.Series(codes, index=df.index).map(labels).rename('Confidence Notes'))
+
+def _row_matches(value, rule):
+    op = rule['op']
+    missing = value is None or value == "" or (isinstance(value, float) and np.isnan(value))
+    if op == 'missing':
+        return missing
+    if op == 'present':
+        return not missing
+    if op == 'eq':
+        return value == rule['value']
+    if op == 'ne':
+        return value != rule['value']
+    if op == 'in':
+        return value in rule['value']
+    if op == 'true':
+        return value in TRUE_VALUES
+    if op == 'contains':
+        return rule['value'] in str(value)
+    try:
+        return bool(NUMERIC_OPS[op](float(value), rule['value']))
+    except (TypeError, ValueError):
+        return False
+
+def score_row(row, rules=None):
+    """Score one row dict; same result as score_frame on that row"""
+    rules = rules or load_rules()
+    score = rules['base']
+    reasons = []
+    for rule in rules['rules']:
+        if _row_matches(row.get(rule['column']), rule):
+            score += rule['weight']
+            if rule.get('note'):
+                reasons.append(rule['note'])
+    score = max(rules['min'], min(rules['max'], score))
+    return score, ', '.join(reasons) if reasons else rules['default_note']
+
+def rescore_rows(rows, rules=None):
+    """Re-score a list of row dicts in place with one columnar pass"""
+    if not rows:
+        return rows
+    rules = rules or load_rules()
+    columns = {rule['column'] for rule in rules['rules']}
+    df = pd.DataFrame({column: [row.get(column) for row in rows] for column in columns})
+    confidence, notes = score_frame(df, rules)
+    for row, value, note in zip(rows, confidence.tolist(), notes.tolist()):
+        row['Confidence %'] = value
+        row['Confidence Notes'] = note
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-score a ledger CSV with the confidence rules')
+    parser.add_argument('csv', help='ledger CSV with the rule columns')
+    parser.add_argument('--rules', default=DEFAULT_RULES_PATH)
+    parser.add_argument('--output', help='write the re-scored CSV here (default: print a summary only)')
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.csv)
+    rules = load_rules(args.rules)
+    started = time.perf_counter()
+    df['Confidence %'], df['Confidence Notes'] = score_frame(df, rules)
+    elapsed = time.perf_counter() - started
+    print(f"Scored {len(df)} rows in {elapsed * 1000:.1f} ms")
+    print(df['Confidence Notes'].value_counts().head(10).to_string())
+    if args.output:
+        df.to_csv(args.output, index=False)
+        print(f"✓ Written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Season-aware invoice date inference
+Hand-typed filenames carry only DD.MM, so the year has to come from
+somewhere else. In order of trust: a full date in the invoice text, the
+filing folder (Mar_24 holds invoices issued up to March 2024), the fixture
+calendar of every loaded season (IPL, CWC 2023, football, ...) and finally
+the most recent season. The calendar is precomputed into a month/day
+index over each season window, so inference is O(1) per invoice however
+many seasons are loaded
+"""
+
+import re
+from datetime import date, timedelta
+from functools import lru_cache
+
+from invoice_filename import parse_invoice_name
+from ipl_schedule import default_schedule
+
+# Tickets are bought up to this long before a season starts
+LEAD_DAYS = 60
+
+MONTH_ABBREVIATIONS = ('jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec')
+# 'Mar_24', 'march-2024', 'Nov 23' as a path component
+FOLDER_RE = re.compile(r"(?:^|[/\\])(" + "|".join(MONTH_ABBREVIATIONS) + r")[a-z]*[_\s-]?(\d{2}|\d{4})(?=[/\\]|$)",
+                       re.IGNORECASE)
+
+def folder_month(file_path):
+    """(year, month) of the innermost month folder in file_path, or None"""
+    found = None
+    for match in FOLDER_RE.finditer(file_path or ''):
+        year = int(match.group(2))
+        found = (year + 2000 if year < 100 else year, MONTH_ABBREVIATIONS.index(match.group(1).lower()[:3]) + 1)
+    return found
+
+def _valid(year, month, day):
+    try:
+        date(year, month, day)
+    except ValueError:
+        return False
+    return True
+
+class DateInference:
+    """
+    Resolve the year of a day/month against a fixture schedule.
+
+    The month/day index maps every calendar day from LEAD_DAYS before a
+    season starts to its last day onto (in season, year, competition)
+    candidates:
+    days inside a season first, then days only in a pre-season lead
+    window, newest first within each.
+    """
+
+    def __init__(self, schedule):
+        self.schedule = schedule
+        self._by_month_day = {}
+        self.latest_year = None
+        for window in schedule.seasons.values():
+            start = date.fromisoformat(window["start"]) - timedelta(days=LEAD_DAYS)
+            end = date.fromisoformat(window["end"])
+            self.latest_year = max(self.latest_year or end.year, end.year)
+            season_start = date.fromisoformat(window["start"])
+            day = start
+            while day <= end:
+                candidates = self._by_month_day.setdefault((day.month, day.day), [])
+                candidate = (day >= season_start, day.year, window["competition"])
+                if candidate not in candidates:
+                    candidates.append(candidate)
+                day += timedelta(days=1)
+        for candidates in self._by_month_day.values():
+            candidates.sort(reverse=True)
+
+    def candidates(self, month, day, competition=None):
+        """Years whose seasons cover day/month, newest first (only competition's, if it has any)"""
+        found = self._by_month_day.get((month, day), [])
+        if competition is not None and any(name == competition for _, _, name in found):
+            found = [candidate for candidate in found if candidate[2] == competition]
+        return list(dict.fromkeys(year for _, year, _ in found))
+
+    def _fixture_year(self, years, month, day, match):
+        """The candidate year in which the match is next played on or after day/month"""
+        teams = match.split(" vs ") if match and " vs " in match else None
+        if not teams or len(teams) != 2:
+            return None
+        played = {fixture["date"] for fixture in self.schedule.fixtures(*teams)}
+        for year in years:
+            bought = f"{year}-{month:02d}-{day:02d}"
+            if any(bought <= played_on <= f"{year + 1}-{month:02d}-{day:02d}" for played_on in played):
+                return year
+        return None
+
+    def infer(self, day, month, folder=None, text_date=None, match=None, competition=None):
+        """
+        Infer the full date for day/month.
+
+        folder is (year, month) of the filing folder, text_date a
+        YYYY-MM-DD found in the invoice, match 'CSK vs RCB' and competition
+        a season name to prefer. Returns {'date', 'source', 'candidates'}
+        with source one of text, folder, fixture, calendar or default;
+        date is None when there is nothing to go on.
+        """
+        if day is None or month is None:
+            if text_date:
+                return {"date": text_date, "source": "text", "candidates": []}
+            return {"date": None, "source": "default", "candidates": []}
+
+        years = self.candidates(month, day, competition)
+        year, source = None, None
+        if text_date:
+            text_year, text_month = int(text_date[:4]), int(text_date[5:7])
+            # The typed date and the printed one may straddle New Year
+            year = text_year + (1 if month - text_month < -6 else -1 if month - text_month > 6 else 0)
+            source = "text"
+        elif folder:
+            # Invoices are filed after they are issued
+            folder_year, month_filed = folder
+            year = folder_year if month <= month_filed else folder_year - 1
+            source = "folder"
+        elif years:
+            year = self._fixture_year(years, month, day, match)
+            source = "fixture" if year is not None else "calendar"
+            year = year if year is not None else years[0]
+        elif self.latest_year is not None:
+            year, source = self.latest_year, "default"
+
+        if year is None or not _valid(year, month, day):
+            return {"date": None, "source": "default", "candidates": years}
+        return {"date": f"{year}-{month:02d}-{day:02d}", "source": source, "candidates": years}
+
+@lru_cache(maxsize=None)
+def default_inference():
+    """Inference over the default schedule (built once per process)"""
+    return DateInference(default_schedule())
+
+def infer_invoice_date(file_name, file_path=None, text_date=None, match=None, competition=None):
+    """Infer an invoice's date from its filename, filing folder, text date and match"""
+    name = parse_invoice_name(file_name)
+    return default_inference().infer(name.day, name.month, folder=folder_month(file_path), text_date=text_date,
+                                     match=match, competition=competition)
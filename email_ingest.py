@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Email ingestion for booking confirmations
+Reads .eml files, mbox files and maildir folders, parses each MIME message
+as it is read, and streams PDF/image attachments as in-memory documents
+into the extraction pipeline - no temp files. Messages without an invoice
+attachment are ingested from their text (or HTML) body instead. Message-IDs
+and attachment hashes already ingested are remembered, and attachments the
+ledger already holds by name are skipped, so a season's mailbox can be
+loaded in one pass and re-run safely
+"""
+
+import argparse
+import hashlib
+import json
+import mailbox
+import os
+import tempfile
+from collections import deque
+from email import policy
+from email.parser import BytesFeedParser, BytesParser
+from html.parser import HTMLParser
+
+import batch_process
+from text_cache import TextCache
+from ledger_store import LedgerStore
+from invoice_manifest import DEFAULT_MANIFEST_DIR, InvoiceManifest, default_manifest_path
+from extraction_engine import (EXTRACTOR_VERSION, INVOICE_EXTENSIONS, DocumentBytes, ExtractionStats,
+                               extract_texts)
+
+EMAIL_EXTENSIONS = ('.eml',)
+READ_CHUNK = 64 * 1024
+COMMIT_EVERY = 100
+# Attachment types worth extracting; octet-stream parts count when their name has an invoice extension
+INVOICE_CONTENT_TYPES = {'application/pdf': '.pdf', 'image/png': '.png', 'image/jpeg': '.jpg'}
+SEEN_PATH = os.path.join(DEFAULT_MANIFEST_DIR, 'email_ingest_seen.json')
+
+class _HTMLText(HTMLParser):
+    """Visible text of an HTML body, one block per line"""
+
+    BLOCKS = {'p', 'div', 'br', 'tr', 'li', 'table', 'h1', 'h2', 'h3', 'h4'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ('script', 'style'):
+            self.skip += 1
+        elif tag in self.BLOCKS:
+            self.parts.append('\n')
+
+    def handle_endtag(self, tag):
+        if tag in ('script', 'style') and self.skip:
+            self.skip -= 1
+        elif tag in ('td', 'th'):
+            self.parts.append(' ')
+
+    def handle_data(self, data):
+        if not self.skip:
+            self.parts.append(data)
+
+def html_to_text(html):
+    parser = _HTMLText()
+    parser.feed(html)
+    parser.close()
+    lines = (' '.join(line.split()) for line in ''.join(parser.parts).splitlines())
+    return '\n'.join(line for line in lines if line)
+
+def parse_email_file(path):
+    """Parse one .eml file, feeding the parser in chunks"""
+    parser = BytesFeedParser(policy=policy.default)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(READ_CHUNK), b''):
+            parser.feed(chunk)
+    return parser.close()
+
+def is_maildir(path):
+    return os.path.isdir(os.path.join(path, 'cur')) and os.path.isdir(os.path.join(path, 'new'))
+
+def iter_messages(source):
+    """
+    Yield (location, message) from an .eml file, an mbox file or a maildir.
+
+    Mailboxes are read one message at a time, so memory is bounded by the
+    largest message rather than the mailbox.
+    """
+    if source.lower().endswith(EMAIL_EXTENSIONS):
+        yield source, parse_email_file(source)
+        return
+    box = mailbox.Maildir(source, factory=None, create=False) if is_maildir(source) else \
+        mailbox.mbox(source, factory=None, create=False)
+    parser = BytesParser(policy=policy.default)
+    try:
+        for key in box.iterkeys():
+            yield f"{source}#{key}", parser.parsebytes(box.get_bytes(key))
+    finally:
+        box.close()
+
+def attachment_documents(message):
+    """DocumentBytes for every PDF/image attachment, decoded straight from the MIME part"""
+    documents = []
+    for part in message.walk():
+        if part.is_multipart():
+            continue
+        content_type = part.get_content_type()
+        filename = part.get_filename()
+        extension = os.path.splitext(filename or '')[1].lower()
+        if content_type not in INVOICE_CONTENT_TYPES and extension not in INVOICE_EXTENSIONS:
+            continue
+        data = part.get_payload(decode=True)
+        if not data:
+            continue
+        name = filename or f"attachment_{len(documents) + 1}{INVOICE_CONTENT_TYPES[content_type]}"
+        documents.append(DocumentBytes(os.path.basename(name), data))
+    return documents
+
+def body_text(message):
+    """Plain-text body, or the HTML body reduced to text"""
+    body = message.get_body(preferencelist=('plain', 'html'))
+    if body is None:
+        return ''
+    try:
+        content = body.get_content()
+    except (LookupError, UnicodeDecodeError):
+        content = body.get_payload(decode=True).decode('utf-8', errors='replace')
+    return html_to_text(content) if body.get_content_type() == 'text/html' else content
+
+def message_id(message, location):
+    """Message-ID, or the location for messages that lack one"""
+    return (message.get('Message-ID') or '').strip() or location
+
+def attachment_hash(document):
+    return hashlib.sha256(document.data).hexdigest()
+
+class SeenMessages:
+    """Persisted sets of ingested Message-IDs and attachment content hashes"""
+
+    def __init__(self, path=SEEN_PATH):
+        self.path = path
+        self.ids = set()
+        self.attachments = set()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                seen = json.load(f)
+        except (OSError, ValueError):
+            return
+        # Earlier versions stored a bare list of Message-IDs
+        if isinstance(seen, list):
+            seen = {'messages': seen}
+        self.ids = set(seen.get('messages', ()))
+        self.attachments = set(seen.get('attachments', ()))
+
+    def __contains__(self, message_id):
+        return message_id in self.ids
+
+    def add(self, message_id):
+        self.ids.add(message_id)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path) or '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'messages': sorted(self.ids), 'attachments': sorted(self.attachments)}, f)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+def email_sources(paths, manifest):
+    """
+    Expand CLI paths into .eml, mbox and maildir sources.
+
+    Other directories are searched for .eml files: inside the manifest's
+    base folder only new or changed files are listed, elsewhere every file
+    is (already ingested messages are still skipped by Message-ID).
+    """
+    sources = []
+    for path in paths:
+        if not os.path.isdir(path) or is_maildir(path):
+            sources.append(path)
+            continue
+        path = os.path.abspath(path)
+        if os.path.commonpath([path, manifest.base_path]) == manifest.base_path:
+            sources += [found for found in manifest.scan(EMAIL_EXTENSIONS)
+                        if os.path.commonpath([path, found]) == path]
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            sources += [os.path.join(root, name) for name in sorted(files) if name.lower().endswith(EMAIL_EXTENSIONS)]
+    return sources
+
+class EmailIngest:
+    """
+    Stream messages -> documents -> extraction -> ledger rows.
+
+    Attachments enter extract_texts as a generator, so only max_pending of
+    them are held in memory at a time however large the mailbox is; the
+    deque pairs each result with the message it came from. A message's
+    rows wait in partial, keyed by the message's location, until its last
+    attachment is back, so only whole messages are committed: every
+    commit_every messages their rows are appended, then their Message-IDs
+    and attachment hashes are marked seen. Messages repeating a Message-ID
+    seen earlier in the run, attachments whose name is already a ledger row
+    and attachments whose content was ingested before are skipped.
+    """
+
+    def __init__(self, ledger, seen, workers=None, cache=None, commit_every=COMMIT_EVERY, dry_run=False):
+        self.ledger = ledger
+        self.seen = seen
+        self.workers = workers
+        self.cache = cache
+        self.commit_every = commit_every
+        self.dry_run = dry_run
+        self.stats = ExtractionStats()
+        self.ledger_names = ledger.keys()
+        # message location -> (message id, rows, attachment hashes) until its last attachment is extracted
+        self.partial = {}
+        self.ids_this_run = set()
+        self.hashes_this_run = set()
+        self.rows = []
+        self.pending_ids = []
+        self.pending_hashes = []
+        self.messages = 0
+        self.skipped = 0
+        self.duplicates = 0
+        self.ingested_rows = 0
+
+    def _documents(self, sources, origins):
+        """Yield attachments in order, recording (message location, last of message) for each"""
+        for source in sources:
+            for location, message in iter_messages(source):
+                identifier = message_id(message, location)
+                if identifier in self.seen or identifier in self.ids_this_run:
+                    self.skipped += 1
+                    continue
+                self.ids_this_run.add(identifier)
+                self.messages += 1
+                self.partial[location] = (identifier, [], [])
+                documents = attachment_documents(message)
+                if not documents:
+                    # No invoice attached: the confirmation text itself is the record
+                    self._add_row(location, location, os.path.basename(location), body_text(message), 'text')
+                    self._message_done(location)
+                    continue
+                documents = [document for document in documents if self._is_new(location, document)]
+                if not documents:
+                    self._message_done(location)
+                    continue
+                for position, document in enumerate(documents):
+                    origins.append((location, position == len(documents) - 1))
+                    yield document
+
+    def _is_new(self, message_location, document):
+        """False for attachments the ledger already holds (by name) or that were ingested before (by content)"""
+        digest = attachment_hash(document)
+        if document.name in self.ledger_names:
+            reason = 'already in the ledger'
+        elif digest in self.seen.attachments:
+            reason = 'ingested by an earlier run'
+        elif digest in self.hashes_this_run:
+            reason = 'repeats an earlier attachment'
+        else:
+            self.hashes_this_run.add(digest)
+            self.partial[message_location][2].append(digest)
+            return True
+        print(f"  - {document.name}: {reason}")
+        self.duplicates += 1
+        return False
+
+    def _add_row(self, message_location, location, filename, text, source):
+        if text:
+            self.partial[message_location][1].append(batch_process.build_row(location, filename, text, source))
+            print(f"  ✓ {filename}")
+        else:
+            print(f"  ✗ Could not extract text: {filename}")
+
+    def _message_done(self, message_location):
+        identifier, rows, hashes = self.partial.pop(message_location)
+        self.rows += rows
+        self.pending_hashes += hashes
+        self.pending_ids.append(identifier)
+        if len(self.pending_ids) >= self.commit_every:
+            self.commit()
+
+    def commit(self):
+        """Append the rows of finished messages, then remember those messages and attachments"""
+        if self.rows and not self.dry_run:
+            self.ledger.append_rows(self.rows)
+            self.ledger_names.update(row['File Name'] for row in self.rows)
+        self.ingested_rows += len(self.rows)
+        if not self.dry_run:
+            for identifier in self.pending_ids:
+                self.seen.add(identifier)
+            self.seen.attachments.update(self.pending_hashes)
+            self.seen.save()
+        self.rows = []
+        self.pending_ids = []
+        self.pending_hashes = []
+
+    def run(self, sources):
+        origins = deque()
+        documents = self._documents(sources, origins)
+        for result in extract_texts(documents, workers=self.workers, stats=self.stats, cache=self.cache):
+            location, last = origins.popleft()
+            name = result['path'].name
+            self._add_row(location, f"{location}#{name}", name, result['text'], result['source'])
+            if last:
+                self._message_done(location)
+        self.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description='Ingest booking confirmations from .eml files, mbox files or maildirs')
+    parser.add_argument('sources', nargs='*', help='.eml/mbox files, maildirs, or folders to scan for .eml '
+                                                   '(default: the Invoices folder)')
+    parser.add_argument('--workers', type=int, default=None, help='extraction processes (default: CPU count)')
+    parser.add_argument('--commit-every', type=int, default=COMMIT_EVERY, help='messages per ledger transaction')
+    parser.add_argument('--no-cache', action='store_true', help='always re-extract instead of using the text cache')
+    parser.add_argument('--dry-run', action='store_true', help='extract and print without touching the ledger')
+    args = parser.parse_args()
+
+    ledger = LedgerStore(batch_process.csv_path)
+    manifest = InvoiceManifest(default_manifest_path('email_ingest'), batch_process.base_path, EXTRACTOR_VERSION)
+    sources = email_sources(args.sources or [batch_process.base_path], manifest)
+    print(f"Reading {len(sources)} email sources...\n")
+
+    ingest = EmailIngest(ledger, SeenMessages(), workers=args.workers, cache=None if args.no_cache else TextCache(),
+                         commit_every=args.commit_every, dry_run=args.dry_run)
+    ingest.run(sources)
+
+    if not args.dry_run:
+        for source in sources:
+            if source.lower().endswith(EMAIL_EXTENSIONS) and os.path.isfile(source):
+                manifest.record(source)
+        manifest.save()
+        ledger.maybe_compact()
+
+    print(f"\nExtraction throughput:\n{ingest.stats.report()}")
+    print(f"\n{ingest.messages} new messages ({ingest.skipped} already ingested), "
+          f"{ingest.duplicates} duplicate attachments skipped, "
+          f"{ingest.ingested_rows} ledger rows{' (dry run)' if args.dry_run else ''}")
+
+if __name__ == "__main__":
+    main()
@@ -1,60 +1,31 @@
-import pandas as pd
-import fitz  # PyMuPDF
-from PIL import Image
-import pytesseract
 import re
-import os
+import sys
 
-def extract_text_from_file(file_path):
-    """Extract text from PDF or image file"""
-    text = ""
-    if file_path.lower().endswith('.pdf'):
-        try:
-            doc = fitz.open(file_path)
-            for page in doc:
-                text += page.get_text()
-            doc.close()
-        except:
-            pass
-    elif file_path.lower().endswith(('.png', '.jpg', '.jpeg')):
-        try:
-            image = Image.open(file_path)
-            text = pytesseract.image_to_string(image)
-        except:
-            pass
-    return text
+from field_extractor import extract_fields, field_value
+
+# Fallback patterns, compiled once
+TICKET_LINE_RE = re.compile(r'(?:Ticket|tickets?).*?(\d+)\s+(?:OTH|EA|NOS|nos)', re.IGNORECASE | re.DOTALL)
+SEAT_RANGE_RE = re.compile(r'([A-Z]+-?\d+|[A-Z]+\s*\d+)[\s,]+(?:to|thru|-)\s+([A-Z]+-?\d+|[A-Z]+\s*\d+)', re.IGNORECASE)
+SEAT_GROUP_RE = re.compile(r'[A-Z]{1,3}-?\d+(?:\s+[A-Z]{1,3}-?\d+)*')
+SEAT_RE = re.compile(r'[A-Z]{1,3}-?\d+')
+DIGITS_RE = re.compile(r'\d+')
+TICKETS_COLON_RE = re.compile(r'(\d+)\s+tickets?:', re.IGNORECASE)
+QTY_COLUMN_RE = re.compile(r'(?:Qty|Quantity|No\.|Nos)\s*\n\s*(\d+)', re.IGNORECASE)
 
 def extract_quantity(text, filename, amount=None):
     """Extract quantity from invoice text using multiple patterns"""
     
     # If it's a convenience/service fee, usually quantity is 1
-    if 'fee' in filename.lower() or 'convenience fee' in text.lower() or 'service fee' in text.lower() or 'booking fee' in text.lower():
+    text_lower = text.lower()
+    if 'fee' in filename.lower() or 'convenience fee' in text_lower or 'service fee' in text_lower or 'booking fee' in text_lower:
         return 1
     
-    quantity = None
-    
-    # Pattern 1: Direct quantity mentions (X tickets, X Nos, etc.)
-    patterns = [
-        r'(\d+)\s+tickets?\b(?!\s+x)',
-        r'Quantity[\s:]+(\d+)',
-        r'\bQty[\s:]+(\d+)',
-        r'(\d+)\s+Nos\b',
-        r'(\d+)\s+nos\b',
-        r'(\d+)\s+EA\b',
-        r'(\d+)\s+OTH\b',
-        r'Total Qty[\s:]+(\d+)',
-        r'No\.?\s+of\s+tickets?[\s:]+(\d+)'
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            quantity = int(match.group(1).replace(',', ''))
-            break
+    # Pattern 1: Direct quantity mentions (X tickets, X Nos, etc.), one pass
+    quantity = field_value(extract_fields(text, fields=('quantity',)), 'quantity')
     
     # Pattern 2: Sum up multiple ticket line items
     if not quantity:
-        ticket_lines = re.findall(r'(?:Ticket|tickets?).*?(\d+)\s+(?:OTH|EA|NOS|nos)', text, re.IGNORECASE | re.DOTALL)
+        ticket_lines = TICKET_LINE_RE.findall(text)
         if ticket_lines:
             try:
                 total = sum(int(q.replace(',', '')) for q in ticket_lines)
@@ -65,13 +36,13 @@ def extract_quantity(text, filename, amount=None):
     
     # Pattern 3: Extract from seat numbers (e.g., T-32 to T-41)
     if not quantity:
-        seat_ranges = re.findall(r'([A-Z]+-?\d+|[A-Z]+\s*\d+)[\s,]+(?:to|thru|-)\s+([A-Z]+-?\d+|[A-Z]+\s*\d+)', text, re.IGNORECASE)
+        seat_ranges = SEAT_RANGE_RE.findall(text)
         if seat_ranges:
             total_seats = 0
             for start, end in seat_ranges:
                 try:
-                    start_num = int(re.search(r'\d+', start).group())
-                    end_num = int(re.search(r'\d+', end).group())
+                    start_num = int(DIGITS_RE.search(start).group())
+                    end_num = int(DIGITS_RE.search(end).group())
                     total_seats += abs(end_num - start_num) + 1
                 except:
                     pass
@@ -80,11 +51,11 @@ def extract_quantity(text, filename, amount=None):
     
     # Pattern 4: Count individual seat mentions (e.g., EEE-5 EEE-6)
     if not quantity:
-        individual_seats = re.findall(r'[A-Z]{1,3}-?\d+(?:\s+[A-Z]{1,3}-?\d+)*', text)
+        individual_seats = SEAT_GROUP_RE.findall(text)
         if individual_seats:
             seat_count = 0
             for seat_group in individual_seats[:5]:  # Check first 5 matches
-                seats = re.findall(r'[A-Z]{1,3}-?\d+', seat_group)
+                seats = SEAT_RE.findall(seat_group)
                 if 1 <= len(seats) <= 20:  # Reasonable seat count
                     seat_count = max(seat_count, len(seats))
             if seat_count > 0:
@@ -102,61 +73,25 @@ def extract_quantity(text, filename, amount=None):
     # Pattern 6: Extract quantity from specific formats
     if not quantity:
         # Look for patterns like "10 tickets: BKT Tires"
-        match = re.search(r'(\d+)\s+tickets?:', text, re.IGNORECASE)
+        match = TICKETS_COLON_RE.search(text)
         if match:
             quantity = int(match.group(1))
     
     # Pattern 7: Table quantity column
     if not quantity:
         # Look for quantity in table format
-        match = re.search(r'(?:Qty|Quantity|No\.|Nos)\s*\n\s*(\d+)', text, re.IGNORECASE)
+        match = QTY_COLUMN_RE.search(text)
         if match:
             quantity = int(match.group(1))
     
     return quantity
 
-# Read CSV
-csv_path = '/Users/sumitjha/Dropbox/Mac/Documents/Projects/fpl-auction/IPL_Event_Invoices_Complete.csv'
-df = pd.read_csv(csv_path)
-
-# Find files with unspecified quantities
-unspecified = df[(df['Ticket Quantity'] == 'Not specified') | (df['Ticket Quantity'] == 'Various')].copy()
-
-print(f'Found {len(unspecified)} files with unspecified quantities')
-print('\nProcessing files to extract quantities:\n')
+def main():
+    """Backfill unspecified ticket quantities; see backfill.py for other fields and filters"""
+    # Imported here: backfill uses extract_quantity from this module
+    import backfill
+    backfill.main(['--field', 'quantity', '--where', 'Ticket Quantity', 'in', 'Not specified,Various']
+                  + sys.argv[1:])
 
-updates = []
-for idx in unspecified.index:
-    row = df.loc[idx]
-    filename = row['File Name']
-    file_path = '/Users/sumitjha/Dropbox/Mac/Documents/Projects/fpl-auction/Invoices/processed/' + filename
-    
-    if not os.path.exists(file_path):
-        print(f'File not found: {filename}')
-        continue
-    
-    try:
-        text = extract_text_from_file(file_path)
-        amount = row['Ticket Price'] if pd.notna(row['Ticket Price']) else None
-        quantity = extract_quantity(text, filename, amount)
-        
-        if quantity:
-            print(f'{filename}: Quantity = {quantity}')
-            updates.append({'index': idx, 'quantity': quantity})
-        else:
-            print(f'{filename}: Could not extract quantity')
-            
-    except Exception as e:
-        print(f'Error processing {filename}: {str(e)}')
-
-print(f'\n\nSummary: Found quantities for {len(updates)} out of {len(unspecified)} files')
-
-# Update the CSV
-if updates:
-    print('\nUpdating CSV with extracted quantities...')
-    for update in updates:
-        df.at[update['index'], 'Ticket Quantity'] = update['quantity']
-    
-    # Save updated CSV
-    df.to_csv(csv_path, index=False)
-    print(f'CSV updated successfully with {len(updates)} quantity values')
\ No newline at end of file
+if __name__ == "__main__":
+    main()
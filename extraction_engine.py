@@ -0,0 +1,502 @@
+#!/usr/bin/env python3
+"""
+Parallel text extraction engine for invoice PDFs and images
+Fans PyMuPDF parsing and Tesseract OCR out over a process pool
+"""
+
+import io
+import mmap
+import os
+import time
+import unicodedata
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager
+
+import fitz  # PyMuPDF
+
+from field_extractor import FieldScanner, is_fee_invoice
+from ocr_pipeline import ocr_image
+from ocr_service import default_service
+
+PDF_EXTENSIONS = ('.pdf',)
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+INVOICE_EXTENSIONS = PDF_EXTENSIONS + IMAGE_EXTENSIONS
+
+# Bump whenever extraction output changes so cached text is invalidated
+EXTRACTOR_VERSION = "4"
+
+# Result sources: "pdf" (text layer only), "pdf+ocr" (some pages were
+# scans) and "ocr" (images); the last two are less trustworthy
+OCR_SOURCES = ("ocr", "pdf+ocr")
+
+# Render resolution for OCR: aim for capitals OCR_CAP_HEIGHT px tall at the
+# page's body font size, or an OCR_PAGE_WIDTH px wide page when the font
+# size is unknown, within OCR_DPI_RANGE
+OCR_CAP_HEIGHT = 30
+OCR_PAGE_WIDTH = 1400
+OCR_DPI_RANGE = (150, 400)
+
+# Text-layer quality gate: pages over an image with fewer non-space
+# characters than MIN_PAGE_CHARS, or whose characters are mostly not
+# letters/digits or are undecodable glyphs, are OCRed instead
+MIN_PAGE_CHARS = 40
+MIN_ALNUM_RATIO = 0.6
+MAX_GARBLED_RATIO = 0.15
+# Embedded image formats PIL can open directly (JBIG2, JPX etc. are rendered instead)
+OCR_IMAGE_FORMATS = ('png', 'jpeg', 'jpg', 'tiff', 'bmp')
+
+# Fields that, once found, make the remaining PDF pages unnecessary
+REQUIRED_FIELDS = ('price', 'quantity', 'invoice_date', 'match')
+
+class DocumentBytes:
+    """
+    An invoice held in memory, e.g. an email attachment.
+
+    Accepted wherever a file path is: PDFs are opened from the buffer and
+    images are decoded from it, so nothing is written to a temp file. name
+    is the original filename, used for the extension and vendor detection.
+    """
+
+    __slots__ = ("name", "data")
+
+    def __init__(self, name, data):
+        self.name = name
+        self.data = data
+
+    def __repr__(self):
+        return f"DocumentBytes({self.name!r}, {len(self.data)} bytes)"
+
+def document_name(source):
+    """File name for a path or DocumentBytes"""
+    return source.name if isinstance(source, DocumentBytes) else os.path.basename(source)
+
+def _image_stream(source):
+    """What PIL should open: the path, or a named buffer for in-memory images"""
+    if not isinstance(source, DocumentBytes):
+        return source
+    stream = io.BytesIO(source.data)
+    stream.name = source.name
+    return stream
+
+def field_source(extraction_source):
+    """Provenance source ('ocr' or 'text') for a result's extraction source"""
+    return 'ocr' if extraction_source in OCR_SOURCES else 'text'
+
+@contextmanager
+def open_pdf(pdf_path):
+    """
+    Open a PDF path or DocumentBytes without copying it onto the heap.
+
+    Files are memory-mapped and handed to PyMuPDF as a memoryview, so the
+    bytes stay in the page cache and are faulted in only as pages are
+    parsed; worker RSS no longer grows with the size of a scanned bill.
+    """
+    if isinstance(pdf_path, DocumentBytes):
+        doc = fitz.open(stream=pdf_path.data, filetype="pdf")
+        try:
+            yield doc
+        finally:
+            doc.close()
+        return
+    with open(pdf_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        view = memoryview(mapped)
+        try:
+            doc = fitz.open(stream=view, filetype="pdf")
+            try:
+                yield doc
+            finally:
+                doc.close()
+                doc.stream = None
+        finally:
+            view.release()
+
+def is_image_only(page):
+    """
+    True for scanned pages: images but no fonts in the page resources.
+
+    Reading the resource dictionary is far cheaper than parsing the
+    content stream for text that cannot be there.
+    """
+    return not page.get_fonts() and bool(page.get_images())
+
+def _is_garbled(char):
+    """Replacement, private-use and control characters left by broken font encodings"""
+    return char == '\ufffd' or unicodedata.category(char) in ('Co', 'Cc', 'Cs')
+
+def text_layer_ok(text, has_images):
+    """
+    Quality gate for a page's text layer.
+
+    Sparse text over an image is a scan with a stamped header or footer;
+    a low share of letters/digits or many undecodable glyphs means the
+    font has no usable encoding. Sparse text on a page without images is
+    genuinely short and passes.
+    """
+    chars = [char for char in text if not char.isspace()]
+    if len(chars) < MIN_PAGE_CHARS:
+        return not has_images
+    alnum = sum(char.isalnum() for char in chars)
+    garbled = sum(_is_garbled(char) for char in chars)
+    return alnum / len(chars) >= MIN_ALNUM_RATIO and garbled / len(chars) <= MAX_GARBLED_RATIO
+
+def body_font_size(page):
+    """Most common span font size on the page (by characters), or None"""
+    sizes = {}
+    for block in page.get_text('dict')['blocks']:
+        for line in block.get('lines', ()):
+            for span in line['spans']:
+                size = round(span['size'])
+                sizes[size] = sizes.get(size, 0) + len(span['text'].strip())
+    sizes.pop(0, None)
+    return max(sizes, key=sizes.get) if sizes else None
+
+def ocr_dpi(page, font_size=None):
+    """Adaptive render resolution: small print and small pages get more pixels"""
+    if font_size:
+        # Capitals are roughly 0.7 of the font size
+        dpi = OCR_CAP_HEIGHT * 72 / (font_size * 0.7)
+    else:
+        dpi = OCR_PAGE_WIDTH * 72 / max(page.rect.width, 1)
+    low, high = OCR_DPI_RANGE
+    return int(min(max(dpi, low), high))
+
+def page_image(page, render=False, font_size=None):
+    """
+    Image bytes to OCR for a page.
+
+    On a scanned page a single embedded image is the scan itself and is
+    taken at its native resolution; otherwise (or with render, for pages
+    whose text layer failed the gate) the page is rendered at ocr_dpi.
+    """
+    images = page.get_images()
+    if not render and len(images) == 1:
+        embedded = page.parent.extract_image(images[0][0])
+        if embedded and embedded['ext'] in OCR_IMAGE_FORMATS:
+            return embedded['image']
+    return page.get_pixmap(dpi=ocr_dpi(page, font_size)).tobytes('png')
+
+def ocr_page(page, name, render=False, font_size=None):
+    """OCR one page in-process (we are already in a pool worker)"""
+    stream = io.BytesIO(page_image(page, render, font_size))
+    stream.name = name
+    try:
+        return ocr_image(stream)
+    except Exception:
+        return ""
+
+def iter_pdf_pages(pdf_path, start=0):
+    """
+    Lazily yield (page count, page text, page source) one page at a time.
+
+    Text pages come from the PDF text layer ('text'). Image-only pages,
+    and pages whose text layer fails text_layer_ok, are OCRed ('ocr');
+    if OCR finds nothing a failing text layer is kept as the best there
+    is. Pages before `start` are skipped. pdf_path may be DocumentBytes.
+    """
+    name = document_name(pdf_path)
+    with open_pdf(pdf_path) as doc:
+        for page in doc.pages(start):
+            if is_image_only(page):
+                yield doc.page_count, ocr_page(page, name), "ocr"
+                continue
+            text = page.get_text()
+            if text_layer_ok(text, bool(page.get_images())):
+                yield doc.page_count, text, "text"
+                continue
+            recognised = ocr_page(page, name, render=True, font_size=body_font_size(page))
+            if recognised.strip():
+                yield doc.page_count, recognised, "ocr"
+            else:
+                yield doc.page_count, text, "text"
+
+def extract_pages_from_pdf(pdf_path, required_fields=None, read=()):
+    """
+    Extract per-page text from PDF using PyMuPDF.
+
+    With required_fields, pages are fed to the field scanner as they are
+    read and extraction stops once every required field has a value; if
+    they never all resolve, every page is read. `read` holds (text,
+    source) pairs for leading pages already extracted, e.g. by an earlier
+    early-stopped read, and reading resumes after them. Returns (pages,
+    page count, page sources).
+    """
+    pages = [page_text for page_text, _ in read]
+    sources = [page_source for _, page_source in read]
+    page_count = len(pages)
+    scanner = None
+    if required_fields and pages:
+        scanner = FieldScanner(required_fields, fee=is_fee_invoice(pages[0], document_name(pdf_path)))
+        for page_text in pages:
+            scanner.feed(page_text)
+    try:
+        for page_count, page_text, page_source in iter_pdf_pages(pdf_path, start=len(pages)):
+            pages.append(page_text)
+            sources.append(page_source)
+            if required_fields and scanner is None:
+                # A fee invoice's price is only resolved by its fee total (see is_fee_invoice)
+                scanner = FieldScanner(required_fields, fee=is_fee_invoice(page_text, document_name(pdf_path)))
+            if scanner is not None:
+                scanner.feed(page_text)
+                if scanner.resolved():
+                    break
+    except Exception:
+        pass
+    return pages, page_count, sources
+
+def extract_text_from_pdf(pdf_path):
+    """Extract text from PDF using PyMuPDF"""
+    return "".join(extract_pages_from_pdf(pdf_path)[0])
+
+def extract_text_from_image(image_path):
+    """Extract text from image using the warm OCR service (see ocr_service)"""
+    try:
+        return default_service().ocr(_image_stream(image_path))
+    except Exception:
+        return ""
+
+def extract_document(file_path, required_fields=None, read=()):
+    """
+    Extract text and page-level metadata from a PDF or image.
+
+    required_fields enables early stopping for PDFs and `read` resumes a
+    partial read (see extract_pages_from_pdf); 'complete' is False when
+    pages were skipped. Scanned pages inside PDFs are OCRed page by page;
+    each page records whether its text came from the text layer or OCR.
+    """
+    lower_path = document_name(file_path).lower()
+    if lower_path.endswith(PDF_EXTENSIONS):
+        pages, page_count, page_sources = extract_pages_from_pdf(file_path, required_fields, read)
+        source = "pdf+ocr" if "ocr" in page_sources else "pdf"
+    elif lower_path.endswith(IMAGE_EXTENSIONS):
+        pages = [extract_text_from_image(file_path)]
+        page_sources = ["ocr"]
+        page_count = 1
+        source = "ocr"
+    else:
+        pages = []
+        page_sources = []
+        page_count = 0
+        source = "unsupported"
+    return {
+        "text": "".join(pages),
+        "pages": [{"page": number, "chars": len(page), "source": page_source}
+                  for number, (page, page_source) in enumerate(zip(pages, page_sources), 1)],
+        "page_count": page_count,
+        "complete": len(pages) >= page_count,
+        "source": source
+    }
+
+def extract_text(file_path):
+    """Extract text from a PDF or image based on its extension"""
+    return extract_document(file_path)["text"]
+
+def _extract_worker(file_path, required_fields=None, read=()):
+    """Pool entry point: extract one file and report which worker did it"""
+    start = time.perf_counter()
+    result = extract_document(file_path, required_fields, read)
+    result.update({
+        "path": file_path,
+        "seconds": time.perf_counter() - start,
+        "worker": os.getpid(),
+        "cached": False
+    })
+    return result
+
+def _image_result(file_path, text, seconds):
+    """Result dict for an image recognised by the OCR service"""
+    return {
+        "text": text,
+        "pages": [{"page": 1, "chars": len(text), "source": "ocr"}],
+        "page_count": 1,
+        "complete": True,
+        "source": "ocr",
+        "path": file_path,
+        "seconds": seconds,
+        "worker": "ocr",
+        "cached": False
+    }
+
+def _submit_image(service, file_path):
+    """Queue an image on the OCR service, returning a Future for its result dict"""
+    started = time.perf_counter()
+    result = Future()
+
+    def done(ocr_future):
+        try:
+            text = ocr_future.result()
+        except Exception:
+            text = ""
+        result.set_result(_image_result(file_path, text, time.perf_counter() - started))
+
+    service.submit(_image_stream(file_path)).add_done_callback(done)
+    return result
+
+def _read_pages(result):
+    """Split a result's text back into (page text, page source) pairs"""
+    read = []
+    offset = 0
+    for page in result["pages"]:
+        read.append((result["text"][offset:offset + page["chars"]], page["source"]))
+        offset += page["chars"]
+    return read
+
+def _cached_result(file_path, cache, required_fields=None):
+    """
+    Look a file up in the text cache, returning (key, result or None, read).
+
+    A partial entry left by an early-stopped read only serves callers whose
+    required_fields it was stopped for. Anyone else, including full-text
+    callers, gets a miss plus the pages already read so extraction resumes
+    after them.
+    """
+    try:
+        if isinstance(file_path, DocumentBytes):
+            key = cache.key_for_bytes(file_path.data, EXTRACTOR_VERSION)
+        else:
+            key = cache.key_for(file_path, EXTRACTOR_VERSION)
+    except OSError:
+        return None, None, ()
+    result = cache.get(key)
+    if result is None:
+        return key, None, ()
+    result.setdefault("page_count", len(result["pages"]))
+    result.setdefault("complete", True)
+    if not result["complete"] and not (required_fields and set(required_fields) <= set(result.get("required_fields", ()))):
+        return key, None, _read_pages(result)
+    result.update({"path": file_path, "seconds": 0.0, "worker": "cache", "cached": True})
+    return key, result, ()
+
+def _store_result(cache, key, result, required_fields=None):
+    """
+    Persist a freshly extracted result, skipping empty extractions.
+
+    Early-stopped results are stored with complete False and the
+    required_fields they resolved, so a later full read can finish them.
+    """
+    if cache is None or key is None or not result["text"]:
+        return
+    entry = {
+        "text": result["text"],
+        "pages": result["pages"],
+        "page_count": result["page_count"],
+        "complete": result["complete"],
+        "source": result["source"],
+        "extractor_version": EXTRACTOR_VERSION,
+        "file_name": document_name(result["path"])
+    }
+    if not result["complete"]:
+        entry["required_fields"] = sorted(required_fields or ())
+    cache.put(key, entry)
+
+class ExtractionStats:
+    """Per-worker throughput counters for an extraction run"""
+
+    def __init__(self):
+        self.workers = {}
+        self.started = time.perf_counter()
+        self.files = 0
+        self.pages_read = 0
+        self.pages_total = 0
+        self.pages_ocr = 0
+        self.ocr = None
+
+    def record(self, result):
+        """Account one finished extraction against its worker"""
+        worker = self.workers.setdefault(result["worker"], {"files": 0, "seconds": 0.0})
+        worker["files"] += 1
+        worker["seconds"] += result["seconds"]
+        self.files += 1
+        self.pages_read += len(result["pages"])
+        self.pages_total += result["page_count"]
+        self.pages_ocr += sum(1 for page in result["pages"] if page.get("source") == "ocr")
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def report(self):
+        """Return printable throughput lines, one per worker plus a total"""
+        lines = []
+        for pid, worker in sorted(self.workers.items(), key=lambda item: str(item[0])):
+            if pid == "cache":
+                lines.append(f"  cache: {worker['files']} files served without extraction")
+                continue
+            rate = worker["files"] / worker["seconds"] if worker["seconds"] else 0.0
+            lines.append(f"  worker {pid}: {worker['files']} files, "
+                         f"{worker['seconds']:.2f}s busy, {rate:.2f} files/sec")
+        elapsed = self.elapsed()
+        rate = self.files / elapsed if elapsed else 0.0
+        lines.append(f"  total: {self.files} files in {elapsed:.2f}s ({rate:.2f} files/sec), "
+                     f"{self.pages_read} of {self.pages_total} pages read ({self.pages_ocr} by OCR)")
+        if self.ocr is not None:
+            lines.append(self.ocr.report())
+        return "\n".join(lines)
+
+def submit_document(pool, file_path, required_fields=None, cache=None, stats=None):
+    """
+    Start extracting one file, returning an entry for finish_document.
+
+    Cached files resolve immediately, images go to the OCR service and
+    everything else to the process pool.
+    """
+    key, result, read = _cached_result(file_path, cache, required_fields) if cache is not None else (None, None, ())
+    if result is not None:
+        return key, result, required_fields
+    if document_name(file_path).lower().endswith(IMAGE_EXTENSIONS):
+        service = default_service()
+        if stats is not None:
+            stats.ocr = service.stats
+        return key, _submit_image(service, file_path), required_fields
+    return key, pool.submit(_extract_worker, file_path, required_fields, read), required_fields
+
+def finish_document(entry, cache=None):
+    """Wait for an entry from submit_document and cache the fresh result"""
+    key, item, required_fields = entry
+    if isinstance(item, dict):
+        return item
+    result = item.result()
+    _store_result(cache, key, result, required_fields)
+    return result
+
+def extract_texts(file_paths, workers=None, max_pending=None, stats=None, cache=None, required_fields=None):
+    """
+    Yield extraction results for file_paths (paths or DocumentBytes) in input order.
+
+    Files are fanned out over a process pool; at most max_pending files are
+    in flight at once so memory stays bounded on large batches. workers=1
+    runs in-process without a pool. When a TextCache is given, files whose
+    content hash is already cached are served without extraction. With
+    required_fields, PDFs stop being read once those fields are found;
+    such partial results are cached as incomplete and finished by the
+    next caller that needs more than they hold. Images bypass the process pool
+    and go to the shared OCR service, which batches them on warm engines.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 4
+    stats = stats if stats is not None else ExtractionStats()
+
+    if workers == 1:
+        for file_path in file_paths:
+            key, result, read = _cached_result(file_path, cache, required_fields) if cache is not None else (None, None, ())
+            if result is None:
+                result = _extract_worker(file_path, required_fields, read)
+                _store_result(cache, key, result, required_fields)
+                if result["source"] == "ocr":
+                    stats.ocr = default_service().stats
+            stats.record(result)
+            yield result
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Entries are (cache key, cached result or Future, required fields), kept in input order
+        pending = deque()
+        for file_path in file_paths:
+            pending.append(submit_document(pool, file_path, required_fields, cache, stats))
+            if len(pending) >= max_pending:
+                result = finish_document(pending.popleft(), cache)
+                stats.record(result)
+                yield result
+        while pending:
+            result = finish_document(pending.popleft(), cache)
+            stats.record(result)
+            yield result
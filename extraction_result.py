@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Structured extraction results with per-field confidence and provenance
+Every extracted field carries its value, where it came from (text, OCR,
+filename, schedule or a default), the pattern that matched, the character
+span and a confidence score. The provenance serialises to one compact JSON
+cell next to the ledger row, so a review pass can re-run only the fields
+that scored low instead of the whole document
+"""
+
+import json
+from dataclasses import dataclass
+
+from field_extractor import FIELDS
+from vendor_parsers import REGISTRY
+
+# Single-letter source codes keep the stored provenance small
+SOURCE_CODES = {'text': 't', 'ocr': 'o', 'filename': 'f', 'schedule': 's', 'default': 'd'}
+SOURCES = {code: source for source, code in SOURCE_CODES.items()}
+
+HIGH_CONFIDENCE = 80
+MEDIUM_CONFIDENCE = 50
+
+# Top-priority text patterns start at TEXT_CONFIDENCE and lose
+# PRIORITY_PENALTY per step down the field's pattern list; OCR text is
+# less trustworthy than a PDF text layer
+TEXT_CONFIDENCE = 95
+PRIORITY_PENALTY = 10
+MIN_PATTERN_CONFIDENCE = 45
+OCR_PENALTY = 15
+SOURCE_CONFIDENCE = {'filename': 60, 'schedule': 85, 'default': 0}
+
+def field_confidence(source, priority=0):
+    """Confidence for a value found by a pattern of the given priority (0 = best)"""
+    if source in SOURCE_CONFIDENCE:
+        return SOURCE_CONFIDENCE[source]
+    confidence = max(MIN_PATTERN_CONFIDENCE, TEXT_CONFIDENCE - PRIORITY_PENALTY * priority)
+    return confidence - OCR_PENALTY if source == 'ocr' else confidence
+
+def confidence_level(confidence):
+    if confidence >= HIGH_CONFIDENCE:
+        return 'High'
+    if confidence >= MEDIUM_CONFIDENCE:
+        return 'Medium'
+    return 'Low'
+
+@dataclass(slots=True)
+class FieldResult:
+    value: object = None
+    source: str = 'default'
+    pattern: str = None
+    span: tuple = None
+    confidence: int = 0
+
+    def to_compact(self):
+        """[source code, pattern, start, end, confidence]; the value lives in the ledger row"""
+        start, end = self.span if self.span else (None, None)
+        return [SOURCE_CODES[self.source], self.pattern, start, end, self.confidence]
+
+    @classmethod
+    def from_compact(cls, compact, value=None):
+        code, pattern, start, end, confidence = compact
+        return cls(value, SOURCES[code], pattern, None if start is None else (start, end), confidence)
+
+class ExtractionResult:
+    """Ordered {field: FieldResult} for one invoice"""
+
+    __slots__ = ("fields",)
+
+    def __init__(self, fields=None):
+        self.fields = dict(fields or {})
+
+    def __contains__(self, field):
+        return field in self.fields
+
+    def __getitem__(self, field):
+        return self.fields[field]
+
+    def value(self, field, default=None):
+        found = self.fields.get(field)
+        return default if found is None or found.value is None else found.value
+
+    def set(self, field, value, source, pattern=None, span=None, confidence=None):
+        """Record a field; confidence defaults to field_confidence(source)"""
+        self.fields[field] = FieldResult(value, source, pattern, span,
+                                         field_confidence(source) if confidence is None else confidence)
+
+    def add_matches(self, found, source='text'):
+        """Record field_extractor matches ({field: {'value', 'pattern', 'span', 'priority'}})"""
+        for field, match in found.items():
+            self.fields[field] = FieldResult(match['value'], source, match['pattern'], match['span'],
+                                             field_confidence(source, match.get('priority', 0)))
+
+    def confidence(self, fields=None):
+        """Overall confidence: the weakest of fields (default: every field)"""
+        return min((found.confidence for field, found in self.fields.items() if fields is None or field in fields),
+                   default=0)
+
+    def confidence_level(self, fields=None):
+        return confidence_level(self.confidence(fields))
+
+    def low_confidence(self, threshold=HIGH_CONFIDENCE):
+        """Fields scoring below threshold"""
+        return [field for field, found in self.fields.items() if found.confidence < threshold]
+
+    def to_compact(self):
+        """One JSON cell: {field: [source code, pattern, start, end, confidence]}"""
+        return json.dumps({field: found.to_compact() for field, found in self.fields.items()},
+                          separators=(',', ':'), ensure_ascii=False)
+
+    @classmethod
+    def from_compact(cls, compact, values=None):
+        """Rebuild from to_compact() output, taking values from {field: value}"""
+        values = values or {}
+        return cls({field: FieldResult.from_compact(entry, values.get(field))
+                    for field, entry in json.loads(compact).items()})
+
+def reextract(result, text, threshold=HIGH_CONFIDENCE, source='text', fields=FIELDS, filename=None):
+    """
+    Re-run the patterns for result's low-confidence fields only.
+
+    Fields go through the vendor parser that batch_process would pick for
+    filename and text, so new and stored confidences are on one scale.
+    fields limits which field_extractor fields may be re-run. A field is
+    replaced when the new match is more confident than the stored one.
+    Returns the fields that changed.
+    """
+    fields = tuple(field for field in result.low_confidence(threshold) if field in fields)
+    if not fields or not text:
+        return []
+    candidate = ExtractionResult()
+    candidate.add_matches(REGISTRY.parse(text, filename, fields=fields)[1], source)
+    changed = []
+    for field, found in candidate.fields.items():
+        if found.confidence > result[field].confidence:
+            result.fields[field] = found
+            changed.append(field)
+    return changed
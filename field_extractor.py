@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Single-pass field extraction for invoice text
+All field patterns are compiled once and indexed by trigger word; each
+document is tokenized in one pass and a pattern is only tried around the
+words that can start or end it, so adding patterns does not add scans
+"""
+
+import re
+from datetime import datetime
+from functools import lru_cache
+
+# Full team names as printed on invoices, mapped to schedule codes
+IPL_TEAMS = {
+    "CSK": ["Chennai Super Kings", "CSK"],
+    "MI": ["Mumbai Indians", "MI"],
+    "RCB": ["Royal Challengers Bengaluru", "Royal Challengers Bangalore", "RCB"],
+    "DC": ["Delhi Capitals", "DC"],
+    "GT": ["Gujarat Titans", "GT"],
+    "KKR": ["Kolkata Knight Riders", "KKR"],
+    "LSG": ["Lucknow Super Giants", "LSG"],
+    "PBKS": ["Punjab Kings", "PBKS"],
+    "RR": ["Rajasthan Royals", "RR"],
+    "SRH": ["Sunrisers Hyderabad", "SRH"]
+}
+
+TEAM_CODES = {alias.lower(): code for code, aliases in IPL_TEAMS.items() for alias in aliases}
+_TEAM_ALTERNATION = "|".join(sorted((re.escape(alias) for aliases in IPL_TEAMS.values() for alias in aliases),
+                                    key=len, reverse=True))
+
+NUMBER = r"[\d,]+\.?\d*"
+MONTHS = r"(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*"
+MONTH_WORDS = ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "sept", "oct", "nov", "dec",
+               "january", "february", "march", "april", "june", "july", "august", "september",
+               "october", "november", "december"]
+
+# One pass over the document: every letter run (and the rupee sign) is a
+# candidate trigger word
+TOKEN_RE = re.compile(r"[^\W\d_]+|₹")
+
+# One word of a stand's name; numbers, ordinals and months are not
+# ('6th May 24 Sachin T Stand' names 'Sachin T Stand')
+_NAME_WORD = r"(?:&|(?!(?:" + "|".join(MONTH_WORDS) + r")\b)[^\W\d_]+\.?)"
+
+def _named_stand(keyword, suffix=""):
+    """
+    A stand name ending in keyword: up to four name words before it on its
+    line or, when keyword starts a line ('GARWARE\nSTAND'), ending the
+    line before. A bare keyword is a column heading, not a name.
+    """
+    return (r"\b(?P<value>(?:(?:" + _NAME_WORD + r"[ \t]+){1,4}|(?:" + _NAME_WORD + r"[ \t]+){0,3}" + _NAME_WORD +
+            r"[ \t]*\n[ \t]*)" + keyword + suffix + r")(?!\w)")
+
+# How far around a trigger word a pattern may reach
+WINDOW_BEFORE = 120
+WINDOW_AFTER = 200
+
+# (field, pattern name, trigger words, regex) in priority order within each
+# field. The (?P<value>...) group holds the value; the regex is only tried
+# around occurrences of its trigger words. Patterns are matched
+# case-insensitively unless they carry their own inline flags.
+FIELD_PATTERNS = [
+    # Ticket quantity (same priority as extract_quantities.extract_quantity)
+    ("quantity", "tickets", ["ticket", "tickets"], r"(?P<value>\d+)\s+tickets?\b(?!\s+x)"),
+    ("quantity", "quantity", ["quantity"], r"Quantity[\s:]+(?P<value>\d+)"),
+    ("quantity", "qty", ["qty"], r"\bQty[\s:]+(?P<value>\d+)"),
+    ("quantity", "nos", ["nos"], r"(?P<value>\d+)\s+Nos\b"),
+    ("quantity", "ea", ["ea"], r"(?P<value>\d+)\s+EA\b"),
+    ("quantity", "oth", ["oth"], r"(?P<value>\d+)\s+OTH\b"),
+    ("quantity", "total_qty", ["total"], r"Total Qty[\s:]+(?P<value>\d+)"),
+    ("quantity", "no_of_tickets", ["no"], r"No\.?\s+of\s+tickets?[\s:]+(?P<value>\d+)"),
+
+    # Amount paid; explicit payment lines win over the largest currency amount
+    ("price", "payment_amount", ["payment"], r"Payment Amount:\s*₹\s*(?P<value>" + NUMBER + ")"),
+    ("price", "amount_paid", ["amount"], r"Amount Paid[:\s]+₹\s*(?P<value>" + NUMBER + ")"),
+    ("price", "rupee", ["₹"], r"₹\s*(?P<value>" + NUMBER + ")"),
+    ("price", "rs", ["rs"], r"\bRs\.?\s*(?P<value>" + NUMBER + ")"),
+    ("price", "inr", ["inr"], r"\bINR\s*(?P<value>" + NUMBER + ")"),
+    ("price", "total", ["total"], r"Total[^\n]*?(?P<value>\d[\d,]*\.?\d*)"),
+    ("price", "amount", ["amount"], r"Amount[^\n]*?(?P<value>\d[\d,]*\.?\d*)"),
+    # The invoice total printed just above its amount in words ('1721.62\nOne Thousand ... Rupee(s) ...')
+    ("price", "words_total", ["rupee", "rupees"], r"(?P<value>\d[\d,]*\.\d{2})[ \t]*\n[^\n]*?\bRupees?\b"),
+
+    # Stand / seating block
+    ("stand", "block_bay", ["block"], r"(?-i:(?P<value>BLOCK [A-Z] BAY \d+-[A-Z]+))"),
+    ("stand", "bkt_lower_block", ["bkt"], r"(?-i:(?P<value>BKT Tires Lower Block \d+))"),
+    ("stand", "knights_pav", ["knights"], r"(?-i:(?P<value>Knights Pav Corp))"),
+    ("stand", "stand", ["stand"], _named_stand("Stand", r"(?:[ \t]+BLK[ \t]+[A-Z](?:[ \t]+L\d)?)?")),
+    ("stand", "terrace", ["terrace"], _named_stand(r"(?:\(Terrace\)|Terrace)")),
+    ("stand", "lounge", ["lounge"], _named_stand("Lounge")),
+    ("stand", "block", ["block"], r"\b(?P<value>Block\s+\w+)"),
+    ("stand", "phase", ["phase"], r"\b(?P<value>Phase\s+\d+)"),
+    ("stand", "gate", ["gate"], r"\b(?P<value>Gate\s+\d+)"),
+
+    # Match / event
+    ("match", "teams", ["vs"], r"\b(?P<value>(?:" + _TEAM_ALTERNATION + r")\s+vs\.?\s+(?:" + _TEAM_ALTERNATION + r"))\b"),
+    ("match", "cwc_final", ["winner"], r"(?P<value>WINNER OF SEMI-FINAL 1 vs WINNER OF SEMI-FINAL 2)"),
+    ("match", "qualifier", ["qualifier"], r"\b(?P<value>Qualifier\s*[12])\b"),
+    ("match", "eliminator", ["eliminator"], r"\b(?P<value>Eliminator)\b"),
+    ("match", "final", ["final"], r"(?<!semi-)(?<!semi )\b(?P<value>Final)\b"),
+    ("match", "vs", ["vs"], r"\b(?P<value>\w+\s+vs\.?\s+\w+)"),
+
+    # Invoice date
+    ("invoice_date", "date_of_issue", ["date"], r"Date of issue[:\s]+(?P<value>[^\n]+)"),
+    ("invoice_date", "invoice_date", ["invoice"],
+     r"Invoice Date[:\s]+(?P<value>\d{1,2}[/-]\w+[/-]\d{2,4}|\d{1,2}\s+" + MONTHS + r"\s+\d{4})"),
+    ("invoice_date", "dated", ["date", "dated"], r"Date[d]?\s*:?\s*(?P<value>\d{1,2}[/-]\w+[/-]\d{2,4})"),
+    ("invoice_date", "day_month_year", MONTH_WORDS, r"\b(?P<value>\d{1,2}\s+" + MONTHS + r",?\s+\d{4})\b"),
+]
+
+FIELDS = tuple(dict.fromkeys(field for field, _, _, _ in FIELD_PATTERNS))
+
+# Fields that take the largest value seen for the winning pattern rather
+# than its first match (mirrors process_invoices.extract_price)
+MAX_VALUE_PATTERNS = {("price", "rupee"), ("price", "rs"), ("price", "inr"),
+                      ("price", "total"), ("price", "amount")}
+
+# Convenience-fee invoices also print the whole booking payment ('Amount of
+# Payment: ..., Rs. 61725.62/-'); their price may only come from the total
+# printed above the amount in words
+FEE_PRICE_PATTERNS = frozenset({("price", "words_total")})
+
+DATE_FORMATS = ['%a, %d %b %Y', '%d %b %Y', '%d %B %Y', '%d %b, %Y', '%d %B, %Y',
+                '%d/%m/%Y', '%d-%m-%Y', '%d/%m/%y', '%d-%m-%y', '%d-%b-%Y', '%d/%b/%Y']
+
+def _to_int(raw):
+    value = int(raw.replace(',', ''))
+    return value if value > 0 else None
+
+def _to_float(raw):
+    cleaned = raw.replace(',', '').rstrip('.')
+    return float(cleaned) if cleaned else None
+
+def _to_stand(raw):
+    return " ".join(raw.split()) or None
+
+def _to_match(raw):
+    """Normalise 'Lucknow Super Giants vs Gujarat Titans' to 'LSG vs GT'"""
+    parts = re.split(r"\s+vs\.?\s+", raw.strip(), flags=re.IGNORECASE)
+    if len(parts) == 2:
+        teams = [TEAM_CODES.get(" ".join(part.split()).lower(), part) for part in parts]
+        return f"{teams[0]} vs {teams[1]}"
+    return " ".join(raw.split()).title()
+
+def _to_date(raw):
+    """Parse an invoice date into YYYY-MM-DD, or None if unrecognised"""
+    candidate = " ".join(raw.strip().split())
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(candidate, date_format).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    # 'Sat, 30 Mar 2024 10:15 AM' and similar: retry on the leading date part
+    leading = re.match(r"(?:\w{3},\s*)?\d{1,2}\s+\w+,?\s+\d{4}", candidate)
+    if leading and leading.group(0) != candidate:
+        return _to_date(leading.group(0))
+    return None
+
+NORMALIZERS = {
+    "quantity": _to_int,
+    "price": _to_float,
+    "stand": _to_stand,
+    "match": _to_match,
+    "invoice_date": _to_date
+}
+
+@lru_cache(maxsize=None)
+def compile_fields(fields=FIELDS, patterns=None):
+    """
+    Compile the patterns for a set of fields once.
+
+    patterns optionally restricts the candidates to a frozenset of
+    (field, pattern name) pairs, e.g. a vendor parser's known layouts.
+    Returns {trigger word: [(field, pattern name, priority, regex), ...]}
+    with each word's candidates in priority order.
+    """
+    triggers = {}
+    priorities = {}
+    for field, name, words, pattern in FIELD_PATTERNS:
+        if field not in fields or (patterns is not None and (field, name) not in patterns):
+            continue
+        priority = priorities.setdefault(field, 0)
+        priorities[field] += 1
+        regex = re.compile(pattern, re.IGNORECASE)
+        for word in words:
+            triggers.setdefault(word, []).append((field, name, priority, regex))
+    return triggers
+
+def is_fee_invoice(text, filename=None):
+    """Convenience-fee invoice: says so in its text or is named '..._fee'"""
+    return 'Convenience Fee' in (text or '') or 'fee' in (filename or '').lower()
+
+def fee_patterns(patterns=None):
+    """patterns (default: every pattern) with price limited to FEE_PRICE_PATTERNS"""
+    pairs = patterns if patterns is not None else ((field, name) for field, name, _, _ in FIELD_PATTERNS)
+    return frozenset(pair for pair in pairs if pair[0] != "price" or pair in FEE_PRICE_PATTERNS)
+
+class FieldScanner:
+    """Accumulates the best match per field over one or more chunks of text"""
+
+    def __init__(self, fields=FIELDS, patterns=None, fee=False):
+        self.fields = tuple(fields)
+        self.triggers = compile_fields(self.fields, fee_patterns(patterns) if fee else patterns)
+        self.best = {}
+        self.settled = set()
+        self.offset = 0
+
+    def _match_around(self, regex, text, start, end):
+        """Return the first match of regex that covers the trigger at [start, end)"""
+        lo = max(0, start - WINDOW_BEFORE)
+        for match in regex.finditer(text, lo, min(len(text), end + WINDOW_AFTER)):
+            if match.start() > start:
+                return None
+            if match.end() >= end:
+                return match
+        return None
+
+    def feed(self, text):
+        """Scan another chunk of text (e.g. the next PDF page)"""
+        best = self.best
+        settled = self.settled
+        triggers = self.triggers
+        if len(settled) == len(self.fields):
+            self.offset += len(text)
+            return
+        last_checked = {}
+        for token in TOKEN_RE.finditer(text):
+            candidates = triggers.get(token.group().lower())
+            if candidates is None:
+                continue
+            start, end = token.span()
+            for field, name, priority, regex in candidates:
+                if field in settled:
+                    continue
+                current = best.get(field)
+                if current is not None and (current["priority"] < priority or (
+                        current["priority"] == priority and (field, name) not in MAX_VALUE_PATTERNS)):
+                    continue
+                # Several trigger words can land in the same match; try once per spot
+                if last_checked.get(name, -1) >= end:
+                    continue
+                match = self._match_around(regex, text, start, end)
+                if match is None:
+                    continue
+                last_checked[name] = match.end()
+                try:
+                    value = NORMALIZERS[field](match.group("value"))
+                except (ValueError, OverflowError):
+                    value = None
+                if value is None:
+                    continue
+                value_start, value_end = match.span("value")
+                span = (self.offset + value_start, self.offset + value_end)
+                if current is None or priority < current["priority"]:
+                    best[field] = {"value": value, "pattern": name, "span": span, "priority": priority}
+                elif (field, name) in MAX_VALUE_PATTERNS and value > current["value"]:
+                    best[field] = {"value": value, "pattern": name, "span": span, "priority": priority}
+                else:
+                    continue
+                # A top-priority first-match value cannot be displaced by later text
+                if priority == 0 and (field, name) not in MAX_VALUE_PATTERNS:
+                    settled.add(field)
+            if len(settled) == len(self.fields):
+                break
+        self.offset += len(text)
+
+    def resolved(self, fields=None):
+        """True once every requested field has a value"""
+        return all(field in self.best for field in (fields or self.fields))
+
+    def results(self):
+        """Return {field: {'value', 'pattern', 'span', 'priority'}} for every field found"""
+        return {field: {"value": found["value"], "pattern": found["pattern"], "span": found["span"],
+                        "priority": found["priority"]}
+                for field, found in self.best.items()}
+
+def extract_fields(text, fields=FIELDS, patterns=None, fee=False):
+    """Extract every requested field from text in a single regex pass (fee: see is_fee_invoice)"""
+    scanner = FieldScanner(fields, patterns, fee)
+    scanner.feed(text)
+    return scanner.results()
+
+def field_value(fields, name, default=None):
+    """Convenience accessor for extract_fields() output"""
+    found = fields.get(name)
+    return found["value"] if found else default
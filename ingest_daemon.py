@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Long-running invoice ingest daemon
+Watches Invoices/ (inotify on Linux, manifest polling elsewhere), waits for
+new files to stop changing, extracts them through the process pool / OCR
+service and appends their rows to the ledger within seconds of landing.
+Shares the batch_process manifest and ledger, so do not run both at once
+"""
+
+import argparse
+import asyncio
+import ctypes
+import ctypes.util
+import os
+import signal
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import batch_process
+from text_cache import TextCache
+from ledger_store import LedgerStore
+from invoice_manifest import InvoiceManifest, default_manifest_path
+from extraction_engine import (EXTRACTOR_VERSION, INVOICE_EXTENSIONS, REQUIRED_FIELDS, ExtractionStats,
+                               finish_document, submit_document)
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+EVENT_HEADER = struct.Struct('iIII')
+
+def skip_processed(name):
+    return name == 'processed'
+
+class InotifyWatcher:
+    """Recursive inotify watch on a directory tree, read via the event loop"""
+
+    def __init__(self, base_path, skip_dir=skip_processed):
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.skip_dir = skip_dir
+        self.watches = {}
+        self.overflowed = False
+        self.add_tree(base_path)
+
+    @staticmethod
+    def available():
+        if not sys.platform.startswith('linux'):
+            return False
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6')
+        return hasattr(libc, 'inotify_init1')
+
+    def add_tree(self, directory):
+        """Watch directory and its subdirectories; return files already inside"""
+        found = []
+        for root, dirs, files in os.walk(directory):
+            dirs[:] = [name for name in dirs if not self.skip_dir(name)]
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(root), WATCH_MASK)
+            if wd >= 0:
+                self.watches[wd] = root
+            found.extend(os.path.join(root, name) for name in files)
+        return found
+
+    def read_events(self):
+        """Drain pending events, returning paths of files that appeared or were written"""
+        paths = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0').decode('utf-8', 'surrogateescape')
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    # Events were dropped; the next manifest rescan picks them up
+                    self.overflowed = True
+                    continue
+                directory = self.watches.get(wd)
+                if directory is None or not name:
+                    continue
+                path = os.path.join(directory, name)
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO) and not self.skip_dir(name):
+                        # Files can land before the new directory is watched
+                        paths.extend(self.add_tree(path))
+                else:
+                    paths.append(path)
+        return paths
+
+    def close(self):
+        os.close(self.fd)
+
+class Debouncer:
+    """Hold candidate files until their size and mtime stop changing"""
+
+    def __init__(self, settle):
+        self.settle = settle
+        self.pending = {}
+
+    def touch(self, path, now):
+        """Note activity on path; the settle timer restarts"""
+        first_seen = self.pending[path][2] if path in self.pending else now
+        self.pending[path] = (None, now, first_seen)
+
+    def ready(self, now):
+        """Return (path, first seen) for files unchanged for settle seconds"""
+        stable = []
+        for path, (signature, since, first_seen) in list(self.pending.items()):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                del self.pending[path]
+                continue
+            current = (stat.st_size, stat.st_mtime_ns)
+            if current != signature:
+                self.pending[path] = (current, now, first_seen)
+            elif now - since >= self.settle:
+                del self.pending[path]
+                stable.append((path, first_seen))
+        return stable
+
+class IngestDaemon:
+    """
+    asyncio pipeline: watch -> debounce -> extract -> commit.
+
+    Extraction runs in a process pool (PDFs) and the OCR service (images) so
+    CPU-bound work overlaps with file I/O; a bounded queue between stages
+    applies backpressure. A single writer task owns the ledger and manifest
+    and commits rows in small batches.
+    """
+
+    def __init__(self, base_path, workers=None, settle=2.0, poll_interval=5.0, rescan_interval=60.0,
+                 use_inotify=True, cache=None, required_fields=REQUIRED_FIELDS):
+        self.base_path = base_path
+        self.workers = workers or os.cpu_count() or 1
+        self.settle = settle
+        self.poll_interval = poll_interval
+        self.rescan_interval = rescan_interval
+        self.use_inotify = use_inotify and InotifyWatcher.available()
+        self.cache = cache
+        self.required_fields = required_fields
+        self.ledger = LedgerStore(batch_process.csv_path)
+        self.manifest = InvoiceManifest(default_manifest_path('batch_process'), base_path, EXTRACTOR_VERSION)
+        self.known = self.ledger.keys() if self.manifest.is_empty() else set()
+        self.journal = batch_process.open_journal(self.ledger, self.manifest)
+        self.debouncer = Debouncer(settle)
+        self.in_flight = set()
+        self.failed = set()
+        self.stats = ExtractionStats()
+        self.stopping = asyncio.Event()
+        self.landed = {}
+
+    def is_candidate(self, path):
+        # Files committed but not yet moved (journal.unmoved) are already in the ledger
+        return (path.lower().endswith(INVOICE_EXTENSIONS)
+                and path not in self.in_flight and path not in self.failed and path not in self.journal.unmoved
+                and os.sep + 'processed' + os.sep not in path)
+
+    def rescan(self):
+        """Incremental manifest scan; catches anything the watcher missed and retries failed moves"""
+        self.journal.retry_moves()
+        now = time.monotonic()
+        for path in self.manifest.scan(INVOICE_EXTENSIONS, skip_dir=skip_processed):
+            filename = os.path.basename(path)
+            if filename in self.known:
+                self.manifest.record(path, row_id=filename)
+            elif self.is_candidate(path) and path not in self.debouncer.pending:
+                self.debouncer.touch(path, now)
+
+    async def watch(self):
+        loop = asyncio.get_running_loop()
+        interval = self.rescan_interval if self.use_inotify else self.poll_interval
+        watcher = None
+        if self.use_inotify:
+            watcher = InotifyWatcher(self.base_path)
+
+            def on_events():
+                now = time.monotonic()
+                for path in watcher.read_events():
+                    if self.is_candidate(path):
+                        self.debouncer.touch(path, now)
+                if watcher.overflowed:
+                    watcher.overflowed = False
+                    self.rescan()
+
+            loop.add_reader(watcher.fd, on_events)
+        try:
+            while not self.stopping.is_set():
+                self.rescan()
+                try:
+                    await asyncio.wait_for(self.stopping.wait(), timeout=interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if watcher is not None:
+                loop.remove_reader(watcher.fd)
+                watcher.close()
+
+    async def settle_files(self, ready_queue):
+        while not self.stopping.is_set():
+            for path, first_seen in self.debouncer.ready(time.monotonic()):
+                self.in_flight.add(path)
+                self.landed[path] = first_seen
+                await ready_queue.put(path)
+            await asyncio.sleep(min(0.5, self.settle / 2 or 0.5))
+
+    async def extract(self, pool, ready_queue, done_queue):
+        loop = asyncio.get_running_loop()
+        while True:
+            path = await ready_queue.get()
+            try:
+                entry = await loop.run_in_executor(None, submit_document, pool, path, self.required_fields,
+                                                   self.cache, self.stats)
+                result = await loop.run_in_executor(None, finish_document, entry, self.cache)
+            except Exception as e:
+                print(f"  ✗ Extraction failed for {os.path.basename(path)}: {e}")
+                result = None
+            await done_queue.put((path, result))
+            ready_queue.task_done()
+
+    async def commit(self, done_queue, linger=0.5, max_rows=50):
+        """Append finished files to the ledger in small transactions"""
+        while True:
+            batch = [await done_queue.get()]
+            deadline = time.monotonic() + linger
+            while len(batch) < max_rows:
+                try:
+                    batch.append(await asyncio.wait_for(done_queue.get(), timeout=max(0.0, deadline - time.monotonic())))
+                except asyncio.TimeoutError:
+                    break
+            self.commit_batch(batch)
+            for _ in batch:
+                done_queue.task_done()
+
+    def commit_batch(self, batch):
+        rows = {}
+        extracted = []
+        for path, result in batch:
+            filename = os.path.basename(path)
+            if result is not None:
+                self.stats.record(result)
+            if result is None or not result['text']:
+                print(f"  ✗ Could not extract text: {filename}")
+                self.failed.add(path)
+                self.in_flight.discard(path)
+                continue
+            rows[path] = batch_process.build_row(path, filename, result['text'], result['source'])
+            extracted.append((path, filename))
+
+        # Rows and moves are one journalled checkpoint, so a crash neither
+        # loses nor re-ingests a file
+        failed = set(self.journal.checkpoint(list(rows), rows)) if rows else set()
+        now = time.monotonic()
+        for path, filename in extracted:
+            # A failed move is still committed; the journal keeps it unmoved until a rescan files it
+            self.known.add(filename)
+            if path in failed:
+                print(f"  ✓ {filename} ingested, left in place until it can be moved")
+                self.landed.pop(path, None)
+            else:
+                print(f"  ✓ {filename} ingested in {now - self.landed.pop(path, now):.1f}s")
+            self.in_flight.discard(path)
+        self.manifest.save()
+        self.journal.clear()
+        if not self.journal.has_work():
+            self.ledger.maybe_compact()
+
+    async def run(self, once=False):
+        """Run until stopped (SIGINT/SIGTERM); with once, drain the backlog and exit"""
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, self.stopping.set)
+            except NotImplementedError:
+                pass
+
+        recovered = self.journal.recover()
+        journalled = self.journal.pending()
+        if journalled:
+            self.journal.checkpoint([path for path in journalled if os.path.exists(path)])
+            self.journal.drop(list(self.journal.pending()))
+        if recovered or journalled:
+            print(f"Committed {recovered + len(journalled)} files left in the journal by an interrupted run")
+
+        mode = "inotify" if self.use_inotify else f"polling every {self.poll_interval:g}s"
+        print(f"Watching {self.base_path} ({mode}, settle {self.settle:g}s, {self.workers} workers)")
+
+        ready_queue = asyncio.Queue(maxsize=self.workers * 4)
+        done_queue = asyncio.Queue(maxsize=self.workers * 4)
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            tasks = [asyncio.create_task(self.settle_files(ready_queue)),
+                     asyncio.create_task(self.commit(done_queue))]
+            tasks += [asyncio.create_task(self.extract(pool, ready_queue, done_queue))
+                      for _ in range(self.workers * 2)]
+            if once:
+                # Backlog files are already complete on disk
+                self.debouncer.settle = 0
+                self.rescan()
+                while self.debouncer.pending or self.in_flight:
+                    await asyncio.sleep(0.2)
+                self.stopping.set()
+            else:
+                tasks.append(asyncio.create_task(self.watch()))
+                await self.stopping.wait()
+
+            # Let in-flight files finish before shutting the pool down
+            while self.in_flight:
+                await asyncio.sleep(0.2)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        self.manifest.save()
+        print(f"\nExtraction throughput:\n{self.stats.report()}")
+        print(f"Ledger operations pending compaction: {self.ledger.pending_ops}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Watch the invoice folders and ingest new files continuously')
+    parser.add_argument('--workers', type=int, default=None, help='extraction processes (default: CPU count)')
+    parser.add_argument('--settle', type=float, default=2.0, help='seconds a file must stay unchanged before ingest')
+    parser.add_argument('--poll', action='store_true', help='poll instead of using inotify')
+    parser.add_argument('--interval', type=float, default=5.0, help='polling interval in seconds')
+    parser.add_argument('--no-cache', action='store_true', help='always re-extract instead of using the text cache')
+    parser.add_argument('--once', action='store_true', help='ingest the current backlog and exit')
+    args = parser.parse_args()
+
+    daemon = IngestDaemon(batch_process.base_path, workers=args.workers, settle=args.settle,
+                          poll_interval=args.interval, use_inotify=not args.poll,
+                          cache=None if args.no_cache else TextCache())
+    asyncio.run(daemon.run(once=args.once))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Grammar for the hand-typed invoice filename convention
+    DD.MM_Vendor_Id_Amount[_fee][_copy].ext
+occasionally with a trailing 'x N' ticket count. One lexer splits a name
+into tokens and classifies each (fee marker, decimal amount, number,
+word); a small set of rules then assigns date, vendor, order id, amount,
+fee flag, duplicate suffix and ticket count. Every script that
+reads metadata from filenames goes through parse_invoice_name, and
+parse_invoice_names runs the grammar once per distinct name over a list
+or pandas Series, matching the common shape in a single regex scan
+"""
+
+import os
+import re
+from dataclasses import dataclass, fields
+from functools import lru_cache
+
+import pandas as pd
+
+from vendor_parsers import UNKNOWN, company_for
+
+# 'DD.MM_' or 'DD.MM.YY_' at the start of the name
+DATE_PREFIX_RE = re.compile(r"^(\d{1,2})\.(\d{1,2})(?:\.\d{2,4})?[_ ]")
+SEPARATOR_RE = re.compile(r"[_\s-]+")
+# One token, classified by the alternative that matches it in full
+TOKEN_RE = re.compile(r"(?P<fee>fees?)(?P<copy>\d{0,2})|(?P<decimal>\d+\.\d+)|(?P<number>\d+)|(?P<word>.+)")
+# Short booking codes that stand in for numeric order ids ('34m', 'b3f', 'zgf')
+CODE_RE = re.compile(r"^(?:\d+[a-z]|[a-z0-9]{3})$")
+# The grammar compiled down to its common case, 'dd.mm_vendor_id_amount[_fee][_N].ext'
+# (lower-cased); names it accepts parse exactly as parse_invoice_name would.
+# Every other line falls through to the trailing catch-all group
+CANONICAL_RE = re.compile(r"^(?:(\d{1,2})\.(\d{1,2})_(?!fees?_|x_)([a-z]+)_(\d{1,4})_(\d+\.\d+)(_fees?)?(?:_(\d))?"
+                          r"\.[a-z0-9]+|.*)$", re.MULTILINE)
+
+# Bare numbers up to this many digits are order ids; longer ones are rupee
+# amounts, and from DOCUMENT_NUMBER_DIGITS on they are invoice numbers
+ORDER_ID_DIGITS = 4
+DOCUMENT_NUMBER_DIGITS = 8
+
+@dataclass(slots=True)
+class InvoiceName:
+    """What a hand-typed invoice filename says: DD.MM_Vendor_order_amount[_fee][_copy]"""
+    vendor: str = UNKNOWN
+    day: int = None
+    month: int = None
+    order_id: str = None
+    amount: str = None
+    is_fee: bool = False
+    duplicate: int = None
+    quantity: int = None
+
+    def key(self):
+        """Filename identity with zero padding, 'fee'/'fees' and copy suffixes normalised away"""
+        return (self.vendor, self.day, self.month, self.order_id, self.amount, self.is_fee)
+
+    def date(self, year):
+        """'YYYY-MM-DD' for the filename day and month in year, or '' without a date"""
+        if self.day is None:
+            return ""
+        return f"{year}-{self.month:02d}-{self.day:02d}"
+
+    def price(self):
+        """Amount as a float, 0 when the name has none"""
+        return float(self.amount) if self.amount is not None else 0
+
+def normalize_amount(value):
+    """'12951.90', '12951.9' and 12951.9 all become '12951.90'"""
+    try:
+        return f"{float(str(value).replace(',', '')):.2f}"
+    except ValueError:
+        return None
+
+@lru_cache(maxsize=4096)
+def _vendor(words):
+    """Vendor for the name's non-numeric tokens; names share a handful of these"""
+    return company_for(words)
+
+def parse_invoice_name(file_name):
+    """
+    Parse '13.11_big_173_12951.90_fee.pdf' into an InvoiceName.
+
+    Numbers of up to ORDER_ID_DIGITS digits are order ids (leading zeros
+    are typed inconsistently and dropped), longer ones amounts; booking
+    codes count as ids when they are not vendor names. A final single
+    digit after the id or a fee marker ('_8', 'fee1') is a copy counter,
+    and a number after 'x' is a ticket count.
+    """
+    stem = os.path.splitext(os.path.basename(file_name))[0].lower()
+    name = InvoiceName()
+    date = DATE_PREFIX_RE.match(stem)
+    if date:
+        name.day, name.month = int(date.group(1)), int(date.group(2))
+        stem = stem[date.end():]
+
+    tokens = [TOKEN_RE.fullmatch(token) for token in SEPARATOR_RE.split(stem) if token]
+    words = []
+    for position, token in enumerate(tokens):
+        kind = token.lastgroup
+        value = token.group(kind)
+        last = position == len(tokens) - 1
+        if kind in ('fee', 'copy'):
+            name.is_fee = True
+            if token.group('copy'):
+                name.duplicate = int(token.group('copy'))
+        elif kind == 'decimal':
+            if name.amount is None:
+                name.amount = normalize_amount(value)
+        elif kind == 'number':
+            if position and tokens[position - 1].group() == 'x':
+                name.quantity = int(value)
+            elif last and len(value) == 1 and (name.order_id is not None or name.is_fee):
+                name.duplicate = int(value)
+            elif len(value) >= DOCUMENT_NUMBER_DIGITS or len(value) <= ORDER_ID_DIGITS:
+                if name.order_id is None:
+                    name.order_id = value.lstrip('0') or '0'
+            elif name.amount is None:
+                name.amount = normalize_amount(value)
+        elif value != 'x':
+            words.append(value)
+            if name.order_id is None and CODE_RE.match(value) and _vendor(value) == UNKNOWN:
+                name.order_id = value
+    name.vendor = _vendor('_'.join(words))
+    return name
+
+INVOICE_NAME_COLUMNS = tuple(field.name for field in fields(InvoiceName))
+
+def _parse_canonical(names):
+    """
+    Parse a list of lower-cased base names with one CANONICAL_RE scan over
+    them joined by newlines; returns ({column: values} for the canonical
+    names, their positions).
+    """
+    rows = CANONICAL_RE.findall('\n'.join(names))
+    vendors = {}
+    # A leading booking code would be the order id in the full grammar
+    canonical_words = set()
+    for word in {row[2] for row in rows if row[0]}:
+        vendors[word] = _vendor(word)
+        if not (CODE_RE.match(word) and vendors[word] == UNKNOWN):
+            canonical_words.add(word)
+    positions = [position for position, row in enumerate(rows) if row[0] and row[2] in canonical_words]
+    found = [rows[position] for position in positions]
+    return {
+        'vendor': [vendors[row[2]] for row in found],
+        'day': [int(row[0]) for row in found],
+        'month': [int(row[1]) for row in found],
+        'order_id': [row[3].lstrip('0') or '0' for row in found],
+        'amount': [f"{float(row[4]):.2f}" for row in found],
+        'is_fee': [bool(row[5]) for row in found],
+        'duplicate': [int(row[6]) if row[6] else None for row in found],
+        'quantity': [None] * len(found)
+    }, positions
+
+def parse_invoice_names(names):
+    """
+    Parse many filenames at once into a DataFrame (one column per
+    InvoiceName field, indexed like names when it is a Series).
+
+    Each distinct name is parsed once. Names in the canonical shape go
+    through a single CANONICAL_RE scan of them all; only the irregular
+    rest run the full grammar one by one.
+    """
+    series = names if isinstance(names, pd.Series) else pd.Series(list(names), dtype=object)
+    codes, uniques = pd.factorize(series.astype(str), use_na_sentinel=False)
+    uniques = uniques.tolist()
+    # Newlines would split a name across CANONICAL_RE lines; send such names down the slow path
+    bases = [os.path.basename(name).lower().replace('\n', ' ') if '/' in name or '\n' in name else name.lower()
+             for name in uniques]
+    parsed = pd.DataFrame(index=range(len(uniques)), columns=list(INVOICE_NAME_COLUMNS), dtype=object)
+    canonical, positions = _parse_canonical(bases)
+    if positions:
+        parsed.iloc[positions] = pd.DataFrame(canonical, columns=list(INVOICE_NAME_COLUMNS), dtype=object).values
+    irregular = sorted(set(range(len(uniques))) - set(positions))
+    if irregular:
+        parsed.iloc[irregular] = [[getattr(name, column) for column in INVOICE_NAME_COLUMNS]
+                                  for name in (parse_invoice_name(uniques[position]) for position in irregular)]
+    result = parsed.iloc[codes].reset_index(drop=True)
+    result.index = series.index
+    return result
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Duplicate detection and fee-to-ticket linking across the invoice ledger
+Invoices are grouped as duplicates by file content hash, normalised text
+hash, MinHash/LSH text similarity and normalised filename; convenience-fee
+invoices are then joined to their ticket invoice on vendor, order id, date
+and amount. Every step is a hash join or a bucket scan, so a ledger is
+matched in one pass without comparing every pair
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import zlib
+
+import numpy as np
+
+from extraction_engine import EXTRACTOR_VERSION
+from invoice_filename import normalize_amount, parse_invoice_name
+from ledger_store import LedgerStore
+from text_cache import TextCache, hash_file
+from vendor_parsers import UNKNOWN, company_for
+
+DEFAULT_NUM_PERM = 128
+DEFAULT_BANDS = 32
+DEFAULT_THRESHOLD = 0.8
+SHINGLE_WORDS = 3
+# Mersenne prime for the universal hash family; (a * h + b) stays below 2**64
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+WORD_RE = re.compile(r"\w+")
+# Amounts, ids and dates: templated invoices share their wording, not these
+NUMBER_RE = re.compile(r"\d[\d,]*(?:\.\d+)?")
+BOOKING_ID_RE = re.compile(r"\b(?:Booking|Order|Transaction)\s*(?:ID|No\.?|Number|#)\s*[:#]?\s*([A-Z0-9][A-Z0-9-]{5,})",
+                           re.IGNORECASE)
+
+def normalize_text(text):
+    """Case- and whitespace-insensitive word sequence"""
+    return " ".join(WORD_RE.findall(text.lower()))
+
+def number_fingerprint(text):
+    """Hash of the distinct numbers in a text (amounts with ',' and trailing zeros normalised)"""
+    numbers = set()
+    for number in NUMBER_RE.findall(text):
+        number = number.replace(',', '')
+        if '.' in number:
+            number = number.rstrip('0').rstrip('.')
+        if len(number) >= 3:
+            numbers.add(number)
+    return hash(frozenset(numbers))
+
+def shingle_hashes(words, size=SHINGLE_WORDS):
+    """32-bit hashes of every size-word shingle, deduplicated"""
+    if len(words) < size:
+        shingles = [" ".join(words)] if words else []
+    else:
+        shingles = [" ".join(words[index:index + size]) for index in range(len(words) - size + 1)]
+    return np.unique(np.fromiter((zlib.crc32(shingle.encode('utf-8')) for shingle in shingles),
+                                 dtype=np.uint64, count=len(shingles)))
+
+class MinHasher:
+    """num_perm independent universal hashes; a signature is the minimum of each over a document's shingles"""
+
+    def __init__(self, num_perm=DEFAULT_NUM_PERM, seed=1):
+        rng = np.random.default_rng(seed)
+        # a, b < 2**29 keeps a * h + b (h < 2**32) inside uint64
+        self.a = rng.integers(1, 1 << 29, size=num_perm, dtype=np.uint64)[:, None]
+        self.b = rng.integers(0, 1 << 29, size=num_perm, dtype=np.uint64)[:, None]
+        self.num_perm = num_perm
+
+    def signature(self, hashes):
+        if not len(hashes):
+            return np.full(self.num_perm, MAX_HASH, dtype=np.uint32)
+        return ((self.a * hashes[None, :] + self.b) % MERSENNE_PRIME & MAX_HASH).min(axis=1).astype(np.uint32)
+
+class _UnionFind:
+    __slots__ = ("parent", "reason")
+
+    def __init__(self):
+        self.parent = []
+        self.reason = []
+
+    def add(self):
+        self.parent.append(len(self.parent))
+        self.reason.append(None)
+
+    def find(self, index):
+        parent = self.parent
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    def union(self, first, second, reason):
+        """Join two sets, keeping the lower index (earliest invoice) as the root"""
+        first, second = self.find(first), self.find(second)
+        if first == second:
+            return False
+        if second < first:
+            first, second = second, first
+        self.parent[second] = first
+        self.reason[second] = reason
+        return True
+
+class InvoiceLinkIndex:
+    """
+    Duplicate groups and fee -> ticket links for a set of invoices.
+
+    Invoices are added one at a time (text optional) and resolve() works
+    in one pass: exact matches are hash-table groupings, near-duplicate
+    text goes through LSH banding, and each LSH bucket member is compared
+    with the bucket's first member only, so the work is linear in the
+    number of invoices times the number of bands. The earliest invoice of
+    each duplicate group is its canonical copy.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, num_perm=DEFAULT_NUM_PERM, bands=DEFAULT_BANDS, seed=1):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self.hasher = MinHasher(num_perm, seed)
+        self.file_names = []
+        self.names = []
+        self.booking_ids = []
+        self.parent_amounts = []
+        self._groups = _UnionFind()
+        self._exact = {}
+        self._signatures = []
+        self._signature_rows = []
+        self._signature_numbers = []
+        self._resolved = None
+
+    def __len__(self):
+        return len(self.file_names)
+
+    def _join(self, kind, key, index):
+        """Union index with the first invoice seen under (kind, key)"""
+        first = self._exact.setdefault((kind, key), index)
+        if first != index:
+            self._groups.union(first, index, kind)
+
+    def add(self, file_name, text=None, content_hash=None, price=None, is_fee=None):
+        """
+        Add one invoice; returns its index.
+
+        text enables text-hash, near-duplicate and booking-id matching;
+        content_hash is the file's SHA-256; price is the ledger amount, used
+        for the amount key when the filename has none.
+        """
+        index = len(self.file_names)
+        name = parse_invoice_name(file_name)
+        if text:
+            name.vendor = company_for(file_name, text)
+            if 'Convenience Fee' in text:
+                name.is_fee = True
+        if is_fee is not None:
+            name.is_fee = bool(is_fee)
+        booking = BOOKING_ID_RE.search(text) if text else None
+        self.file_names.append(file_name)
+        self.names.append(name)
+        self.booking_ids.append(booking.group(1).upper() if booking else None)
+        # A fee invoice's own price is the fee; only its filename names the ticket amount
+        self.parent_amounts.append(name.amount or (None if name.is_fee or price is None else normalize_amount(price)))
+        self._groups.add()
+        self._resolved = None
+
+        if content_hash:
+            self._join('content', content_hash, index)
+        if name.day is not None and (name.order_id or name.amount):
+            self._join('filename', name.key(), index)
+        if text:
+            words = normalize_text(text).split()
+            if words:
+                digest = hashlib.sha256(" ".join(words).encode('utf-8')).hexdigest()
+                self._join('text', digest, index)
+                self._signatures.append(self.hasher.signature(shingle_hashes(words)))
+                self._signature_rows.append(index)
+                self._signature_numbers.append(number_fingerprint(text))
+        return index
+
+    @classmethod
+    def from_rows(cls, rows, texts=None, content_hashes=None, **options):
+        """Build from ledger row dicts; texts/content_hashes map File Name to values"""
+        index = cls(**options)
+        texts = texts or {}
+        content_hashes = content_hashes or {}
+        for row in rows:
+            file_name = row['File Name']
+            event = str(row.get('Event/Match') or '')
+            index.add(file_name, text=texts.get(file_name), content_hash=content_hashes.get(file_name),
+                      price=row.get('Ticket Price'), is_fee=True if 'Convenience Fee' in event else None)
+        return index
+
+    def _near_duplicates(self):
+        """
+        Union invoices whose MinHash similarity with an LSH bucket-mate
+        reaches the threshold and whose numbers agree; invoices printed from
+        one template differ only in their numbers
+        """
+        if len(self._signatures) < 2:
+            return
+        signatures = np.vstack(self._signatures)
+        rows = self.rows_per_band
+        for band in range(self.bands):
+            buckets = {}
+            band_values = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+            for position, value in enumerate(band_values):
+                # Bucketing on the numbers too means templated invoices never
+                # crowd a duplicate out of its bucket's first slot
+                first = buckets.setdefault((self._signature_numbers[position], value.tobytes()), position)
+                if first == position:
+                    continue
+                first_row, row = self._signature_rows[first], self._signature_rows[position]
+                if self._groups.find(first_row) == self._groups.find(row):
+                    continue
+                if (signatures[first] == signatures[position]).mean() >= self.threshold:
+                    self._groups.union(first_row, row, 'near')
+
+    def _fee_keys(self, index, vendor):
+        """Join keys from most to least specific"""
+        name = self.names[index]
+        booking = self.booking_ids[index]
+        amount = self.parent_amounts[index]
+        keys = []
+        if booking:
+            keys.append(('booking', vendor, booking))
+        if name.order_id and name.day is not None:
+            keys.append(('order_date', vendor, name.order_id, name.day, name.month))
+        if name.order_id and amount:
+            keys.append(('order_amount', vendor, name.order_id, amount))
+        if amount and name.day is not None:
+            keys.append(('date_amount', vendor, name.day, name.month, amount))
+        return keys
+
+    def _fee_links(self, canonical):
+        """Map each fee invoice to a unique ticket invoice sharing a join key"""
+        parents = {}
+        for index in range(len(self)):
+            if self.names[index].is_fee or canonical[index] != index:
+                continue
+            # Fee filenames sometimes omit the vendor, so tickets are also
+            # indexed under a wildcard vendor
+            for vendor in (self.names[index].vendor, None):
+                for key in self._fee_keys(index, vendor):
+                    parents.setdefault(key, set()).add(index)
+        links = {}
+        for index in range(len(self)):
+            if not self.names[index].is_fee:
+                continue
+            vendor = self.names[index].vendor
+            for key in self._fee_keys(index, None if vendor == UNKNOWN else vendor):
+                candidates = parents.get(key)
+                if candidates and len(candidates) == 1:
+                    links[index] = (next(iter(candidates)), key[0])
+                    break
+        return links
+
+    def resolve(self):
+        """Compute (canonical index per invoice, {fee index: (ticket index, key kind)})"""
+        if self._resolved is None:
+            self._near_duplicates()
+            canonical = [self._groups.find(index) for index in range(len(self))]
+            self._resolved = (canonical, self._fee_links(canonical))
+        return self._resolved
+
+    def duplicate_groups(self):
+        """Lists of file names, canonical first, for every group with more than one invoice"""
+        canonical, _ = self.resolve()
+        groups = {}
+        for index, root in enumerate(canonical):
+            groups.setdefault(root, []).append(self.file_names[index])
+        return [group for group in groups.values() if len(group) > 1]
+
+    def fee_links(self):
+        """{fee file name: ticket file name}"""
+        _, links = self.resolve()
+        return {self.file_names[fee]: self.file_names[ticket] for fee, (ticket, _) in links.items()}
+
+    def ledger_updates(self):
+        """Keyed ledger updates recording 'Duplicate Of' and 'Parent Invoice'"""
+        canonical, links = self.resolve()
+        updates = {}
+        for index, root in enumerate(canonical):
+            # Updates are keyed by file name, so a ledger row repeated under
+            # the same name cannot be told apart from its canonical copy
+            if root != index and self.file_names[root] != self.file_names[index]:
+                updates.setdefault(self.file_names[index], {})['Duplicate Of'] = self.file_names[root]
+        for fee, (ticket, _) in links.items():
+            updates.setdefault(self.file_names[fee], {})['Parent Invoice'] = self.file_names[ticket]
+        return updates
+
+    def report(self):
+        """Printable summary"""
+        canonical, links = self.resolve()
+        duplicates = sum(1 for index, root in enumerate(canonical) if root != index)
+        reasons = {}
+        for index, root in enumerate(canonical):
+            if root != index:
+                reason = self._groups.reason[index] or 'transitive'
+                reasons[reason] = reasons.get(reason, 0) + 1
+        fees = sum(1 for name in self.names if name.is_fee)
+        by_reason = ", ".join(f"{count} by {reason}" for reason, count in sorted(reasons.items()))
+        return (f"  {len(self)} invoices, {duplicates} duplicates ({by_reason or 'none'}), "
+                f"{len(links)}/{fees} fee invoices linked to a ticket invoice")
+
+def load_texts(rows, project_root, cache):
+    """Cached extraction text for ledger rows, without extracting anything new"""
+    texts = {}
+    content_hashes = {}
+    for row in rows:
+        file_path = project_root + str(row.get('File Path') or '')
+        if not os.path.isfile(file_path):
+            continue
+        content_hash = hash_file(file_path)
+        content_hashes[row['File Name']] = content_hash
+        if cache is not None:
+            result = cache.get(f"{content_hash}-{EXTRACTOR_VERSION}")
+            if result is not None:
+                texts[row['File Name']] = result['text']
+    return texts, content_hashes
+
+def main():
+    parser = argparse.ArgumentParser(description='Find duplicate invoices and link fee invoices to their tickets')
+    parser.add_argument('--root', default='/Users/sumitjha/Dropbox/Mac/Documents/Projects/fpl-auction')
+    parser.add_argument('--csv', default=None, help='ledger CSV (default: <root>/IPL_Event_Invoices_Complete.csv)')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='estimated Jaccard similarity for near-duplicate text')
+    parser.add_argument('--no-cache', action='store_true', help='match on filenames and file hashes only')
+    parser.add_argument('--write', action='store_true', help="record 'Duplicate Of' / 'Parent Invoice' in the ledger")
+    args = parser.parse_args()
+    csv_path = args.csv or os.path.join(args.root, 'IPL_Event_Invoices_Complete.csv')
+
+    ledger = LedgerStore(csv_path)
+    rows = ledger.read().to_dict('records')
+    texts, content_hashes = load_texts(rows, args.root, None if args.no_cache else TextCache())
+    index = InvoiceLinkIndex.from_rows(rows, texts=texts, content_hashes=content_hashes, threshold=args.threshold)
+
+    print("Duplicate groups:")
+    for group in index.duplicate_groups():
+        print(f"  {group[0]}  <=  {', '.join(group[1:])}")
+    print("\nFee invoices:")
+    for fee, ticket in sorted(index.fee_links().items()):
+        print(f"  {fee}  ->  {ticket}")
+    print(f"\n{index.report()}")
+
+    if args.write:
+        updates = index.ledger_updates()
+        ledger.update_rows(updates)
+        print(f"Recorded {len(updates)} ledger updates")
+
+if __name__ == "__main__":
+    main()
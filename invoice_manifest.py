@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Persisted manifest of processed invoice files
+Records path, size, mtime, content hash, extractor version and output row
+for every file so a run only touches new or changed invoices
+"""
+
+import json
+import os
+import tempfile
+
+from text_cache import hash_file
+
+MANIFEST_FORMAT = 1
+DEFAULT_MANIFEST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.invoice_cache')
+
+def default_manifest_path(name):
+    """Return the manifest location for a script, e.g. 'batch_process'"""
+    return os.path.join(DEFAULT_MANIFEST_DIR, f"{name}_manifest.json")
+
+class InvoiceManifest:
+    """
+    Tracks files under a base directory between runs.
+
+    Directories whose mtime is unchanged since they were last fully
+    processed are not listed again: adding, removing or renaming a file
+    always bumps its parent directory's mtime, so only their subdirectories
+    are visited. Files rewritten in place keep the directory mtime, so pass
+    verify=True to scan() to stat every file when that matters.
+    """
+
+    def __init__(self, manifest_path, base_path, extractor_version="1"):
+        self.manifest_path = manifest_path
+        self.base_path = os.path.abspath(base_path)
+        self.extractor_version = extractor_version
+        self.files = {}
+        self.dirs = {}
+        self._scanned_dirs = {}
+        self._load()
+        # Entry paths grouped by their directory ('' for the base), so pruning
+        # a directory never walks the whole manifest
+        self._by_dir = {}
+        for rel_path in self.files:
+            self._by_dir.setdefault(os.path.dirname(rel_path), set()).add(rel_path)
+
+    def _load(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('format') != MANIFEST_FORMAT or data.get('base_path') != self.base_path:
+            return
+        self.files = data.get('files', {})
+        # A different extractor version invalidates every directory shortcut
+        if data.get('extractor_version') == self.extractor_version:
+            self.dirs = data.get('dirs', {})
+
+    def is_empty(self):
+        return not self.files
+
+    def _relpath(self, path):
+        return os.path.relpath(os.path.abspath(path), self.base_path)
+
+    def _is_current(self, rel_path, stat):
+        """True if the manifest entry matches the file's size, mtime and extractor version"""
+        entry = self.files.get(rel_path)
+        return (entry is not None
+                and entry['size'] == stat.st_size
+                and entry['mtime_ns'] == stat.st_mtime_ns
+                and entry['extractor_version'] == self.extractor_version)
+
+    def _drop_tree(self, rel_dir):
+        """Forget every file and directory entry at or below a directory that no longer exists"""
+        if rel_dir == '.':
+            inside = lambda key: True
+        else:
+            inside = lambda key: key == rel_dir or key.startswith(rel_dir + os.sep)
+        for dir_key in [key for key in self._by_dir if inside(key or '.')]:
+            for rel_path in self._by_dir.pop(dir_key):
+                del self.files[rel_path]
+        for known in [key for key in self.dirs if inside(key)]:
+            del self.dirs[known]
+
+    def _vanished_subdirs(self, rel_dir, listed):
+        """Direct subdirectories of rel_dir with manifest entries that are not in `listed`"""
+        prefix = '' if rel_dir == '.' else rel_dir + os.sep
+        vanished = set()
+        for key in list(self._by_dir) + list(self.dirs):
+            if key in ('', '.') or not key.startswith(prefix) or key == rel_dir:
+                continue
+            child = prefix + key[len(prefix):].split(os.sep, 1)[0]
+            if child not in listed:
+                vanished.add(child)
+        return vanished
+
+    def scan(self, extensions, skip_dir=None, verify=False):
+        """
+        Return absolute paths of new or changed files, in sorted walk order.
+
+        extensions is a tuple of lower-case suffixes; skip_dir(name) can
+        prune whole subtrees such as 'processed'. Entries for files that no
+        longer exist are dropped.
+        """
+        changed = []
+        self._scanned_dirs = {}
+        stack = ['.']
+        while stack:
+            rel_dir = stack.pop()
+            abs_dir = os.path.normpath(os.path.join(self.base_path, rel_dir))
+            try:
+                dir_mtime = os.stat(abs_dir).st_mtime_ns
+            except OSError:
+                self._drop_tree(rel_dir)
+                continue
+
+            known = self.dirs.get(rel_dir)
+            if known and known['mtime_ns'] == dir_mtime and not verify:
+                # Unchanged listing: only descend into subdirectories
+                stack.extend(sorted(known['subdirs'], reverse=True))
+                continue
+
+            subdirs = []
+            listed = set()
+            files = []
+            with os.scandir(abs_dir) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        sub_dir = os.path.normpath(os.path.join(rel_dir, entry.name))
+                        listed.add(sub_dir)
+                        if skip_dir is None or not skip_dir(entry.name):
+                            subdirs.append(sub_dir)
+                    elif entry.name.lower().endswith(extensions):
+                        files.append(entry)
+
+            present = set()
+            pending = set()
+            for entry in sorted(files, key=lambda e: e.name):
+                rel_path = os.path.normpath(os.path.join(rel_dir, entry.name))
+                present.add(rel_path)
+                if not self._is_current(rel_path, entry.stat()):
+                    changed.append(entry.path)
+                    pending.add(rel_path)
+
+            # Forget files that disappeared from this directory, and everything
+            # under subdirectories that were removed or renamed
+            dir_key = '' if rel_dir == '.' else rel_dir
+            in_dir = self._by_dir.get(dir_key, set())
+            for rel_path in in_dir - present:
+                del self.files[rel_path]
+                in_dir.discard(rel_path)
+            for sub_dir in self._vanished_subdirs(rel_dir, listed):
+                self._drop_tree(sub_dir)
+
+            self._scanned_dirs[rel_dir] = {'mtime_ns': dir_mtime, 'subdirs': subdirs, 'pending': pending}
+            stack.extend(sorted(subdirs, reverse=True))
+        return changed
+
+    def record(self, file_path, row_id=None, row=None, content_hash=None):
+        """Mark a file as processed, storing its output row id and optional row data"""
+        rel_path = self._relpath(file_path)
+        stat = os.stat(file_path)
+        self.files[rel_path] = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': content_hash or hash_file(file_path),
+            'extractor_version': self.extractor_version,
+            'row_id': row_id,
+            'row': row
+        }
+        self._by_dir.setdefault(os.path.dirname(rel_path), set()).add(rel_path)
+        scanned = self._scanned_dirs.get(os.path.dirname(rel_path) or '.')
+        if scanned is not None:
+            scanned['pending'].discard(rel_path)
+
+    def forget(self, file_path):
+        """Mark a file as done without keeping an entry, e.g. after it was moved away"""
+        rel_path = self._relpath(file_path)
+        self.files.pop(rel_path, None)
+        self._by_dir.get(os.path.dirname(rel_path), set()).discard(rel_path)
+        scanned = self._scanned_dirs.get(os.path.dirname(rel_path) or '.')
+        if scanned is not None:
+            scanned['pending'].discard(rel_path)
+
+    def rows(self):
+        """Return stored rows for every tracked file, in path order"""
+        return [entry['row'] for _, entry in sorted(self.files.items()) if entry.get('row') is not None]
+
+    def save(self):
+        """Atomically write the manifest, marking fully processed directories as clean"""
+        for rel_dir, scanned in self._scanned_dirs.items():
+            if scanned['pending']:
+                # Leave the directory dirty so unprocessed files are found next run
+                self.dirs.pop(rel_dir, None)
+            else:
+                self.dirs[rel_dir] = {'mtime_ns': scanned['mtime_ns'], 'subdirs': scanned['subdirs']}
+
+        data = {
+            'format': MANIFEST_FORMAT,
+            'base_path': self.base_path,
+            'extractor_version': self.extractor_version,
+            'files': self.files,
+            'dirs': self.dirs
+        }
+        os.makedirs(os.path.dirname(self.manifest_path) or '.', exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.manifest_path) or '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.manifest_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
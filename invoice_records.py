@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Typed invoice records and a columnar batch container
+InvoiceRecord is a slots dataclass instead of a dict with long string keys;
+InvoiceBatch stores a whole run column by column - Company, Month, Event
+Type and Stand as integer codes into a category table, prices in a packed
+float array - and hands those buffers to pandas or Arrow without copying
+"""
+
+import math
+from array import array
+from dataclasses import dataclass, fields
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+@dataclass(slots=True)
+class InvoiceRecord:
+    file_name: str
+    month: str = "Unknown"
+    invoice_date: str = None
+    company: str = "Unknown"
+    event_type: str = None
+    match: str = None
+    stand: str = None
+    match_date: str = None
+    quantity: object = None
+    price: float = 0.0
+    is_fee: bool = None
+    file_path: str = None
+    confidence: int = None
+    confidence_notes: str = None
+    confidence_level: str = None
+
+    @classmethod
+    def from_row(cls, row):
+        """Build a record from a ledger/report row dict"""
+        return cls(**{LABEL_TO_FIELD[label]: value for label, value in row.items() if label in LABEL_TO_FIELD})
+
+    def to_row(self, labels=None):
+        """Row dict with the given column labels (default: every column)"""
+        return {label: getattr(self, LABEL_TO_FIELD[label]) for label in (labels or DEFAULT_LABELS)}
+
+# Column label used in the spreadsheets/ledger for each record field
+FIELD_LABELS = {
+    "file_name": "File Name",
+    "month": "Month",
+    "invoice_date": "Invoice Date",
+    "company": "Company",
+    "event_type": "Event Type",
+    "match": "Match/Event",
+    "stand": "Stand Name",
+    "match_date": "Match Date",
+    "quantity": "Ticket Quantity",
+    "price": "Ticket Price",
+    "is_fee": "Is Convenience Fee",
+    "file_path": "File Path",
+    "confidence": "Confidence %",
+    "confidence_notes": "Confidence Notes",
+    "confidence_level": "Confidence Level",
+}
+LABEL_TO_FIELD = {label: field for field, label in FIELD_LABELS.items()}
+# batch_process and the ledger call the match column "Event/Match"
+LABEL_TO_FIELD["Event/Match"] = "match"
+DEFAULT_LABELS = list(FIELD_LABELS.values())
+
+CATEGORY_FIELDS = ("company", "month", "event_type", "stand")
+FLOAT_FIELDS = ("price",)
+# Small non-negative integers; -1 marks missing
+INT_FIELDS = ("confidence",)
+RECORD_FIELDS = tuple(field.name for field in fields(InvoiceRecord))
+
+class _Categories:
+    """Append-only category table: value -> code"""
+
+    __slots__ = ("values", "codes_by_value")
+
+    def __init__(self):
+        self.values = []
+        self.codes_by_value = {}
+
+    def code(self, value):
+        code = self.codes_by_value.get(value)
+        if code is None:
+            code = self.codes_by_value[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+class InvoiceBatch:
+    """
+    Column-oriented invoices.
+
+    Categorical fields are int32 codes (-1 = missing) plus a category list,
+    the price is a float64 array (NaN = missing), confidence an int32 array
+    (-1 = missing), everything else is a plain list. labels remembers which spreadsheet columns the rows had, in
+    order, so to_rows()/to_pandas() reproduce the same shape.
+
+    Exports share the array buffers, and an array cannot grow while one of
+    its buffers is exported, so the first append after an export moves the
+    batch onto fresh copies; the exported frame keeps the rows it was given.
+    """
+
+    def __init__(self, labels=None):
+        self.labels = list(labels) if labels else []
+        self.categories = {field: _Categories() for field in CATEGORY_FIELDS}
+        self.columns = {}
+        for field in RECORD_FIELDS:
+            if field in CATEGORY_FIELDS or field in INT_FIELDS:
+                self.columns[field] = array('i')
+            elif field in FLOAT_FIELDS:
+                self.columns[field] = array('d')
+            else:
+                self.columns[field] = []
+        self._exported = False
+
+    def __len__(self):
+        return len(self.columns["file_name"])
+
+    def _detach(self):
+        """Copy the array columns so their exported buffers are left to the exports"""
+        for field, column in self.columns.items():
+            if isinstance(column, array):
+                self.columns[field] = array(column.typecode, column)
+        self._exported = False
+
+    def append(self, record):
+        """Add one InvoiceRecord"""
+        if self._exported:
+            self._detach()
+        for field in RECORD_FIELDS:
+            value = getattr(record, field)
+            if field in CATEGORY_FIELDS:
+                self.columns[field].append(-1 if value is None else self.categories[field].code(value))
+            elif field in FLOAT_FIELDS:
+                self.columns[field].append(math.nan if value is None or value == "" else float(value))
+            elif field in INT_FIELDS:
+                self.columns[field].append(-1 if value is None or value == "" else int(value))
+            else:
+                self.columns[field].append(value)
+
+    def append_row(self, row):
+        """Add one row dict, tracking its column labels"""
+        for label in row:
+            if label in LABEL_TO_FIELD and label not in self.labels:
+                self.labels.append(label)
+        self.append(InvoiceRecord.from_row(row))
+
+    @classmethod
+    def from_rows(cls, rows):
+        batch = cls()
+        for row in rows:
+            if row is not None:
+                batch.append_row(row)
+        return batch
+
+    def record(self, index):
+        """Materialise one InvoiceRecord"""
+        values = {}
+        for field in RECORD_FIELDS:
+            value = self.columns[field][index]
+            if field in CATEGORY_FIELDS:
+                value = None if value < 0 else self.categories[field].values[value]
+            elif field in FLOAT_FIELDS and math.isnan(value):
+                value = None
+            elif field in INT_FIELDS and value < 0:
+                value = None
+            values[field] = value
+        return InvoiceRecord(**values)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.record(index)
+
+    def to_rows(self):
+        """Back to row dicts with the original column labels"""
+        return [record.to_row(self.labels) for record in self]
+
+    def _numpy(self, field):
+        column = self.columns[field]
+        if isinstance(column, array) and len(column):
+            self._exported = True
+        if field in CATEGORY_FIELDS or field in INT_FIELDS:
+            return np.frombuffer(column, dtype=np.int32) if len(column) else np.empty(0, dtype=np.int32)
+        if field in FLOAT_FIELDS:
+            return np.frombuffer(column, dtype=np.float64) if len(column) else np.empty(0, dtype=np.float64)
+        return column
+
+    def _sorted_codes(self, field, codes):
+        """
+        Codes against sorted categories, like astype('category') would give.
+
+        Categories are numbered in arrival order; when that is already
+        sorted the codes buffer is used as is, otherwise it is remapped.
+        """
+        categories = self.categories[field].values
+        try:
+            order = sorted(range(len(categories)), key=categories.__getitem__)
+        except TypeError:
+            return codes, categories
+        if order == list(range(len(categories))):
+            return codes, categories
+        rank = np.empty(len(categories) + 1, dtype=np.int32)
+        rank[order] = np.arange(len(categories), dtype=np.int32)
+        rank[-1] = -1
+        return rank[codes], [categories[index] for index in order]
+
+    def to_pandas(self):
+        """
+        DataFrame over the batch's buffers.
+
+        Float, integer and category-code columns wrap the array buffers
+        instead of copying them (codes are only remapped when categories
+        arrived out of order); integer columns with gaps become float NaN.
+        """
+        data = {}
+        for label in self.labels or DEFAULT_LABELS:
+            field = LABEL_TO_FIELD[label]
+            values = self._numpy(field)
+            if field in CATEGORY_FIELDS:
+                values, categories = self._sorted_codes(field, values)
+                values = pd.Categorical.from_codes(values, categories=pd.Index(categories))
+            elif field in INT_FIELDS:
+                if (values < 0).any():
+                    values = np.where(values < 0, np.nan, values)
+            data[label] = values
+        return pd.DataFrame(data, copy=False)
+
+    def to_arrow(self):
+        """pyarrow Table with dictionary-encoded categorical columns"""
+        if pa is None:
+            raise ImportError("pyarrow is required for InvoiceBatch.to_arrow()")
+        arrays = []
+        names = []
+        for label in self.labels or DEFAULT_LABELS:
+            field = LABEL_TO_FIELD[label]
+            values = self._numpy(field)
+            if field in CATEGORY_FIELDS:
+                codes = pa.array(values, mask=values < 0)
+                arrays.append(pa.DictionaryArray.from_arrays(codes, pa.array(self.categories[field].values)))
+            elif field in FLOAT_FIELDS:
+                arrays.append(pa.array(values, from_pandas=True))
+            elif field in INT_FIELDS:
+                arrays.append(pa.array(values, mask=values < 0))
+            else:
+                arrays.append(pa.array([_arrow_scalar(value) for value in values]))
+            names.append(label)
+        return pa.Table.from_arrays(arrays, names=names)
+
+def _arrow_scalar(value):
+    # Quantities mix ints with markers such as 'Not specified'
+    return value if value is None or isinstance(value, (str, bool)) else str(value)
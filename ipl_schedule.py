@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Indexed fixture schedule lookup
+Fixtures are keyed by the unordered team pair (so "CSK vs RCB" and
+"RCB vs CSK" are the same key) and keep every meeting of a pair, across any
+number of seasons loaded from schedules/*.json. Each season also records
+the window it was played in, for date inference
+"""
+
+import bisect
+import glob
+import json
+import os
+from datetime import date as calendar_date
+from functools import lru_cache
+
+SCHEDULE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schedules')
+
+def pair_key(team1, team2):
+    """Order-insensitive key for a fixture between two teams"""
+    return frozenset((team1.strip().upper(), team2.strip().upper()))
+
+class ScheduleIndex:
+    """Fixture index with O(1) pair/stage lookups and nearest-date resolution"""
+
+    def __init__(self):
+        self._by_pair = {}
+        self._by_team = {}
+        self._by_stage = {}
+        self._by_pair_date = {}
+        # (competition, season) -> {"competition", "season", "start", "end"}
+        self.seasons = {}
+
+    def _extend_season(self, competition, season, start, end):
+        window = self.seasons.setdefault((competition, season), {
+            "competition": competition, "season": season, "start": start, "end": end})
+        window["start"] = min(window["start"], start)
+        window["end"] = max(window["end"], end)
+
+    def add_fixture(self, date, teams=None, stage=None, competition="IPL", season=None):
+        """Register one fixture; either teams (a pair) or a named stage"""
+        fixture = {
+            "date": date,
+            "teams": list(teams) if teams else None,
+            "stage": stage,
+            "competition": competition,
+            "season": season or int(date[:4])
+        }
+        self._extend_season(competition, fixture["season"], date, date)
+        if teams:
+            key = pair_key(*teams)
+            self._by_pair.setdefault(key, FixtureDates()).add(fixture)
+            self._by_pair_date[(key, date)] = fixture
+            for team in key:
+                self._by_team.setdefault(team, FixtureDates()).add(fixture)
+        if stage:
+            self._by_stage.setdefault(stage.lower(), FixtureDates()).add(fixture)
+        return fixture
+
+    def load(self, path):
+        """
+        Load a season file: {"competition", "season", "fixtures": [...]}.
+
+        Optional "start"/"end" dates widen the season window beyond its
+        listed fixtures (or give it one when no fixtures are listed).
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        competition = data.get('competition', 'IPL')
+        for fixture in data['fixtures']:
+            self.add_fixture(fixture['date'], teams=fixture.get('teams'), stage=fixture.get('stage'),
+                             competition=competition, season=data.get('season'))
+        if 'start' in data and 'end' in data:
+            self._extend_season(competition, data.get('season') or int(data['start'][:4]), data['start'], data['end'])
+        return self
+
+    def fixtures(self, team1, team2):
+        """All meetings of two teams, oldest first"""
+        found = self._by_pair.get(pair_key(team1, team2))
+        return list(found.fixtures) if found else []
+
+    def fixture_on(self, team1, team2, date):
+        """The fixture between two teams on an exact date, if any"""
+        return self._by_pair_date.get((pair_key(team1, team2), date))
+
+    def lookup(self, team1, team2, near=None):
+        """Date of the meeting of two teams closest to `near` (see FixtureDates.nearest)"""
+        fixture = _nearest(self._by_pair.get(pair_key(team1, team2)), near)
+        return fixture["date"] if fixture else None
+
+    def lookup_team(self, team, near=None):
+        """Nearest fixture involving a single team, or None"""
+        return _nearest(self._by_team.get(team.strip().upper()), near)
+
+    def lookup_stage(self, stage, near=None):
+        """Date of a named stage such as 'Final' or 'Qualifier 1'"""
+        fixture = _nearest(self._by_stage.get(stage.strip().lower()), near)
+        return fixture["date"] if fixture else None
+
+    def lookup_match(self, match, near=None):
+        """Resolve 'CSK vs RCB' or a stage name like 'Eliminator' to a date"""
+        if " vs " in match:
+            teams = match.split(" vs ")
+            if len(teams) == 2:
+                return self.lookup(teams[0], teams[1], near)
+            return None
+        return self.lookup_stage(match, near)
+
+class FixtureDates:
+    """Fixtures in date order, with a parallel sorted list of their dates to bisect"""
+
+    __slots__ = ('dates', 'fixtures')
+
+    def __init__(self):
+        self.dates = []
+        self.fixtures = []
+
+    def add(self, fixture):
+        index = bisect.bisect_right(self.dates, fixture["date"])
+        self.dates.insert(index, fixture["date"])
+        self.fixtures.insert(index, fixture)
+
+    def nearest(self, near):
+        """
+        The fixture closest to an invoice date (YYYY-MM-DD).
+
+        Only the fixtures either side of `near` can be closest. On a tie the
+        later one wins, as tickets are bought before the match. Without a
+        date the earliest fixture is returned.
+        """
+        if not near:
+            return self.fixtures[0]
+        index = bisect.bisect_left(self.dates, near)
+        if index == len(self.dates):
+            return self.fixtures[-1]
+        if index == 0 or self.dates[index] == near:
+            return self.fixtures[index]
+        invoiced = calendar_date.fromisoformat(near)
+        before = (invoiced - calendar_date.fromisoformat(self.dates[index - 1])).days
+        after = (calendar_date.fromisoformat(self.dates[index]) - invoiced).days
+        return self.fixtures[index - 1] if before < after else self.fixtures[index]
+
+def _nearest(fixtures, near):
+    """FixtureDates.nearest, or None when there are no fixtures"""
+    return fixtures.nearest(near) if fixtures else None
+
+@lru_cache(maxsize=None)
+def default_schedule(schedule_dir=SCHEDULE_DIR):
+    """Index every season file in schedule_dir (loaded once per process)"""
+    index = ScheduleIndex()
+    for path in sorted(glob.glob(os.path.join(schedule_dir, '*.json'))):
+        index.load(path)
+    return index
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Append-oriented store for the invoice ledger (IPL_Event_Invoices_Complete.csv)
+New rows and keyed field updates go to a JSON-lines change log as atomic
+transactions; the CSV (and optional Parquet snapshot) is only rewritten on
+compaction, so a batch costs O(batch) instead of O(total history)
+"""
+
+import argparse
+import json
+import os
+import tempfile
+
+import pandas as pd
+
+DEFAULT_KEY = 'File Name'
+DEFAULT_COMPACT_EVERY = 500
+
+class LedgerStore:
+    """
+    Ledger = compacted base CSV + change log of committed transactions.
+
+    Each transaction is written as its operation lines followed by a commit
+    marker in a single fsync'd append. On open, anything after the last
+    commit marker (a crash mid-write) is truncated, so a partially written
+    batch is never applied and the base CSV is never left half-written.
+    """
+
+    def __init__(self, csv_path, key=DEFAULT_KEY, log_path=None, compact_every=DEFAULT_COMPACT_EVERY):
+        self.csv_path = csv_path
+        self.key = key
+        self.log_path = log_path or csv_path + '.log.jsonl'
+        self.parquet_path = os.path.splitext(csv_path)[0] + '.parquet'
+        self.compact_every = compact_every
+        self._recover_compaction()
+        self._recover_log()
+
+    def _recover_compaction(self):
+        """Finish or discard a compaction interrupted by a crash"""
+        compacting_path = self.log_path + '.compacting'
+        if not os.path.exists(compacting_path):
+            return
+        # The new base is written after the log was set aside, so a base newer
+        # than the set-aside log already contains it
+        if os.path.exists(self.csv_path) and os.path.getmtime(self.csv_path) >= os.path.getmtime(compacting_path):
+            os.remove(compacting_path)
+        else:
+            self._fold(compacting_path)
+
+    def _recover_log(self):
+        """Drop any uncommitted tail left behind by an interrupted write"""
+        if not os.path.exists(self.log_path):
+            self.pending_ops = 0
+            self._next_txn = 1
+            return
+        committed_end = 0
+        ops = 0
+        txn_ops = 0
+        last_txn = 0
+        with open(self.log_path, 'rb') as f:
+            offset = 0
+            for line in f:
+                offset += len(line)
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if record.get('commit'):
+                    committed_end = offset
+                    ops += txn_ops
+                    txn_ops = 0
+                    last_txn = record['txn']
+                else:
+                    txn_ops += 1
+        if committed_end != os.path.getsize(self.log_path):
+            with open(self.log_path, 'r+b') as f:
+                f.truncate(committed_end)
+                f.flush()
+                os.fsync(f.fileno())
+        self.pending_ops = ops
+        self._next_txn = last_txn + 1
+
+    def _commit(self, records, tag=None):
+        """Append one transaction to the log and fsync it"""
+        if not records:
+            return
+        txn = self._next_txn
+        lines = [json.dumps(dict(record, txn=txn), ensure_ascii=False, default=str) for record in records]
+        marker = {'txn': txn, 'commit': True, 'ops': len(records)}
+        if tag is not None:
+            marker['tag'] = tag
+        lines.append(json.dumps(marker))
+        with open(self.log_path, 'a', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self._next_txn += 1
+        self.pending_ops += len(records)
+
+    def append_rows(self, rows, tag=None):
+        """
+        Atomically add new ledger rows (list of dicts).
+
+        tag is stored on the commit marker so a caller replaying its own
+        journal can ask has_tag() whether the rows already landed; tags
+        live until the next compaction.
+        """
+        self._commit([{'op': 'append', 'row': row} for row in rows], tag=tag)
+
+    def has_tag(self, tag):
+        """True if a committed, not yet compacted transaction carries tag"""
+        if not os.path.exists(self.log_path):
+            return False
+        with open(self.log_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                if record.get('commit') and record.get('tag') == tag:
+                    return True
+        return False
+
+    def update_rows(self, updates):
+        """Atomically apply keyed updates: {key value: {column: new value}}"""
+        self._commit([{'op': 'update', 'key': key, 'fields': fields} for key, fields in updates.items()])
+
+    def _read_log(self, log_path=None):
+        """Yield committed operations in order"""
+        log_path = log_path or self.log_path
+        if not os.path.exists(log_path):
+            return
+        buffered = []
+        with open(log_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                if record.get('commit'):
+                    yield from buffered
+                    buffered = []
+                else:
+                    buffered.append(record)
+
+    def _read_base(self):
+        if os.path.exists(self.csv_path):
+            return pd.read_csv(self.csv_path)
+        return pd.DataFrame()
+
+    def read(self, log_path=None):
+        """Return the full ledger as a DataFrame: base plus replayed log"""
+        df = self._read_base()
+        appended = []
+        updates = []
+        for record in self._read_log(log_path):
+            if record['op'] == 'append':
+                appended.append(record['row'])
+            elif record['op'] == 'update':
+                updates.append(record)
+        if appended:
+            df = pd.concat([df, pd.DataFrame(appended)], ignore_index=True)
+        if updates:
+            positions = {}
+            for position, key in enumerate(df[self.key].tolist()):
+                positions.setdefault(key, []).append(position)
+            for record in updates:
+                for position in positions.get(record['key'], []):
+                    for column, value in record['fields'].items():
+                        if column not in df.columns:
+                            df[column] = None
+                        location = df.columns.get_loc(column)
+                        try:
+                            df.iat[position, location] = value
+                        except (TypeError, ValueError):
+                            # The column's dtype cannot hold the value (e.g. an int
+                            # into a string column); widen it to object and retry
+                            df[column] = df[column].astype(object)
+                            df.iat[position, location] = value
+        return df
+
+    def keys(self):
+        """Return the set of key values without materialising the full ledger"""
+        keys = set()
+        if os.path.exists(self.csv_path):
+            keys.update(pd.read_csv(self.csv_path, usecols=[self.key])[self.key].tolist())
+        for record in self._read_log():
+            if record['op'] == 'append':
+                keys.add(record['row'].get(self.key))
+        return keys
+
+    def _write_atomic(self, write, path):
+        """Write to a temp file next to path, fsync, then rename over path"""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        os.close(fd)
+        try:
+            write(tmp_path)
+            with open(tmp_path, 'rb') as f:
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _fold(self, log_path, parquet=False):
+        """Write base + log_path as the new base, then drop log_path"""
+        df = self.read(log_path)
+        self._write_atomic(lambda tmp_path: df.to_csv(tmp_path, index=False), self.csv_path)
+        if parquet:
+            try:
+                self._write_atomic(lambda tmp_path: df.to_parquet(tmp_path, index=False), self.parquet_path)
+            except ImportError as e:
+                print(f"  ✗ Parquet snapshot skipped: {e}")
+        os.remove(log_path)
+        return len(df)
+
+    def compact(self, parquet=False):
+        """Fold the log into the base CSV (and optionally a Parquet snapshot)"""
+        compacting_path = self.log_path + '.compacting'
+        if not os.path.exists(self.log_path):
+            open(self.log_path, 'a').close()
+        # Set the log aside first so a crash can never replay it onto a base
+        # that already contains it
+        os.replace(self.log_path, compacting_path)
+        rows = self._fold(compacting_path, parquet=parquet)
+        self.pending_ops = 0
+        self._next_txn = 1
+        return rows
+
+    def maybe_compact(self, parquet=False):
+        """Compact once the log has grown past compact_every operations"""
+        if self.pending_ops >= self.compact_every:
+            return self.compact(parquet=parquet)
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect or compact the invoice ledger')
+    parser.add_argument('command', choices=['compact', 'status'])
+    parser.add_argument('--csv', default='/Users/sumitjha/Dropbox/Mac/Documents/Projects/fpl-auction/IPL_Event_Invoices_Complete.csv')
+    parser.add_argument('--parquet', action='store_true', help='also write a Parquet snapshot when compacting')
+    args = parser.parse_args()
+
+    store = LedgerStore(args.csv)
+    if args.command == 'status':
+        print(f"Pending log operations: {store.pending_ops}")
+    else:
+        rows = store.compact(parquet=args.parquet)
+        print(f"Compacted ledger: {rows} rows written to {args.csv}")
+
+if __name__ == "__main__":
+    main()
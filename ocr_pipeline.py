@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+OCR pre-processing and region-of-interest pipeline for invoice images
+Normalises size and contrast, binarizes, deskews, crops away blank space
+between text regions and runs Tesseract once on the compacted regions with
+a page-segmentation mode tuned per vendor
+"""
+
+import os
+
+import numpy as np
+from PIL import Image, ImageOps
+import pytesseract
+
+from vendor_parsers import REGISTRY, detect_vendor
+
+# Tesseract is most accurate with cap heights around 20-30px; phone
+# screenshots are far larger than needed and small crops are too small
+MAX_WIDTH = 1400
+MIN_WIDTH = 900
+
+# Deskew search range (degrees) for photographed invoices
+DESKEW_ANGLES = [angle / 2 for angle in range(-10, 11)]
+
+# Rows with fewer ink pixels than this fraction of the width count as blank
+INK_ROW_FRACTION = 0.002
+# Blank gaps taller than this (px) split text regions
+REGION_GAP = 24
+REGION_MARGIN = 8
+
+# Page segmentation when the vendor parser does not set one (3 = fully automatic)
+DEFAULT_PSM = 3
+
+def normalise(image):
+    """Grayscale, light-on-dark inversion and rescale to a Tesseract-friendly width"""
+    image = ImageOps.exif_transpose(image).convert('L')
+    if np.asarray(image).mean() < 110:
+        # Dark-mode screenshot: Tesseract wants dark text on light background
+        image = ImageOps.invert(image)
+    width, height = image.size
+    if width > MAX_WIDTH:
+        image = image.resize((MAX_WIDTH, round(height * MAX_WIDTH / width)), Image.LANCZOS)
+    elif width < MIN_WIDTH:
+        image = image.resize((MIN_WIDTH, round(height * MIN_WIDTH / width)), Image.LANCZOS)
+    return ImageOps.autocontrast(image, cutoff=1)
+
+def otsu_threshold(image):
+    """Global Otsu threshold from the grayscale histogram"""
+    histogram = np.array(image.histogram()[:256], dtype=np.float64)
+    total = histogram.sum()
+    levels = np.arange(256)
+    weight_background = np.cumsum(histogram)
+    weight_foreground = total - weight_background
+    cumulative_mean = np.cumsum(histogram * levels)
+    mean_background = cumulative_mean / np.maximum(weight_background, 1)
+    mean_foreground = (cumulative_mean[-1] - cumulative_mean) / np.maximum(weight_foreground, 1)
+    between = weight_background * weight_foreground * (mean_background - mean_foreground) ** 2
+    return int(np.argmax(between))
+
+def binarize(image):
+    """Return (binary PIL image, boolean ink mask)"""
+    threshold = otsu_threshold(image)
+    ink = np.asarray(image) <= threshold
+    return Image.fromarray(np.where(ink, 0, 255).astype(np.uint8)), ink
+
+def estimate_skew(ink):
+    """Angle (degrees) that maximises horizontal projection sharpness"""
+    # Work on a small sample; skew estimation does not need full resolution
+    step = max(1, ink.shape[1] // 400)
+    sample = Image.fromarray((ink[::step, ::step] * 255).astype(np.uint8))
+    best_angle, best_score = 0.0, -1.0
+    for angle in DESKEW_ANGLES:
+        rotated = np.asarray(sample.rotate(angle, expand=False, fillcolor=0)) > 0
+        profile = rotated.sum(axis=1).astype(np.float64)
+        score = np.square(np.diff(profile)).sum()
+        if score > best_score:
+            best_angle, best_score = angle, score
+    return best_angle
+
+def text_regions(ink):
+    """Vertical (top, bottom) spans that contain text, split on tall blank gaps"""
+    row_ink = ink.sum(axis=1)
+    inked = row_ink > max(1, ink.shape[1] * INK_ROW_FRACTION)
+    regions = []
+    start = None
+    last_ink = None
+    for row in np.flatnonzero(inked):
+        if start is None:
+            start = row
+        elif row - last_ink > REGION_GAP:
+            regions.append((start, last_ink + 1))
+            start = row
+        last_ink = row
+    if start is not None:
+        regions.append((start, last_ink + 1))
+    return regions
+
+def compact_regions(binary, regions):
+    """Stack the text regions into one image with small fixed gaps between them"""
+    width, height = binary.size
+    crops = [binary.crop((0, max(0, top - REGION_MARGIN), width, min(height, bottom + REGION_MARGIN)))
+             for top, bottom in regions]
+    total_height = sum(crop.size[1] for crop in crops) + REGION_GAP * (len(crops) - 1)
+    canvas = Image.new('L', (width, max(1, total_height)), 255)
+    offset = 0
+    for crop in crops:
+        canvas.paste(crop, (0, offset))
+        offset += crop.size[1] + REGION_GAP
+    return canvas
+
+def preprocess(image):
+    """Full pre-processing: normalise, binarize, deskew and crop to text regions"""
+    binary, ink = binarize(normalise(image))
+    angle = estimate_skew(ink)
+    if angle:
+        binary = binary.rotate(angle, expand=True, fillcolor=255, resample=Image.BICUBIC)
+        ink = np.asarray(binary) < 128
+    regions = text_regions(ink)
+    if not regions:
+        return binary, {"angle": angle, "regions": 0}
+    return compact_regions(binary, regions), {"angle": angle, "regions": len(regions)}
+
+def psm_for(vendor=None):
+    """Tesseract page segmentation mode tuned for a vendor parser"""
+    if vendor is None or vendor.ocr_psm is None:
+        return DEFAULT_PSM
+    return vendor.ocr_psm
+
+def prepare_image(image_path, vendor=None):
+    """
+    Load and pre-process an invoice image, returning (image, psm).
+
+    image_path may also be a binary file object; its name attribute is
+    used for vendor detection. vendor is a parser or its name.
+    """
+    if isinstance(vendor, str):
+        vendor = REGISTRY.get(vendor)
+    name = image_path if isinstance(image_path, str) else getattr(image_path, 'name', '')
+    vendor = vendor or detect_vendor(filename=os.path.basename(name))
+    with Image.open(image_path) as image:
+        prepared, _ = preprocess(image)
+    return prepared, psm_for(vendor)
+
+def ocr_image(image_path, vendor=None):
+    """OCR an invoice image through the pre-processing pipeline (one tesseract run)"""
+    prepared, psm = prepare_image(image_path, vendor)
+    return pytesseract.image_to_string(prepared, config=f"--oem 1 --psm {psm}")
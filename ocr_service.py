@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Long-lived OCR service for invoice images
+Keeps Tesseract warm instead of forking a fresh binary per image: with
+tesserocr installed each worker thread owns one loaded engine; otherwise
+queued images are batched into a single tesseract run via a list file.
+Submissions go through a bounded queue, so producers block (backpressure)
+when OCR falls behind
+"""
+
+import atexit
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from functools import lru_cache
+
+from ocr_pipeline import prepare_image
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+TESSERACT_CMD = 'tesseract'
+DEFAULT_BATCH_SIZE = 8
+# How long a worker waits for more images before running a partial batch
+DEFAULT_LINGER = 0.05
+PAGE_SEPARATOR = '\f'
+
+class LatencyStats:
+    """Per-image queue wait and OCR time, reported as percentiles"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.waits = []
+        self.latencies = []
+        self.batches = 0
+
+    def record_batch(self, jobs, finished):
+        with self.lock:
+            self.batches += 1
+            for job in jobs:
+                self.waits.append(job["started"] - job["submitted"])
+                self.latencies.append(finished - job["submitted"])
+
+    def report(self):
+        with self.lock:
+            if not self.latencies:
+                return "  ocr: no images"
+            latencies = sorted(self.latencies)
+            waits = sorted(self.waits)
+        count = len(latencies)
+        return (f"  ocr: {count} images in {self.batches} batches, latency p50 {_percentile(latencies, 50):.2f}s, "
+                f"p95 {_percentile(latencies, 95):.2f}s, max {latencies[-1]:.2f}s "
+                f"(queue wait p50 {_percentile(waits, 50):.2f}s)")
+
+def _percentile(values, percent):
+    index = min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))
+    return values[index]
+
+class TesserocrBackend:
+    """One warm tesserocr engine per worker thread"""
+
+    name = "tesserocr"
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def _api(self):
+        if not hasattr(self.local, 'api'):
+            self.local.api = tesserocr.PyTessBaseAPI()
+        return self.local.api
+
+    def recognize(self, images):
+        api = self._api()
+        texts = []
+        for image, psm in images:
+            api.SetPageSegMode(psm)
+            api.SetImage(image)
+            texts.append(api.GetUTF8Text())
+        return texts
+
+    def close(self):
+        api = getattr(self.local, 'api', None)
+        if api is not None:
+            api.End()
+
+class CLIBackend:
+    """Batch images into one tesseract process per page-segmentation mode"""
+
+    name = "tesseract-cli"
+
+    def recognize(self, images):
+        texts = [""] * len(images)
+        by_psm = {}
+        for position, (image, psm) in enumerate(images):
+            by_psm.setdefault(psm, []).append((position, image))
+        for psm, group in by_psm.items():
+            for (position, _), text in zip(group, self._run(psm, [image for _, image in group])):
+                texts[position] = text
+        return texts
+
+    def _run(self, psm, images):
+        with tempfile.TemporaryDirectory(prefix='ocr_batch_') as batch_dir:
+            paths = []
+            for number, image in enumerate(images):
+                path = os.path.join(batch_dir, f'{number:04d}.png')
+                image.save(path)
+                paths.append(path)
+            list_path = os.path.join(batch_dir, 'images.txt')
+            with open(list_path, 'w') as f:
+                f.write('\n'.join(paths) + '\n')
+            # One tesseract per worker thread already; keep OpenMP from oversubscribing
+            env = dict(os.environ, OMP_THREAD_LIMIT='1')
+            output = subprocess.run([TESSERACT_CMD, list_path, 'stdout', '--oem', '1', '--psm', str(psm)],
+                                    capture_output=True, text=True, env=env).stdout
+        # Every page, the last included, ends with a separator
+        if output.endswith(PAGE_SEPARATOR):
+            output = output[:-len(PAGE_SEPARATOR)]
+        texts = output.split(PAGE_SEPARATOR)
+        if len(texts) == len(images):
+            return texts
+        # Separator count did not line up (e.g. an unreadable image); retry singly
+        if len(images) == 1:
+            return [output]
+        return [self._run(psm, [image])[0] for image in images]
+
+    def close(self):
+        pass
+
+def default_backend():
+    if tesserocr is not None:
+        return TesserocrBackend()
+    if shutil.which(TESSERACT_CMD):
+        return CLIBackend()
+    raise RuntimeError("Neither tesserocr nor the tesseract binary is available")
+
+class OCRService:
+    """
+    Pool of OCR worker threads fed from a bounded queue.
+
+    submit() returns a Future for the image text and blocks while max_queue
+    images are already waiting. Workers pull up to batch_size images at a
+    time (waiting at most `linger` seconds to fill a batch), pre-process them
+    with ocr_pipeline and recognise them with the backend.
+    """
+
+    def __init__(self, workers=None, batch_size=DEFAULT_BATCH_SIZE, max_queue=None,
+                 linger=DEFAULT_LINGER, backend=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.linger = linger
+        self.backend = backend or default_backend()
+        self.jobs = queue.Queue(maxsize=max_queue or self.workers * batch_size * 2)
+        self.stats = LatencyStats()
+        self.closed = False
+        self.threads = [threading.Thread(target=self._work, name=f'ocr-{number}', daemon=True)
+                        for number in range(self.workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, image_path, vendor=None):
+        """Queue an image for OCR; blocks while the queue is full"""
+        if self.closed:
+            raise RuntimeError("OCR service is closed")
+        future = Future()
+        self.jobs.put({"path": image_path, "vendor": vendor, "future": future, "submitted": time.perf_counter()})
+        return future
+
+    def ocr(self, image_path, vendor=None):
+        """OCR one image and wait for the text"""
+        return self.submit(image_path, vendor).result()
+
+    def _next_batch(self):
+        job = self.jobs.get()
+        if job is None:
+            return None
+        batch = [job]
+        deadline = time.perf_counter() + self.linger
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                job = self.jobs.get(timeout=max(remaining, 0)) if remaining > 0 else self.jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                # Leave the shutdown marker for this worker's next loop
+                self.jobs.put(None)
+                break
+            batch.append(job)
+        return batch
+
+    def _work(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                self.backend.close()
+                return
+            started = time.perf_counter()
+            prepared = []
+            ready = []
+            for job in batch:
+                job["started"] = started
+                try:
+                    prepared.append(prepare_image(job["path"], job["vendor"]))
+                    ready.append(job)
+                except Exception as e:
+                    job["future"].set_exception(e)
+            try:
+                texts = self.backend.recognize(prepared) if prepared else []
+            except Exception as e:
+                for job in ready:
+                    job["future"].set_exception(e)
+                continue
+            self.stats.record_batch(ready, time.perf_counter())
+            for job, text in zip(ready, texts):
+                job["future"].set_result(text)
+
+    def close(self):
+        """Finish queued work and stop the workers"""
+        if self.closed:
+            return
+        self.closed = True
+        for _ in self.threads:
+            self.jobs.put(None)
+        for thread in self.threads:
+            thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+@lru_cache(maxsize=None)
+def default_service():
+    """Process-wide OCR service, started on first use"""
+    service = OCRService()
+    atexit.register(service.close)
+    return service
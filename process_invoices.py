@@ -9,67 +9,14 @@ import pandas as pd
 from datetime import datetime
 import json
 
-# IPL 2024 Match Schedule (based on web search results)
-IPL_2024_SCHEDULE = {
-    "CSK vs RCB": "2024-03-22",
-    "PBKS vs DC": "2024-03-23", 
-    "KKR vs SRH": "2024-03-23",
-    "RR vs LSG": "2024-03-24",
-    "GT vs MI": "2024-03-24",
-    "RCB vs PBKS": "2024-03-25",
-    "CSK vs GT": "2024-03-26",
-    "DC vs MI": "2024-03-27",
-    "RR vs RCB": "2024-03-30",
-    "LSG vs PBKS": "2024-03-30",
-    "KKR vs DC": "2024-03-29",
-    "GT vs SRH": "2024-03-31",
-    "MI vs RR": "2024-04-01",
-    "RCB vs LSG": "2024-04-02",
-    "DC vs CSK": "2024-04-03",
-    "GT vs PBKS": "2024-04-04",
-    "SRH vs MI": "2024-04-05",
-    "RR vs KKR": "2024-04-06",
-    "CSK vs SRH": "2024-04-07",
-    "RCB vs MI": "2024-04-11",
-    "DC vs LSG": "2024-04-12",
-    "PBKS vs GT": "2024-04-13",
-    "KKR vs RCB": "2024-04-21",
-    "MI vs PBKS": "2024-04-25",
-    "RCB vs CSK": "2024-05-18",
-    "DC vs LSG": "2024-05-14",
-    "GT vs KKR": "2024-05-13",
-    "DC vs RR": "2024-05-07",
-    # Add playoff matches
-    "Qualifier 1": "2024-05-21",
-    "Eliminator": "2024-05-22", 
-    "Qualifier 2": "2024-05-24",
-    "Final": "2024-05-26"
-}
+from ipl_schedule import default_schedule
+from vendor_parsers import company_for
+from field_extractor import extract_fields, field_value
+from date_inference import infer_invoice_date
 
 def extract_company_from_text(text):
     """Extract company name from invoice text"""
-    companies = {
-        "ticketgenie": "TicketGenie",
-        "bookmyshow": "BookMyShow", 
-        "bms": "BookMyShow",
-        "paytm": "Paytm Insider",
-        "insider": "Paytm Insider",
-        "wasteland": "Paytm Insider",
-        "bigtree": "BookMyShow",
-        "jsw gmr": "JSW GMR",
-        "irelia sports": "Irelia Sports",
-        "kph dream": "KPH Dream Sports",
-        "omio": "Omio",
-        "ticombo": "Ticombo",
-        "football": "Football Platform",
-        "chelsea": "Chelsea FC"
-    }
-    
-    text_lower = text.lower()
-    for key, value in companies.items():
-        if key in text_lower:
-            return value
-    return "Unknown"
+    return company_for(text=text)
 
 def extract_match_details(text):
     """Extract match/event details from invoice text"""
@@ -169,25 +116,13 @@ def extract_stand_name(text):
             return matches[0].strip()
     return "General"
 
-def extract_invoice_date(text, filename):
+def extract_invoice_date(text, filename, filepath=None):
     """Extract invoice date from text or filename"""
-    # Try to get date from filename first
-    date_patterns = [
-        r'(\d{1,2})\.(\d{1,2})_',  # DD.MM_ format
-        r'(\d{1,2})\.(\d{2})_',     # DD.MM_ format
-        r'(\d{4})-(\d{2})-(\d{2})', # YYYY-MM-DD format
-        r'(\d{1,2})[/-](\d{1,2})[/-](\d{2,4})'  # Various date formats
-    ]
-    
-    for pattern in date_patterns[:2]:
-        matches = re.findall(pattern, filename)
-        if matches:
-            day, month = matches[0]
-            year = "2024"  # Assuming 2024 for IPL season
-            try:
-                return f"{year}-{month.zfill(2)}-{day.zfill(2)}"
-            except:
-                continue
+    # Filename day/month first, with the year from the printed date, folder or season (see date_inference)
+    text_date = field_value(extract_fields(text, fields=('invoice_date',)), 'invoice_date') if text else None
+    inferred = infer_invoice_date(filename, filepath, text_date=text_date)
+    if inferred['date']:
+        return inferred['date']
     
     # Try to extract from text
     date_text_patterns = [
@@ -227,7 +162,7 @@ def process_single_invoice(filepath, text_content):
     invoice_data = {
         "File Name": filename,
         "Month": get_month_from_path(filepath),
-        "Invoice Date": extract_invoice_date(text_content, filename),
+        "Invoice Date": extract_invoice_date(text_content, filename, filepath),
         "Company": extract_company_from_text(text_content),
         "Event/Match": extract_match_details(text_content),
         "Stand Name": extract_stand_name(text_content),
@@ -237,17 +172,12 @@ def process_single_invoice(filepath, text_content):
         "File Path": filepath
     }
     
-    # If it's an IPL match, try to get the match date
-    match = invoice_data["Event/Match"]
-    if match in IPL_2024_SCHEDULE:
-        invoice_data["Match Date"] = IPL_2024_SCHEDULE[match]
-    elif "vs" in match:
-        # Try to find in schedule with teams reversed
-        teams = match.split(" vs ")
-        if len(teams) == 2:
-            reversed_match = f"{teams[1]} vs {teams[0]}"
-            if reversed_match in IPL_2024_SCHEDULE:
-                invoice_data["Match Date"] = IPL_2024_SCHEDULE[reversed_match]
+    # If it's an IPL match, try to get the match date (either team order)
+    invoice_date = invoice_data["Invoice Date"]
+    near = invoice_date if re.match(r'\d{4}-\d{2}-\d{2}$', invoice_date) else None
+    match_date = default_schedule().lookup_match(invoice_data["Event/Match"], near=near)
+    if match_date:
+        invoice_data["Match Date"] = match_date
     
     # Handle convenience fee invoices
     if "fee" in filename.lower() or "convenience" in text_content.lower():
@@ -256,54 +186,58 @@ def process_single_invoice(filepath, text_content):
     
     return invoice_data
 
-# Sample data for demonstration
-sample_invoices = [
-    {
-        "File Name": "31.03_Ticket_768.pdf",
-        "Month": "March",
-        "Invoice Date": "2024-03-31",
-        "Company": "TicketGenie",
-        "Event/Match": "RCB vs PBKS",
-        "Stand Name": "QATAR AIRWAYS FAN TERRACE N",
-        "Match Date": "2024-03-25",
-        "Ticket Quantity": 5,
-        "Ticket Price": 18906.25,
-        "File Path": "/Invoices/Mar_24/31.03_Ticket_768.pdf"
-    },
-    {
-        "File Name": "10.5_Waste_35604.8.pdf",
-        "Month": "May",
-        "Invoice Date": "2024-05-01",
-        "Company": "Paytm Insider",
-        "Event/Match": "DC vs RR",
-        "Stand Name": "Phase 1 | OCH 1st Floor",
-        "Match Date": "2024-05-07",
-        "Ticket Quantity": 4,
-        "Ticket Price": 35604.80,
-        "File Path": "/Invoices/May_24/10.5_Waste_35604.8.pdf"
-    },
-    {
-        "File Name": "9.5_ticket_19360.pdf",
-        "Month": "May",
-        "Invoice Date": "2024-05-09",
-        "Company": "TicketGenie",
-        "Event/Match": "RCB vs CSK",
-        "Stand Name": "QATAR AIRWAYS E EXECUTIVE LOUNGE",
-        "Match Date": "2024-05-18",
-        "Ticket Quantity": 2,
-        "Ticket Price": 19360.00,
-        "File Path": "/Invoices/May_24/9.5_ticket_19360.pdf"
-    }
-]
+def main():
+    # Sample data for demonstration
+    sample_invoices = [
+        {
+            "File Name": "31.03_Ticket_768.pdf",
+            "Month": "March",
+            "Invoice Date": "2024-03-31",
+            "Company": "TicketGenie",
+            "Event/Match": "RCB vs PBKS",
+            "Stand Name": "QATAR AIRWAYS FAN TERRACE N",
+            "Match Date": "2024-03-25",
+            "Ticket Quantity": 5,
+            "Ticket Price": 18906.25,
+            "File Path": "/Invoices/Mar_24/31.03_Ticket_768.pdf"
+        },
+        {
+            "File Name": "10.5_Waste_35604.8.pdf",
+            "Month": "May",
+            "Invoice Date": "2024-05-01",
+            "Company": "Paytm Insider",
+            "Event/Match": "DC vs RR",
+            "Stand Name": "Phase 1 | OCH 1st Floor",
+            "Match Date": "2024-05-07",
+            "Ticket Quantity": 4,
+            "Ticket Price": 35604.80,
+            "File Path": "/Invoices/May_24/10.5_Waste_35604.8.pdf"
+        },
+        {
+            "File Name": "9.5_ticket_19360.pdf",
+            "Month": "May",
+            "Invoice Date": "2024-05-09",
+            "Company": "TicketGenie",
+            "Event/Match": "RCB vs CSK",
+            "Stand Name": "QATAR AIRWAYS E EXECUTIVE LOUNGE",
+            "Match Date": "2024-05-18",
+            "Ticket Quantity": 2,
+            "Ticket Price": 19360.00,
+            "File Path": "/Invoices/May_24/9.5_ticket_19360.pdf"
+        }
+    ]
+
+    # Create DataFrame
+    df = pd.DataFrame(sample_invoices)
 
-# Create DataFrame
-df = pd.DataFrame(sample_invoices)
+    # Save to Excel
+    output_file = "/Users/sumitjha/Dropbox/Mac/Documents/Projects/fpl-auction/IPL_Event_Invoices_Summary.xlsx"
+    df.to_excel(output_file, index=False, engine='openpyxl')
 
-# Save to Excel
-output_file = "/Users/sumitjha/Dropbox/Mac/Documents/Projects/fpl-auction/IPL_Event_Invoices_Summary.xlsx"
-df.to_excel(output_file, index=False, engine='openpyxl')
+    print(f"Excel file created: {output_file}")
+    print(f"Total invoices processed: {len(df)}")
+    print("\nSample of processed data:")
+    print(df[['File Name', 'Company', 'Event/Match', 'Ticket Price']].head())
 
-print(f"Excel file created: {output_file}")
-print(f"Total invoices processed: {len(df)}")
-print("\nSample of processed data:")
-print(df[['File Name', 'Company', 'Event/Match', 'Ticket Price']].head())
\ No newline at end of file
+if __name__ == "__main__":
+    main()
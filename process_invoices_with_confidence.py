@@ -5,245 +5,64 @@ Creates comprehensive Excel report with extraction confidence levels
 """
 
 import os
-import re
-import pandas as pd
-from datetime import datetime
+import time
+import argparse
 
-# IPL 2024 Complete Match Schedule
-IPL_2024_MATCHES = {
-    # March 2024
-    "CSK vs RCB": "2024-03-22",
-    "RCB vs CSK": "2024-03-22",
-    "PBKS vs DC": "2024-03-23",
-    "DC vs PBKS": "2024-03-23",
-    "KKR vs SRH": "2024-03-23",
-    "SRH vs KKR": "2024-03-23",
-    "RR vs LSG": "2024-03-24",
-    "LSG vs RR": "2024-03-24",
-    "GT vs MI": "2024-03-24",
-    "MI vs GT": "2024-03-24",
-    "RCB vs PBKS": "2024-03-25",
-    "PBKS vs RCB": "2024-03-25",
-    "CSK vs GT": "2024-03-26",
-    "GT vs CSK": "2024-03-26",
-    "DC vs MI": "2024-03-27",
-    "MI vs DC": "2024-03-27",
-    "KKR vs DC": "2024-03-29",
-    "DC vs KKR": "2024-03-29",
-    "RR vs RCB": "2024-03-30",
-    "RCB vs RR": "2024-03-30",
-    "LSG vs PBKS": "2024-03-30",
-    "PBKS vs LSG": "2024-03-30",
-    "GT vs SRH": "2024-03-31",
-    "SRH vs GT": "2024-03-31",
-    
-    # April 2024
-    "MI vs RR": "2024-04-01",
-    "RR vs MI": "2024-04-01",
-    "RCB vs LSG": "2024-04-02",
-    "LSG vs RCB": "2024-04-02",
-    "DC vs CSK": "2024-04-03",
-    "CSK vs DC": "2024-04-03",
-    "GT vs PBKS": "2024-04-04",
-    "PBKS vs GT": "2024-04-04",
-    "SRH vs MI": "2024-04-05",
-    "MI vs SRH": "2024-04-05",
-    "RR vs KKR": "2024-04-06",
-    "KKR vs RR": "2024-04-06",
-    "CSK vs SRH": "2024-04-07",
-    "SRH vs CSK": "2024-04-07",
-    "RR vs GT": "2024-04-08",
-    "GT vs RR": "2024-04-08",
-    "RCB vs MI": "2024-04-11",
-    "MI vs RCB": "2024-04-11",
-    "DC vs LSG": "2024-04-12",
-    "LSG vs DC": "2024-04-12",
-    "PBKS vs GT": "2024-04-13",
-    "GT vs PBKS": "2024-04-13",
-    "CSK vs PBKS": "2024-04-14",
-    "PBKS vs CSK": "2024-04-14",
-    "KKR vs LSG": "2024-04-14",
-    "LSG vs KKR": "2024-04-14",
-    "SRH vs RR": "2024-04-15",
-    "RR vs SRH": "2024-04-15",
-    "MI vs DC": "2024-04-16",
-    "DC vs MI": "2024-04-16",
-    "PBKS vs SRH": "2024-04-17",
-    "SRH vs PBKS": "2024-04-17",
-    "RCB vs GT": "2024-04-18",
-    "GT vs RCB": "2024-04-18",
-    "PBKS vs MI": "2024-04-25",
-    "MI vs PBKS": "2024-04-25",
-    "KKR vs RCB": "2024-04-21",
-    "RCB vs KKR": "2024-04-21",
-    "DC vs GT": "2024-04-24",
-    "GT vs DC": "2024-04-24",
-    "CSK vs LSG": "2024-04-23",
-    "LSG vs CSK": "2024-04-23",
-    "MI vs KKR": "2024-04-26",
-    "KKR vs MI": "2024-04-26",
-    "RCB vs DC": "2024-04-27",
-    "DC vs RCB": "2024-04-27",
-    "CSK vs SRH": "2024-04-28",
-    "SRH vs CSK": "2024-04-28",
-    "KKR vs PBKS": "2024-04-28",
-    "PBKS vs KKR": "2024-04-28",
-    "LSG vs RR": "2024-04-27",
-    "RR vs LSG": "2024-04-27",
-    "GT vs RCB": "2024-04-28",
-    "RCB vs GT": "2024-04-28",
-    
-    # May 2024
-    "MI vs LSG": "2024-05-03",
-    "LSG vs MI": "2024-05-03",
-    "CSK vs PBKS": "2024-05-05",
-    "PBKS vs CSK": "2024-05-05",
-    "RCB vs RR": "2024-05-04",
-    "RR vs RCB": "2024-05-04",
-    "DC vs RR": "2024-05-07",
-    "RR vs DC": "2024-05-07",
-    "SRH vs LSG": "2024-05-08",
-    "LSG vs SRH": "2024-05-08",
-    "PBKS vs RCB": "2024-05-09",
-    "RCB vs PBKS": "2024-05-09",
-    "CSK vs RR": "2024-05-12",
-    "RR vs CSK": "2024-05-12",
-    "GT vs KKR": "2024-05-13",
-    "KKR vs GT": "2024-05-13",
-    "DC vs LSG": "2024-05-14",
-    "LSG vs DC": "2024-05-14",
-    "PBKS vs RR": "2024-05-15",
-    "RR vs PBKS": "2024-05-15",
-    "MI vs SRH": "2024-05-17",
-    "SRH vs MI": "2024-05-17",
-    "RCB vs CSK": "2024-05-18",
-    "CSK vs RCB": "2024-05-18",
-    "RR vs KKR": "2024-05-19",
-    "KKR vs RR": "2024-05-19",
-    
-    # Playoffs
-    "Qualifier 1": "2024-05-21",
-    "Qualifier 2": "2024-05-24",
-    "Eliminator": "2024-05-22",
-    "Final": "2024-05-26"
-}
+from profiling import Profiler
+from confidence_scoring import DEFAULT_RULES_PATH, load_rules, rescore_rows, score_row
+from report_writer import write_confidence_report
+from invoice_manifest import InvoiceManifest, default_manifest_path
+from ipl_schedule import default_schedule
+from vendor_parsers import REGISTRY, UNKNOWN
+from invoice_filename import parse_invoice_name
+from date_inference import infer_invoice_date
+
+# Bump whenever process_invoice_file output changes so cached rows are rebuilt
+ROW_VERSION = "3"
+INVOICE_EXTENSIONS = ('.pdf', '.png', '.jpeg', '.jpg')
 
 class InvoiceProcessor:
-    def __init__(self):
+    def __init__(self, profiler=None, rules=None):
         self.confidence_scores = {}
+        self.profiler = profiler or Profiler()
+        self.rules = rules or load_rules()
+
+    def _timed(self, stage, function, *args):
+        """Call function(*args) under a profiler stage"""
+        with self.profiler.stage(stage):
+            return function(*args)
         
     def calculate_confidence(self, extracted_data):
-        """Calculate confidence score for extracted data"""
-        confidence = 100
-        reasons = []
-        
-        # Check company identification
-        if extracted_data['Company'] == 'Unknown':
-            confidence -= 20
-            reasons.append("Company unclear")
-        
-        # Check price extraction
-        if extracted_data['Ticket Price'] == 0:
-            confidence -= 25
-            reasons.append("Price not found")
-        elif extracted_data['Ticket Price'] > 1000000:  # Likely an invoice number
-            confidence -= 15
-            reasons.append("Price uncertain")
-        
-        # Check event/match identification
-        if extracted_data['Match/Event'] == 'Unknown Event':
-            confidence -= 20
-            reasons.append("Event unclear")
-        
-        # Check date extraction
-        if not extracted_data['Invoice Date']:
-            confidence -= 15
-            reasons.append("Date missing")
-        
-        # Check if it's a fee invoice
-        if extracted_data['Is Convenience Fee']:
-            confidence -= 5
-            reasons.append("Fee invoice")
-        
-        # Bonus confidence for clear patterns
-        if extracted_data['Company'] in ['BookMyShow', 'Paytm Insider', 'TicketGenie']:
-            confidence += 5
-        
-        if extracted_data['Match Date']:
-            confidence += 5
-        
-        confidence = max(0, min(100, confidence))
-        
-        return confidence, ', '.join(reasons) if reasons else 'High confidence'
+        """Calculate confidence score for extracted data (rules in confidence_rules.json)"""
+        return score_row(extracted_data, self.rules)
 
     def get_company_from_filename(self, filename):
-        """Determine company based on filename patterns"""
-        filename_lower = filename.lower()
-        
-        company_patterns = {
-            'BookMyShow': ['bms', 'bookmyshow', 'bigtree', 'big_tree'],
-            'Paytm Insider': ['waste', 'wasteland', 'insider', 'paytm'],
-            'TicketGenie': ['ticket', 'ticketgenie', 'genie'],
-            'JSW GMR': ['jsw', 'gmr'],
-            'KPH Dream Sports': ['kph', 'dream'],
-            'Omio': ['omio'],
-            'Ticombo': ['ticombo'],
-            'Chelsea FC': ['chelsea'],
-            'Football Platform': ['football'],
-            'Walk-in/Box Office': ['walk'],
-            'Dadabhai': ['dadabhai', 'inv2405']
-        }
-        
-        for company, patterns in company_patterns.items():
-            if any(pattern in filename_lower for pattern in patterns):
-                return company
-        
-        return 'Unknown'
+        """Determine company based on filename patterns (see vendor_parsers)"""
+        found = REGISTRY.match(filename=filename)
+        if found is None:
+            self.profiler.miss('company')
+            return UNKNOWN
+        self.profiler.hit('company', found['keyword'])
+        return found['parser'].name
 
     def extract_price_from_filename(self, filename):
-        """Extract price from filename with better parsing"""
-        # Remove common invoice number patterns
-        filename_clean = re.sub(r'Invoice_\d{10}', '', filename)
-        filename_clean = re.sub(r'INV\d+', '', filename_clean)
-        
-        # Look for price patterns
-        price_patterns = [
-            r'_(\d{3,6}(?:\.\d{1,2})?)(?:_|\.pdf|\.png|\.jpg)',  # 3-6 digits with optional decimals
-            r'_(\d{3,5})(?:_fee)?[_\.]',  # Price before fee indicator
-            r'[-_](\d{3,5})$'  # Price at end of name
-        ]
-        
-        for pattern in price_patterns:
-            match = re.search(pattern, filename_clean)
-            if match:
-                try:
-                    price = float(match.group(1))
-                    # Sanity check - prices should be between 100 and 999999
-                    if 100 <= price <= 999999:
-                        return price
-                except:
-                    continue
+        """Extract price from filename (see invoice_filename)"""
+        price = parse_invoice_name(filename).price()
+        # Sanity check - prices should be between 100 and 999999
+        if 100 <= price <= 999999:
+            self.profiler.hit('price', 'filename')
+            return price
+        self.profiler.miss('price')
         return 0
 
-    def extract_date_from_filename(self, filename):
-        """Extract date from filename"""
-        # Pattern like 31.03_ or 31.3_ or 31.10_
-        date_patterns = [
-            r'(\d{1,2})\.(\d{1,2})(?:_|\.)',  # DD.MM_
-            r'(\d{1,2})\.(\d{2})(?:_|\.)',     # DD.MM_
-        ]
-        
-        for pattern in date_patterns:
-            match = re.search(pattern, filename)
-            if match:
-                day, month = match.groups()
-                # Determine year based on month
-                if int(month) >= 10:  # October or later
-                    year = "2023"
-                else:
-                    year = "2024"
-                return f"{year}-{month.zfill(2)}-{day.zfill(2)}"
-        return ""
+    def extract_date_from_filename(self, filename, filepath=None):
+        """Extract date from filename; the year comes from the folder or season calendar (see date_inference)"""
+        inferred = infer_invoice_date(filename, filepath)
+        if inferred['date'] is None:
+            self.profiler.miss('invoice_date')
+            return ""
+        self.profiler.hit('invoice_date', f"filename_{inferred['source']}")
+        return inferred['date']
 
     def get_month_name(self, filepath):
         """Get month name from folder path"""
@@ -324,6 +143,8 @@ class InvoiceProcessor:
         """Process a single invoice file with confidence scoring"""
         filename = os.path.basename(filepath)
         
+        started = time.perf_counter()
+        
         # Skip non-invoice files
         skip_patterns = ["schedule", ".eml", ".DS_Store", "confirmed", "booking confirmation"]
         if any(pattern in filename.lower() for pattern in skip_patterns):
@@ -335,148 +156,99 @@ class InvoiceProcessor:
         # Extract data
         invoice_data = {
             "File Name": filename,
-            "Month": self.get_month_name(filepath),
-            "Invoice Date": self.extract_date_from_filename(filename),
-            "Company": self.get_company_from_filename(filename),
-            "Event Type": self.determine_event_type(filename, filepath),
-            "Match/Event": self.identify_match_from_filename(filename),
+            "Month": self._timed("field.month", self.get_month_name, filepath),
+            "Invoice Date": self._timed("field.invoice_date", self.extract_date_from_filename, filename, filepath),
+            "Company": self._timed("field.company", self.get_company_from_filename, filename),
+            "Event Type": self._timed("field.event_type", self.determine_event_type, filename, filepath),
+            "Match/Event": self._timed("field.match", self.identify_match_from_filename, filename),
             "Stand Name": "General",  # Would need OCR/PDF reading
             "Match Date": "",
             "Ticket Quantity": 1,  # Default
-            "Ticket Price": self.extract_price_from_filename(filename),
+            "Ticket Price": self._timed("field.price", self.extract_price_from_filename, filename),
             "Is Convenience Fee": is_fee_invoice,
             "File Path": filepath
         }
         
-        # Try to get IPL match date
+        # Try to get IPL match date (either team order, nearest to the invoice)
         if "IPL" in invoice_data["Event Type"]:
-            match_key = invoice_data["Match/Event"]
-            if match_key in IPL_2024_MATCHES:
-                invoice_data["Match Date"] = IPL_2024_MATCHES[match_key]
-            else:
-                # Try reversed teams
-                if " vs " in match_key:
-                    teams = match_key.split(" vs ")
-                    if len(teams) == 2:
-                        reversed_match = f"{teams[1]} vs {teams[0]}"
-                        if reversed_match in IPL_2024_MATCHES:
-                            invoice_data["Match Date"] = IPL_2024_MATCHES[reversed_match]
+            match_date = self._timed("field.match_date", default_schedule().lookup_match,
+                                     invoice_data["Match/Event"], invoice_data["Invoice Date"])
+            if match_date:
+                invoice_data["Match Date"] = match_date
         
         # Calculate confidence
-        confidence, confidence_reason = self.calculate_confidence(invoice_data)
+        confidence, confidence_reason = self._timed("confidence", self.calculate_confidence, invoice_data)
         invoice_data["Confidence %"] = confidence
         invoice_data["Confidence Notes"] = confidence_reason
         
+        self.profiler.add_vendor(invoice_data["Company"], time.perf_counter() - started)
         return invoice_data
 
 def main():
     """Main processing function"""
-    processor = InvoiceProcessor()
+    parser = argparse.ArgumentParser(description='Build the invoice confidence report')
+    parser.add_argument('--profile-report', help='write per-stage timings and pattern hits as JSON to this path')
+    parser.add_argument('--cprofile', help='also capture a cProfile dump to this path')
+    parser.add_argument('--rules', default=DEFAULT_RULES_PATH, help='confidence rules JSON')
+    args = parser.parse_args()
+    profiler = Profiler(cprofile=bool(args.cprofile))
+    rules = load_rules(args.rules)
+    
+    processor = InvoiceProcessor(profiler, rules)
     base_path = "/Users/sumitjha/Dropbox/Mac/Documents/Projects/fpl-auction/Invoices"
-    all_invoices = []
     
     print("Processing invoices...")
     
-    # Process all files
-    for root, dirs, files in os.walk(base_path):
-        for file in files:
-            if file.endswith(('.pdf', '.png', '.jpeg', '.jpg', '.PDF')):
-                filepath = os.path.join(root, file)
-                invoice_data = processor.process_invoice_file(filepath)
-                if invoice_data:
-                    all_invoices.append(invoice_data)
-    
-    # Create DataFrame
-    df = pd.DataFrame(all_invoices)
-    
-    # Sort by confidence, month and date
-    month_order = {"March 2024": 1, "April 2024": 2, "May 2024": 3, "June 2024": 4, "Unknown": 5}
-    df["Month_Order"] = df["Month"].map(month_order).fillna(5)
-    df = df.sort_values(["Confidence %", "Month_Order", "Invoice Date", "File Name"], ascending=[False, True, True, True])
-    df = df.drop("Month_Order", axis=1)
+    # Only new or changed files are processed; unchanged rows come from the manifest.
+    # Rows are built from file names alone, so the only file reads are the
+    # content hashes taken by manifest.record
+    with profiler.stage("manifest_load"):
+        manifest = InvoiceManifest(default_manifest_path('invoice_confidence'), base_path, ROW_VERSION)
+    with profiler.stage("walk"):
+        changed_files = manifest.scan(INVOICE_EXTENSIONS)
+    for filepath in changed_files:
+        invoice_data = processor._timed("process_invoice_file", processor.process_invoice_file, filepath)
+        with profiler.stage("read_hash"):
+            manifest.record(filepath, row_id=os.path.basename(filepath), row=invoice_data)
+    with profiler.stage("manifest_save"):
+        manifest.save()
+    all_invoices = manifest.rows()
+    print(f"Processed {len(changed_files)} new or changed files ({len(all_invoices)} invoices tracked)")
     
-    # Calculate statistics
-    high_confidence = df[df["Confidence %"] >= 80]
-    medium_confidence = df[(df["Confidence %"] >= 50) & (df["Confidence %"] < 80)]
-    low_confidence = df[df["Confidence %"] < 50]
+    # Stored rows may predate a rules change; re-score the whole history in one pass
+    with profiler.stage("confidence_rescore"):
+        rescore_rows(all_invoices, rules)
     
-    # Create output Excel file
+    # Sort once and stream every sheet through a write-only workbook
+    excel_started = time.perf_counter()
     output_file = "/Users/sumitjha/Dropbox/Mac/Documents/Projects/fpl-auction/Invoice_Analysis_With_Confidence.xlsx"
-    
-    with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-        # All invoices sheet
-        df.to_excel(writer, sheet_name='All Invoices', index=False)
-        
-        # High confidence invoices
-        high_confidence.to_excel(writer, sheet_name='High Confidence (80%+)', index=False)
-        
-        # Medium confidence invoices
-        medium_confidence.to_excel(writer, sheet_name='Medium Confidence (50-79%)', index=False)
-        
-        # Low confidence invoices
-        low_confidence.to_excel(writer, sheet_name='Low Confidence (<50%)', index=False)
-        
-        # Summary statistics
-        summary_data = {
-            'Metric': [
-                'Total Invoices',
-                'High Confidence (≥80%)',
-                'Medium Confidence (50-79%)',
-                'Low Confidence (<50%)',
-                'Total Amount (All)',
-                'Total Amount (High Confidence)',
-                'IPL Invoices',
-                'Other Event Invoices',
-                'Convenience Fee Invoices'
-            ],
-            'Value': [
-                len(df),
-                len(high_confidence),
-                len(medium_confidence),
-                len(low_confidence),
-                f"₹{df['Ticket Price'].sum():,.2f}",
-                f"₹{high_confidence['Ticket Price'].sum():,.2f}",
-                len(df[df['Event Type'].str.contains('IPL', na=False)]),
-                len(df[~df['Event Type'].str.contains('IPL', na=False)]),
-                len(df[df['Is Convenience Fee'] == True])
-            ]
-        }
-        summary_df = pd.DataFrame(summary_data)
-        summary_df.to_excel(writer, sheet_name='Summary', index=False)
-        
-        # By company analysis
-        company_analysis = df.groupby('Company').agg({
-            'File Name': 'count',
-            'Ticket Price': 'sum',
-            'Confidence %': 'mean'
-        }).round(2)
-        company_analysis.columns = ['Invoice Count', 'Total Amount', 'Avg Confidence %']
-        company_analysis = company_analysis.sort_values('Total Amount', ascending=False)
-        company_analysis.to_excel(writer, sheet_name='By Company')
-        
-        # By month analysis
-        month_analysis = df.groupby('Month').agg({
-            'File Name': 'count',
-            'Ticket Price': 'sum',
-            'Confidence %': 'mean'
-        }).round(2)
-        month_analysis.columns = ['Invoice Count', 'Total Amount', 'Avg Confidence %']
-        month_analysis.to_excel(writer, sheet_name='By Month')
+    report = write_confidence_report(all_invoices, output_file)
+    profiler.add("excel_write", time.perf_counter() - excel_started)
     
     print(f"\n✅ Excel file created: {output_file}")
-    print(f"📊 Total invoices processed: {len(df)}")
+    print(f"📊 Total invoices processed: {report['total']}")
     print(f"\n🎯 Confidence Distribution:")
-    print(f"   High (≥80%): {len(high_confidence)} invoices")
-    print(f"   Medium (50-79%): {len(medium_confidence)} invoices")
-    print(f"   Low (<50%): {len(low_confidence)} invoices")
+    print(f"   High (≥80%): {report['high']} invoices")
+    print(f"   Medium (50-79%): {report['medium']} invoices")
+    print(f"   Low (<50%): {report['low']} invoices")
     print(f"\n💰 Financial Summary:")
-    print(f"   Total Amount: ₹{df['Ticket Price'].sum():,.2f}")
-    print(f"   High Confidence Amount: ₹{high_confidence['Ticket Price'].sum():,.2f}")
+    print(f"   Total Amount: ₹{report['total_amount']:,.2f}")
+    print(f"   High Confidence Amount: ₹{report['high_amount']:,.2f}")
     
     # Show sample of low confidence items for review
-    if len(low_confidence) > 0:
+    if report['low_sample']:
         print(f"\n⚠️ Low confidence items requiring review:")
-        print(low_confidence[['File Name', 'Confidence %', 'Confidence Notes']].head(5).to_string())
+        for row in report['low_sample']:
+            print(f"   {row['File Name']}  {row['Confidence %']}%  {row['Confidence Notes']}")
+    
+    print(f"\n⏱️ Where the time went:")
+    print(profiler.summary())
+    if args.profile_report:
+        profiler.write(args.profile_report)
+        print(f"   Profile report: {args.profile_report}")
+    if args.cprofile:
+        print(profiler.dump_cprofile(args.cprofile))
+        print(f"   cProfile dump: {args.cprofile}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Lightweight instrumentation for the invoice processors
+Per-stage wall-clock timers, per-vendor totals, regex hit counters per
+pattern and an optional cProfile capture, written out as one JSON report
+"""
+
+import cProfile
+import json
+import pstats
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+class Profiler:
+    """
+    Collects timings for one run.
+
+    Stages are named with dots ('field.price') and nest freely; each keeps a
+    call count, total and max seconds. Vendor totals answer "whose invoices
+    are slow" and pattern hits answer "which regexes actually fire".
+    """
+
+    def __init__(self, cprofile=False):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.vendors = {}
+        self.patterns = Counter()
+        self.misses = Counter()
+        self.profile = cProfile.Profile() if cprofile else None
+        if self.profile is not None:
+            self.profile.enable()
+
+    @contextmanager
+    def stage(self, name):
+        """Time a block of work under the stage name"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def add(self, name, seconds):
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = {"calls": 0, "seconds": 0.0, "max_seconds": 0.0}
+        stage["calls"] += 1
+        stage["seconds"] += seconds
+        if seconds > stage["max_seconds"]:
+            stage["max_seconds"] = seconds
+
+    def add_vendor(self, vendor, seconds):
+        """Account one file's processing time to its vendor"""
+        totals = self.vendors.setdefault(vendor or 'Unknown', {"files": 0, "seconds": 0.0})
+        totals["files"] += 1
+        totals["seconds"] += seconds
+
+    def hit(self, field, pattern):
+        """Count a successful match of a named pattern for a field"""
+        self.patterns[f"{field}.{pattern}"] += 1
+
+    def miss(self, field):
+        """Count a field that no pattern matched"""
+        self.misses[field] += 1
+
+    def stop(self):
+        if self.profile is not None:
+            self.profile.disable()
+
+    def report(self):
+        """Structured report: stages sorted by total time, vendors, pattern hits"""
+        elapsed = time.perf_counter() - self.started
+        stages = [
+            dict(stage, name=name, seconds=round(stage["seconds"], 6), max_seconds=round(stage["max_seconds"], 6),
+                 mean_ms=round(stage["seconds"] / stage["calls"] * 1000, 4))
+            for name, stage in sorted(self.stages.items(), key=lambda item: -item[1]["seconds"])
+        ]
+        vendors = [
+            dict(totals, vendor=vendor, seconds=round(totals["seconds"], 6),
+                 mean_ms=round(totals["seconds"] / totals["files"] * 1000, 4))
+            for vendor, totals in sorted(self.vendors.items(), key=lambda item: -item[1]["seconds"])
+        ]
+        return {
+            "generated": datetime.now().isoformat(timespec='seconds'),
+            "elapsed_seconds": round(elapsed, 4),
+            "stages": stages,
+            "vendors": vendors,
+            "pattern_hits": dict(self.patterns.most_common()),
+            "field_misses": dict(self.misses.most_common()),
+        }
+
+    def summary(self, top=8):
+        """Printable lines for the slowest stages and vendors"""
+        report = self.report()
+        lines = [f"  {stage['name']}: {stage['seconds']:.3f}s over {stage['calls']} calls "
+                 f"({stage['mean_ms']:.3f} ms avg)" for stage in report["stages"][:top]]
+        lines += [f"  vendor {vendor['vendor']}: {vendor['files']} files, {vendor['seconds']:.3f}s"
+                  for vendor in report["vendors"][:top]]
+        return "\n".join(lines)
+
+    def write(self, path):
+        """Write the JSON report to path"""
+        self.stop()
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+
+    def dump_cprofile(self, path, top=30):
+        """Save raw cProfile stats to path and return the top functions as text"""
+        if self.profile is None:
+            return ""
+        self.stop()
+        self.profile.dump_stats(path)
+        stats = pstats.Stats(path)
+        rows = []
+        for (filename, line, function), (_, calls, _, cumulative, _) in sorted(
+                stats.stats.items(), key=lambda item: -item[1][3])[:top]:
+            rows.append(f"  {cumulative:8.3f}s {calls:>8} {function} ({filename}:{line})")
+        return "\n".join(rows)
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Streaming Excel writer for the invoice confidence report
+Writes the All / High / Medium / Low sheets in one pass over the rows
+sorted once by confidence, accumulating the Summary, By Company and By
+Month sheets on the way, through a write-only workbook (xlsxwriter in
+constant_memory mode, or openpyxl write_only) so memory stays flat for
+100k+ row ledgers
+"""
+
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+
+MONTH_ORDER = {"March 2024": 1, "April 2024": 2, "May 2024": 3, "June 2024": 4, "Unknown": 5}
+
+# (sheet name, lowest confidence included); rows are sorted by confidence
+# descending, so each bucket is a contiguous run of the sorted rows
+CONFIDENCE_BUCKETS = [
+    ('High Confidence (80%+)', 80),
+    ('Medium Confidence (50-79%)', 50),
+    ('Low Confidence (<50%)', float('-inf')),
+]
+
+class _XlsxWriterBook:
+    """xlsxwriter workbook in constant_memory mode: rows are flushed as written"""
+
+    def __init__(self, path):
+        self.workbook = xlsxwriter.Workbook(path, {'constant_memory': True, 'nan_inf_to_errors': True})
+        self.rows = {}
+
+    def add_sheet(self, name):
+        self.rows[name] = 0
+        return self.workbook.add_worksheet(name)
+
+    def append(self, sheet, values):
+        sheet.write_row(self.rows[sheet.name], 0, values)
+        self.rows[sheet.name] += 1
+
+    def close(self):
+        self.workbook.close()
+
+class _OpenpyxlBook:
+    """openpyxl write-only workbook"""
+
+    def __init__(self, path):
+        from openpyxl import Workbook
+        self.path = path
+        self.workbook = Workbook(write_only=True)
+
+    def add_sheet(self, name):
+        return self.workbook.create_sheet(name)
+
+    def append(self, sheet, values):
+        sheet.append(values)
+
+    def close(self):
+        self.workbook.save(self.path)
+
+def open_workbook(path, engine=None):
+    """Open a streaming workbook; engine is 'xlsxwriter', 'openpyxl' or None for the best available"""
+    if engine == 'xlsxwriter' or (engine is None and xlsxwriter is not None):
+        return _XlsxWriterBook(path)
+    return _OpenpyxlBook(path)
+
+def _cell(value):
+    # Excel has no None; blank the cell instead
+    return "" if value is None else value
+
+def sort_key(row):
+    """Confidence descending, then month, invoice date and file name"""
+    return (-row["Confidence %"], MONTH_ORDER.get(row["Month"], 5), row["Invoice Date"] or "", row["File Name"])
+
+def _group_table(groups):
+    """[name, count, total, mean confidence] rows, rounded like DataFrame.round(2)"""
+    return {name: [totals[0], round(totals[1], 2), round(totals[2] / totals[0], 2)] for name, totals in groups.items()}
+
+def write_confidence_report(rows, output_file, engine=None, sample_size=5):
+    """
+    Write the confidence workbook for rows (dicts from process_invoice_file).
+
+    Returns a summary dict with bucket counts, amounts and the first
+    low-confidence rows for console output.
+    """
+    rows = sorted(rows, key=sort_key)
+    columns = list(rows[0].keys()) if rows else []
+    for row in rows:
+        for column in row:
+            if column not in columns:
+                columns.append(column)
+
+    book = open_workbook(output_file, engine)
+    all_sheet = book.add_sheet('All Invoices')
+    bucket_sheets = [(book.add_sheet(name), floor) for name, floor in CONFIDENCE_BUCKETS]
+    for sheet in [all_sheet] + [sheet for sheet, _ in bucket_sheets]:
+        book.append(sheet, columns)
+
+    counts = [0] * len(bucket_sheets)
+    amounts = [0.0] * len(bucket_sheets)
+    total_amount = 0.0
+    ipl = 0
+    fees = 0
+    by_company = {}
+    by_month = {}
+    low_sample = []
+    bucket = 0
+    for row in rows:
+        values = [_cell(row.get(column)) for column in columns]
+        confidence = row["Confidence %"]
+        while confidence < bucket_sheets[bucket][1]:
+            bucket += 1
+        book.append(all_sheet, values)
+        book.append(bucket_sheets[bucket][0], values)
+
+        price = row["Ticket Price"] or 0
+        counts[bucket] += 1
+        amounts[bucket] += price
+        total_amount += price
+        ipl += 'IPL' in (row.get("Event Type") or "")
+        fees += row.get("Is Convenience Fee") is True
+        for groups, name in ((by_company, row["Company"]), (by_month, row["Month"])):
+            totals = groups.setdefault(name, [0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += price
+            totals[2] += confidence
+        if bucket == len(bucket_sheets) - 1 and len(low_sample) < sample_size:
+            low_sample.append(row)
+
+    summary = book.add_sheet('Summary')
+    book.append(summary, ['Metric', 'Value'])
+    for metric, value in [
+        ('Total Invoices', len(rows)),
+        ('High Confidence (≥80%)', counts[0]),
+        ('Medium Confidence (50-79%)', counts[1]),
+        ('Low Confidence (<50%)', counts[2]),
+        ('Total Amount (All)', f"₹{total_amount:,.2f}"),
+        ('Total Amount (High Confidence)', f"₹{amounts[0]:,.2f}"),
+        ('IPL Invoices', ipl),
+        ('Other Event Invoices', len(rows) - ipl),
+        ('Convenience Fee Invoices', fees),
+    ]:
+        book.append(summary, [metric, value])
+
+    header = ['Invoice Count', 'Total Amount', 'Avg Confidence %']
+    company_sheet = book.add_sheet('By Company')
+    book.append(company_sheet, ['Company'] + header)
+    companies = _group_table(by_company)
+    for name, values in sorted(companies.items(), key=lambda item: -item[1][1]):
+        book.append(company_sheet, [name] + values)
+
+    month_sheet = book.add_sheet('By Month')
+    book.append(month_sheet, ['Month'] + header)
+    for name, values in sorted(_group_table(by_month).items()):
+        book.append(month_sheet, [name] + values)
+    book.close()
+
+    return {
+        "total": len(rows),
+        "high": counts[0],
+        "medium": counts[1],
+        "low": counts[2],
+        "total_amount": total_amount,
+        "high_amount": amounts[0],
+        "low_sample": low_sample,
+    }
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Targeted re-extraction of low-confidence ledger fields
+Reads each row's stored field provenance, re-reads only invoices with a
+field below the threshold (cached text is reused) and matches just those
+fields again through the row's vendor parser; better values go back to the
+ledger as one keyed transaction
+"""
+
+import argparse
+import os
+
+import pandas as pd
+
+from text_cache import TextCache
+from ledger_store import LedgerStore
+from batch_process import FIELD_COLUMNS, KEY_FIELDS, csv_path, locate_invoice
+from extraction_result import HIGH_CONFIDENCE, ExtractionResult, confidence_level, reextract
+from extraction_engine import ExtractionStats, extract_texts, field_source
+
+# Fields a pattern can safely re-derive on its own; match labels
+# also depend on the schedule and fee rules in batch_process
+REVIEW_FIELDS = ('invoice_date', 'quantity', 'price', 'stand')
+
+def row_result(row):
+    """ExtractionResult for a ledger row, or None for rows written before provenance was stored"""
+    provenance = row.get('Field Provenance')
+    if not isinstance(provenance, str) or not provenance:
+        return None
+    return ExtractionResult.from_compact(provenance, {field: row.get(column) for field, column in FIELD_COLUMNS.items()})
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-extract only the low-confidence fields of ledger rows')
+    parser.add_argument('--threshold', type=int, default=HIGH_CONFIDENCE, help='re-run fields scoring below this')
+    parser.add_argument('--workers', type=int, default=None, help='extraction processes (default: CPU count)')
+    parser.add_argument('--no-cache', action='store_true', help='always re-extract instead of using the text cache')
+    args = parser.parse_args()
+    cache = None if args.no_cache else TextCache()
+
+    ledger = LedgerStore(csv_path)
+    df = ledger.read()
+    if 'Field Provenance' not in df.columns:
+        print('No rows carry field provenance yet')
+        return
+
+    pending = []
+    for row in df.to_dict('records'):
+        result = row_result({key: (None if pd.isna(value) else value) for key, value in row.items()})
+        if result is None:
+            continue
+        low = [field for field in result.low_confidence(args.threshold) if field in REVIEW_FIELDS]
+        if not low:
+            continue
+        file_path = locate_invoice(row)
+        if not os.path.exists(file_path):
+            print(f"File not found: {row['File Name']}")
+            continue
+        pending.append((row['File Name'], file_path, result))
+
+    print(f'Found {len(pending)} invoices with fields below {args.threshold}% confidence\n')
+
+    # Whole documents are read (cached text is reused), but only the weak fields are matched again
+    stats = ExtractionStats()
+    results = extract_texts([file_path for _, file_path, _ in pending], workers=args.workers, stats=stats, cache=cache)
+
+    updates = {}
+    for (filename, _, result), extraction in zip(pending, results):
+        source = field_source(extraction['source'])
+        changed = reextract(result, extraction['text'], args.threshold, source, fields=REVIEW_FIELDS, filename=filename)
+        if not changed:
+            print(f'{filename}: no better match for {", ".join(result.low_confidence(args.threshold))}')
+            continue
+        print(f'{filename}: ' + ', '.join(f'{field} = {result.value(field)} ({result[field].confidence}%)'
+                                          for field in changed))
+        fields = {FIELD_COLUMNS[field]: result.value(field) for field in changed}
+        fields['Confidence Level'] = confidence_level(result.confidence(KEY_FIELDS))
+        fields['Field Provenance'] = result.to_compact()
+        updates[filename] = fields
+
+    print(f'\nExtraction throughput:\n{stats.report()}')
+    if cache is not None:
+        print(cache.report())
+
+    if updates:
+        ledger.update_rows(updates)
+        ledger.maybe_compact()
+        print(f'\nLedger updated for {len(updates)} invoices')
+
+if __name__ == "__main__":
+    main()
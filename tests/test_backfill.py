@@ -0,0 +1,50 @@
+import os
+import sys
+
+import pytest
+
+import batch_process
+import extract_quantities
+from ledger_store import LedgerStore
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROCESSED = os.path.join(REPO, "Invoices", "processed")
+INVOICE = "07.05_JSW_043.pdf"
+
+
+@pytest.fixture
+def ledger(tmp_path, monkeypatch):
+    if not os.path.exists(os.path.join(PROCESSED, INVOICE)):
+        pytest.skip("sample invoice not present")
+    monkeypatch.setattr(batch_process, "processed_path", PROCESSED)
+    csv_path = str(tmp_path / "ledger.csv")
+    store = LedgerStore(csv_path)
+    store.append_rows([
+        {"File Name": INVOICE, "Company": "JSW", "Ticket Quantity": "Not specified", "Ticket Price": 100.0},
+        {"File Name": "missing.pdf", "Company": "JSW", "Ticket Quantity": "2", "Ticket Price": 200.0},
+    ])
+    store.compact()
+    return csv_path
+
+
+def test_quantity_backfill_over_a_string_column_keeps_the_ledger_readable(ledger, monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["extract_quantities.py", "--csv", ledger, "--workers", "1", "--no-cache"])
+    extract_quantities.main()
+
+    store = LedgerStore(ledger, compact_every=1)
+    df = store.read().set_index("File Name")
+    assert df.loc[INVOICE, "Ticket Quantity"] == 14
+    assert str(df.loc["missing.pdf", "Ticket Quantity"]) == "2"
+    assert store.keys() == {INVOICE, "missing.pdf"}
+    assert store.maybe_compact() == 2
+
+    compacted = LedgerStore(ledger).read().set_index("File Name")
+    assert str(compacted.loc[INVOICE, "Ticket Quantity"]) == "14"
+
+
+def test_dry_run_leaves_the_ledger_alone(ledger, monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["extract_quantities.py", "--csv", ledger, "--workers", "1", "--no-cache",
+                                      "--dry-run"])
+    extract_quantities.main()
+    df = LedgerStore(ledger).read().set_index("File Name")
+    assert df.loc[INVOICE, "Ticket Quantity"] == "Not specified"
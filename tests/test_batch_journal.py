@@ -0,0 +1,149 @@
+import os
+
+import pytest
+
+from batch_journal import BatchJournal
+from ledger_store import LedgerStore
+
+
+class Crash(BaseException):
+    """Stands in for the process dying; _finish only catches Exception"""
+
+
+def make_invoices(directory, names):
+    paths = []
+    for name in names:
+        path = os.path.join(directory, name)
+        with open(path, 'w') as f:
+            f.write(name)
+        paths.append(path)
+    return paths
+
+
+def row(path):
+    return {'File Name': os.path.basename(path), 'Ticket Price': 100.0}
+
+
+@pytest.fixture
+def setup(tmp_path):
+    inbox = tmp_path / 'inbox'
+    processed = tmp_path / 'processed'
+    inbox.mkdir()
+    processed.mkdir()
+    ledger = LedgerStore(str(tmp_path / 'ledger.csv'))
+    journal_path = str(tmp_path / 'journal.jsonl')
+    moved = []
+
+    def move(path):
+        os.replace(path, str(processed / os.path.basename(path)))
+        moved.append(os.path.basename(path))
+
+    return inbox, ledger, journal_path, move, moved
+
+
+def ledger_names(ledger):
+    df = ledger.read()
+    return sorted(df['File Name']) if len(df) else []
+
+
+def test_extracted_rows_survive_a_restart(setup):
+    inbox, ledger, journal_path, move, _ = setup
+    first, second = make_invoices(inbox, ['a.pdf', 'b.pdf'])
+    journal = BatchJournal(journal_path, ledger, move)
+    journal.record_extracted(first, row(first))
+    journal.record_extracted(second, row(second))
+
+    restarted = BatchJournal(journal_path, ledger, move)
+    assert restarted.pending() == {first: row(first), second: row(second)}
+    assert restarted.has_work()
+
+
+def test_torn_last_record_is_truncated(setup):
+    inbox, ledger, journal_path, move, _ = setup
+    first, = make_invoices(inbox, ['a.pdf'])
+    BatchJournal(journal_path, ledger, move).record_extracted(first, row(first))
+    size = os.path.getsize(journal_path)
+    with open(journal_path, 'a') as f:
+        f.write('{"op": "extracted", "path": "b.pdf", "ro')
+
+    restarted = BatchJournal(journal_path, ledger, move)
+    assert list(restarted.pending()) == [first]
+    assert os.path.getsize(journal_path) == size
+
+
+def test_replay_commits_rows_when_crash_preceded_the_ledger_append(setup, monkeypatch):
+    inbox, ledger, journal_path, move, moved = setup
+    paths = make_invoices(inbox, ['a.pdf', 'b.pdf'])
+    journal = BatchJournal(journal_path, ledger, move)
+
+    def crash(rows, tag=None):
+        raise Crash()
+
+    monkeypatch.setattr(ledger, 'append_rows', crash)
+    with pytest.raises(Crash):
+        journal.checkpoint(paths, rows={path: row(path) for path in paths})
+    monkeypatch.undo()
+    assert ledger_names(ledger) == []
+
+    restarted = BatchJournal(journal_path, LedgerStore(ledger.csv_path), move)
+    assert restarted.recover() == 2
+    assert ledger_names(ledger) == ['a.pdf', 'b.pdf']
+    assert sorted(moved) == ['a.pdf', 'b.pdf']
+    assert restarted.clear()
+    assert not os.path.exists(journal_path)
+
+
+def test_replay_does_not_duplicate_rows_already_in_the_ledger(setup):
+    inbox, ledger, journal_path, move, moved = setup
+    paths = make_invoices(inbox, ['a.pdf', 'b.pdf'])
+
+    def crash_after_first_move(path):
+        if moved:
+            raise Crash()
+        move(path)
+
+    journal = BatchJournal(journal_path, ledger, crash_after_first_move)
+    with pytest.raises(Crash):
+        journal.checkpoint(paths, rows={path: row(path) for path in paths})
+    assert moved == ['a.pdf']
+
+    restarted = BatchJournal(journal_path, LedgerStore(ledger.csv_path), move)
+    assert restarted.recover() == 2
+    assert ledger_names(ledger) == ['a.pdf', 'b.pdf']
+    assert moved == ['a.pdf', 'b.pdf']
+    assert not restarted.has_work()
+
+
+def test_failed_move_stays_unmoved_until_retried(setup):
+    inbox, ledger, journal_path, move, moved = setup
+    paths = make_invoices(inbox, ['a.pdf', 'b.pdf'])
+
+    def locked(path):
+        if path.endswith('b.pdf'):
+            raise PermissionError('locked')
+        move(path)
+
+    journal = BatchJournal(journal_path, ledger, locked)
+    assert journal.checkpoint(paths, rows={path: row(path) for path in paths}) == [paths[1]]
+    assert not journal.has_work()
+    assert not journal.clear()
+
+    # A later run must not ingest the committed file again, and files it on recover
+    restarted = BatchJournal(journal_path, ledger, move)
+    assert restarted.unmoved == {paths[1]}
+    restarted.recover()
+    assert ledger_names(ledger) == ['a.pdf', 'b.pdf']
+    assert moved == ['a.pdf', 'b.pdf']
+    assert restarted.clear()
+
+
+def test_dropped_files_are_forgotten(setup):
+    inbox, ledger, journal_path, move, _ = setup
+    first, = make_invoices(inbox, ['a.pdf'])
+    journal = BatchJournal(journal_path, ledger, move)
+    journal.record_extracted(first, row(first))
+    journal.drop([first])
+
+    restarted = BatchJournal(journal_path, ledger, move)
+    assert not restarted.has_work()
+    assert restarted.clear()
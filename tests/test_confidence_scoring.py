@@ -0,0 +1,83 @@
+import json
+import math
+import os
+
+import pandas as pd
+import pytest
+
+from confidence_scoring import load_rules, rescore_rows, rule_mask, score_frame, score_row
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ROWS = [
+    {"Company": "BookMyShow", "Ticket Price": 12951.9, "Match/Event": "CSK vs RCB", "Invoice Date": "2024-03-20",
+     "Is Convenience Fee": False, "Match Date": "2024-03-22"},
+    {"Company": "Unknown", "Ticket Price": 0, "Match/Event": "Unknown Event", "Invoice Date": None,
+     "Is Convenience Fee": True, "Match Date": ""},
+    {"Company": "JSW GMR", "Ticket Price": 2000000.0, "Match/Event": "DC vs MI", "Invoice Date": "",
+     "Is Convenience Fee": "True", "Match Date": None},
+    {"Company": "Paytm Insider", "Ticket Price": "Not specified", "Match/Event": None, "Invoice Date": float("nan"),
+     "Is Convenience Fee": None, "Match Date": "2024-05-01"},
+    {},
+]
+
+
+def rows_from_csv(path):
+    df = pd.read_csv(path)
+    return [{key: (None if not isinstance(value, str) and pd.isna(value) else value) for key, value in row.items()}
+            for row in df.to_dict("records")]
+
+
+def test_default_rules():
+    rules = load_rules()
+    assert score_row(ROWS[0], rules) == (100, "High confidence")
+    assert score_row(ROWS[1], rules) == (15, "Company unclear, Price not found, Event unclear, Date missing, Fee invoice")
+
+
+@pytest.mark.parametrize("source", ["synthetic", "ledger"])
+def test_frame_and_row_scoring_agree(source):
+    if source == "synthetic":
+        rows = ROWS
+    else:
+        path = os.path.join(REPO, "IPL_Event_Invoices_Complete.csv")
+        if not os.path.exists(path):
+            pytest.skip("ledger not present")
+        rows = rows_from_csv(path)
+    rules = load_rules()
+    confidence, notes = score_frame(pd.DataFrame(rows), rules)
+    assert list(zip(confidence.tolist(), notes.tolist())) == [score_row(row, rules) for row in rows]
+
+
+def test_rescore_rows_updates_rows_in_place():
+    rows = [dict(row) for row in ROWS]
+    assert rescore_rows(rows) is rows
+    assert [(row["Confidence %"], row["Confidence Notes"]) for row in rows] == [score_row(row) for row in ROWS]
+    assert rescore_rows([]) == []
+
+
+def test_scores_are_clamped_and_weights_come_from_the_file(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({
+        "base": 50, "min": 10, "max": 60, "default_note": "ok",
+        "rules": [
+            {"column": "Ticket Price", "op": "le", "value": 100, "weight": -100, "note": "cheap"},
+            {"column": "Company", "op": "contains", "value": "Book", "weight": 30},
+        ],
+    }))
+    rules = load_rules(str(path))
+    confidence, notes = score_frame(pd.DataFrame(ROWS), rules)
+    assert confidence.tolist() == [60, 10, 50, 50, 50]
+    assert notes.tolist() == ["ok", "cheap", "ok", "ok", "ok"]
+
+
+def test_unknown_ops_are_rejected(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"base": 100, "min": 0, "max": 100, "default_note": "",
+                                "rules": [{"column": "Company", "op": "like", "value": "x", "weight": 1}]}))
+    with pytest.raises(ValueError):
+        load_rules(str(path))
+
+
+def test_numeric_rules_ignore_text_values():
+    series = pd.Series([5, "7", "Not specified", None, math.nan], dtype=object)
+    assert rule_mask(series, {"op": "gt", "value": 6}).tolist() == [False, True, False, False, False]
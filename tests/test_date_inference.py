@@ -0,0 +1,103 @@
+from date_inference import LEAD_DAYS, DateInference, folder_month, infer_invoice_date
+from ipl_schedule import ScheduleIndex
+
+
+def make_schedule():
+    schedule = ScheduleIndex()
+    schedule.add_fixture("2023-04-01", teams=("CSK", "RCB"))
+    schedule.add_fixture("2023-05-20", teams=("MI", "DC"))
+    schedule.add_fixture("2024-03-22", teams=("CSK", "RCB"))
+    schedule.add_fixture("2024-05-10", teams=("MI", "DC"))
+    schedule.add_fixture("2023-10-05", teams=("IND", "AUS"), competition="CWC")
+    schedule.add_fixture("2023-11-19", stage="Final", competition="CWC")
+    return schedule
+
+
+def test_folder_month():
+    assert folder_month("Invoices/Mar_24/1.03_x.pdf") == (2024, 3)
+    assert folder_month("Invoices/november-2023/x.pdf") == (2023, 11)
+    assert folder_month("Nov 23/Apr_24/x.pdf") == (2024, 4)
+    assert folder_month("Invoices/Marketing/x.pdf") is None
+    assert folder_month(None) is None
+
+
+def test_candidates_prefer_in_season_days_then_newest():
+    schedule = make_schedule()
+    schedule.add_fixture("2025-06-01", teams=("LQ", "KK"), competition="PSL")
+    inference = DateInference(schedule)
+    # 10 April is in both IPL seasons and only in the 2025 PSL lead window
+    assert inference.candidates(4, 10) == [2024, 2023, 2025]
+    # 25 January is only in the 2024 IPL lead window
+    assert inference.candidates(1, 25) == [2024]
+    # 15 October is in the CWC; 1 December is in nothing
+    assert inference.candidates(10, 15) == [2023]
+    assert inference.candidates(12, 1) == []
+
+
+def test_lead_window_edges():
+    inference = DateInference(make_schedule())
+    # The 2024 IPL starts 22 March, so its window opens LEAD_DAYS earlier
+    assert LEAD_DAYS == 60
+    assert inference.candidates(1, 22) == [2024]
+    assert inference.candidates(1, 21) == []
+
+
+def test_competition_filter_only_when_it_matches():
+    inference = DateInference(make_schedule())
+    # 1 September is in the CWC lead window only
+    assert inference.candidates(9, 1, competition="CWC") == [2023]
+    assert inference.candidates(9, 1, competition="IPL") == [2023]
+    assert inference.candidates(4, 1, competition="CWC") == [2024, 2023]
+
+
+def test_source_precedence():
+    inference = DateInference(make_schedule())
+    assert inference.infer(1, 5, folder=(2023, 6), text_date="2024-05-03") == {
+        "date": "2024-05-01", "source": "text", "candidates": [2024, 2023]}
+    assert inference.infer(1, 5, folder=(2023, 6))["date"] == "2023-05-01"
+    assert inference.infer(1, 5, folder=(2023, 6))["source"] == "folder"
+    assert inference.infer(1, 5)["source"] == "calendar"
+    assert inference.infer(1, 12) == {"date": "2024-12-01", "source": "default", "candidates": []}
+
+
+def test_text_and_folder_straddle_new_year():
+    inference = DateInference(make_schedule())
+    # Typed 28.12 on an invoice printed in January
+    assert inference.infer(28, 12, text_date="2024-01-03")["date"] == "2023-12-28"
+    # Typed 2.01 on an invoice printed at the end of December
+    assert inference.infer(2, 1, text_date="2023-12-30")["date"] == "2024-01-02"
+    # A December invoice filed in a February folder
+    assert inference.infer(15, 12, folder=(2024, 2))["date"] == "2023-12-15"
+
+
+def test_fixture_picks_the_year_the_match_is_next_played():
+    inference = DateInference(make_schedule())
+    # Both years cover 10 March, but only 2024 has CSK vs RCB after it
+    result = inference.infer(10, 3, match="CSK vs RCB")
+    assert result == {"date": "2024-03-10", "source": "fixture", "candidates": [2024, 2023]}
+    # MI vs DC on 15 May: 2023's meeting is after it, 2024's is before
+    assert inference.infer(15, 5, match="MI vs DC")["date"] == "2023-05-15"
+    # An unknown or malformed match falls back to the calendar
+    assert inference.infer(10, 3, match="GT vs LSG")["source"] == "calendar"
+    assert inference.infer(10, 3, match="Unknown Event")["source"] == "calendar"
+
+
+def test_missing_or_invalid_day_month():
+    inference = DateInference(make_schedule())
+    assert inference.infer(None, None) == {"date": None, "source": "default", "candidates": []}
+    assert inference.infer(None, None, text_date="2024-04-02")["date"] == "2024-04-02"
+    # 29 February does not exist in 2023
+    assert inference.infer(29, 2, folder=(2023, 3))["date"] is None
+    assert inference.infer(29, 2, folder=(2024, 3))["date"] == "2024-02-29"
+
+
+def test_empty_schedule():
+    inference = DateInference(ScheduleIndex())
+    assert inference.infer(1, 5) == {"date": None, "source": "default", "candidates": []}
+
+
+def test_infer_invoice_date_reads_name_and_folder():
+    result = infer_invoice_date("1.05_x.pdf", file_path="Invoices/Jun_23/1.05_x.pdf")
+    assert result["date"] == "2023-05-01"
+    assert result["source"] == "folder"
+    assert infer_invoice_date("x.pdf")["date"] is None
@@ -0,0 +1,139 @@
+import mailbox
+import os
+from email.message import EmailMessage
+
+import pytest
+
+from email_ingest import EmailIngest, SeenMessages, html_to_text, iter_messages
+from ledger_store import LedgerStore
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROCESSED = os.path.join(REPO, "Invoices", "processed")
+FIRST_PDF = "NNB67M.pdf"
+SECOND_PDF = "15.03_Waste_3283.20_404_8.pdf"
+
+
+def invoice_bytes(name):
+    path = os.path.join(PROCESSED, name)
+    if not os.path.exists(path):
+        pytest.skip("sample invoice not present")
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def message(message_id, attachments=(), html=None):
+    msg = EmailMessage()
+    msg["From"] = "tickets@example.com"
+    msg["To"] = "ops@example.com"
+    msg["Subject"] = "Booking confirmation"
+    if message_id:
+        msg["Message-ID"] = message_id
+    if html:
+        msg.set_content(html, subtype="html")
+    else:
+        msg.set_content("Your tickets are attached.")
+    for name in attachments:
+        msg.add_attachment(invoice_bytes(name), maintype="application", subtype="pdf", filename=name)
+    return msg
+
+
+def write_mbox(path, messages):
+    box = mailbox.mbox(str(path))
+    for msg in messages:
+        box.add(msg)
+    box.flush()
+    box.close()
+    return str(path)
+
+
+@pytest.fixture
+def ingest(tmp_path):
+    def make(workers=1, commit_every=100):
+        ledger = LedgerStore(str(tmp_path / "ledger.csv"))
+        seen = SeenMessages(str(tmp_path / "seen.json"))
+        return EmailIngest(ledger, seen, workers=workers, commit_every=commit_every)
+    return make
+
+
+def ledger_names(tmp_path):
+    df = LedgerStore(str(tmp_path / "ledger.csv")).read()
+    return sorted(df["File Name"]) if len(df) else []
+
+
+def test_messages_come_from_eml_mbox_and_maildir(tmp_path):
+    msg = message("<one@x>", [FIRST_PDF])
+    eml_path = tmp_path / "one.eml"
+    eml_path.write_bytes(bytes(msg))
+    mbox_path = write_mbox(tmp_path / "box.mbox", [msg, message("<two@x>")])
+    maildir = mailbox.Maildir(str(tmp_path / "maildir"))
+    maildir.add(msg)
+
+    assert [m["Message-ID"] for _, m in iter_messages(str(eml_path))] == ["<one@x>"]
+    assert [m["Message-ID"] for _, m in iter_messages(mbox_path)] == ["<one@x>", "<two@x>"]
+    assert [m["Message-ID"] for _, m in iter_messages(str(tmp_path / "maildir"))] == ["<one@x>"]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_repeated_message_id_in_one_mailbox_is_ingested_once(tmp_path, ingest, capsys, workers):
+    mbox_path = write_mbox(tmp_path / "box.mbox", [message("<dup@x>", [FIRST_PDF]), message("<dup@x>", [FIRST_PDF])])
+    run = ingest(workers=workers)
+    run.run([mbox_path])
+
+    assert (run.messages, run.skipped, run.duplicates) == (1, 1, 0)
+    assert ledger_names(tmp_path) == [FIRST_PDF]
+    assert "already in the ledger" not in capsys.readouterr().out
+
+
+def test_repeated_attachment_in_one_run_is_skipped_as_a_repeat(tmp_path, ingest, capsys):
+    mbox_path = write_mbox(tmp_path / "box.mbox", [message("<a@x>", [FIRST_PDF]), message("<b@x>", [FIRST_PDF])])
+    run = ingest()
+    run.run([mbox_path])
+
+    assert (run.messages, run.duplicates) == (2, 1)
+    assert ledger_names(tmp_path) == [FIRST_PDF]
+    out = capsys.readouterr().out
+    assert "repeats an earlier attachment" in out
+    assert "already in the ledger" not in out
+
+
+def test_rerun_and_ledger_names_skip_known_invoices(tmp_path, ingest, capsys):
+    mbox_path = write_mbox(tmp_path / "box.mbox", [message("<a@x>", [FIRST_PDF])])
+    ingest().run([mbox_path])
+
+    rerun = ingest()
+    rerun.run([mbox_path])
+    assert (rerun.messages, rerun.skipped, rerun.ingested_rows) == (0, 1, 0)
+
+    # A new message carrying an invoice the ledger already has by name
+    resent = write_mbox(tmp_path / "resent.mbox", [message("<c@x>", [FIRST_PDF])])
+    capsys.readouterr()
+    later = ingest()
+    later.run([resent])
+    assert (later.messages, later.duplicates, later.ingested_rows) == (1, 1, 0)
+    assert "already in the ledger" in capsys.readouterr().out
+    assert ledger_names(tmp_path) == [FIRST_PDF]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_a_message_is_committed_whole(tmp_path, ingest, workers):
+    mbox_path = write_mbox(tmp_path / "box.mbox", [message("<a@x>", [FIRST_PDF, SECOND_PDF]), message("<b@x>")])
+    run = ingest(workers=workers, commit_every=1)
+    run.run([mbox_path])
+
+    store = LedgerStore(str(tmp_path / "ledger.csv"))
+    transactions = {}
+    for record in store._read_log():
+        transactions.setdefault(record["txn"], []).append(record["row"]["File Name"])
+    assert sorted(sorted(names) for names in transactions.values()) == [sorted([FIRST_PDF, SECOND_PDF]), ["box.mbox#1"]]
+    assert run.partial == {}
+
+
+def test_body_text_is_the_record_without_attachments(tmp_path, ingest):
+    html = "<html><body><p>CSK vs RCB</p><table><tr><td>Quantity</td><td>2</td></tr></table></body></html>"
+    mbox_path = write_mbox(tmp_path / "box.mbox", [message("<html@x>", html=html)])
+    run = ingest()
+    run.run([mbox_path])
+
+    df = LedgerStore(str(tmp_path / "ledger.csv")).read()
+    assert list(df["File Name"]) == ["box.mbox#0"]
+    assert html_to_text(html) == "CSK vs RCB\nQuantity 2"
@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+from extraction_engine import REQUIRED_FIELDS, extract_document, extract_texts
+from text_cache import TextCache
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Two pages; the required fields all resolve on the first
+MULTI_PAGE = os.path.join(REPO, "Invoices", "processed", "Finals Booking Confirmation.pdf")
+
+
+@pytest.fixture
+def pdf_path():
+    if not os.path.exists(MULTI_PAGE):
+        pytest.skip("sample invoice not present")
+    return MULTI_PAGE
+
+
+def extract(pdf_path, cache, required_fields=None, workers=1):
+    return list(extract_texts([pdf_path], workers=workers, cache=cache, required_fields=required_fields))[0]
+
+
+def test_early_stopped_read_is_cached_as_partial(tmp_path, pdf_path):
+    cache = TextCache(str(tmp_path))
+    first = extract(pdf_path, cache, REQUIRED_FIELDS)
+    assert not first["complete"] and len(first["pages"]) < first["page_count"]
+
+    again = extract(pdf_path, cache, REQUIRED_FIELDS)
+    assert again["cached"] and not again["complete"]
+    assert again["text"] == first["text"]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_full_text_caller_finishes_a_partial_read(tmp_path, pdf_path, workers):
+    cache = TextCache(str(tmp_path))
+    extract(pdf_path, cache, REQUIRED_FIELDS)
+
+    full = extract(pdf_path, cache, workers=workers)
+    assert full["complete"] and not full["cached"]
+    assert full["text"] == extract_document(pdf_path)["text"]
+
+    cached = extract(pdf_path, cache)
+    assert cached["cached"] and cached["complete"]
+    assert cached["text"] == full["text"]
+
+
+def test_other_required_fields_resume_the_read(tmp_path, pdf_path):
+    cache = TextCache(str(tmp_path))
+    first = extract(pdf_path, cache, REQUIRED_FIELDS)
+    resumed = extract(pdf_path, cache, ("stand",))
+    assert not resumed["cached"]
+    assert resumed["text"].startswith(first["text"])
+    assert len(resumed["pages"]) > len(first["pages"])
@@ -0,0 +1,93 @@
+import os
+
+import pytest
+
+from extraction_engine import extract_text
+from field_extractor import NORMALIZERS, FieldScanner, extract_fields, field_value, is_fee_invoice
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FEE_INVOICE = """Booking ID 1234
+6th May 24 Sachin T Stand
+Convenience Fee
+Payment total ₹ 61,725.62
+1721.62
+One Thousand Seven Hundred Twenty One Rupees and Sixty Two Paise Only
+Invoice Date: 10 Mar 2024
+CSK vs RCB
+2 Tickets
+"""
+
+
+def values(found):
+    return {field: entry["value"] for field, entry in found.items()}
+
+
+def test_every_field_in_one_pass():
+    assert values(extract_fields(FEE_INVOICE)) == {
+        "quantity": 2,
+        "price": 61725.62,
+        "stand": "Sachin T Stand",
+        "match": "CSK vs RCB",
+        "invoice_date": "2024-03-10",
+    }
+
+
+def test_spans_point_at_the_value():
+    for field, found in extract_fields(FEE_INVOICE).items():
+        start, end = found["span"]
+        assert NORMALIZERS[field](FEE_INVOICE[start:end]) == found["value"], field
+
+
+def test_higher_priority_pattern_wins_over_a_larger_amount():
+    found = extract_fields("Payment Amount: ₹ 1,200.00\nConvenience charges ₹ 5,000.00\n", ["price"])
+    assert found["price"]["value"] == 1200.0
+    assert found["price"]["pattern"] == "payment_amount"
+
+
+def test_largest_value_pattern_keeps_the_largest_amount():
+    found = extract_fields("Base ₹ 800.00\nTax ₹ 144.00\nGrand ₹ 944.00\n", ["price"])
+    assert found["price"]["value"] == 944.0
+
+
+def test_fee_invoice_is_priced_from_its_fee_total():
+    assert is_fee_invoice(FEE_INVOICE)
+    assert is_fee_invoice("", "13.11_big_173_12951.90_fee.pdf")
+    assert field_value(extract_fields(FEE_INVOICE, ["price"], fee=True), "price") == 1721.62
+
+
+@pytest.mark.parametrize("text, stand", [
+    ("6th May 24 Sachin T Stand\n", "Sachin T Stand"),
+    ("Seat\nGARWARE\nSTAND\n", "GARWARE STAND"),
+    ("Section: KMK (TERRACE)\n", "KMK (TERRACE)"),
+    ("STAND\nRow 4\n", None),
+])
+def test_stand_names_are_anchored(text, stand):
+    assert field_value(extract_fields(text, ["stand"]), "stand") == stand
+
+
+def test_feeding_pages_matches_scanning_the_whole_text():
+    pages = FEE_INVOICE.split("Invoice Date")
+    pages[1] = "Invoice Date" + pages[1]
+    scanner = FieldScanner()
+    for page in pages:
+        scanner.feed(page)
+    assert scanner.results() == extract_fields(FEE_INVOICE)
+
+
+def test_scanner_resolves_required_fields():
+    scanner = FieldScanner(["quantity", "match"])
+    scanner.feed("CSK vs RCB\n")
+    assert not scanner.resolved()
+    scanner.feed("2 Tickets\n")
+    assert scanner.resolved()
+
+
+def test_fee_pdf_from_the_repo():
+    pdf_path = os.path.join(REPO, "Invoices", "processed", "10.03_big_530_61725.62_fee.pdf")
+    if not os.path.exists(pdf_path):
+        pytest.skip("sample invoice not present")
+    text = extract_text(pdf_path)
+    fee = is_fee_invoice(text, os.path.basename(pdf_path))
+    assert fee
+    assert field_value(extract_fields(text, ["price"], fee=fee), "price") == 1721.62
@@ -0,0 +1,117 @@
+import asyncio
+import os
+import shutil
+
+import pytest
+
+import batch_process
+import ingest_daemon
+from extraction_engine import _extract_worker
+from ingest_daemon import Debouncer, IngestDaemon
+from ledger_store import LedgerStore
+from text_cache import TextCache
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROCESSED = os.path.join(REPO, "Invoices", "processed")
+INVOICES = ["07.05_JSW_043.pdf", "NNB67M.pdf"]
+
+
+@pytest.fixture
+def inbox(tmp_path, monkeypatch):
+    for name in INVOICES:
+        if not os.path.exists(os.path.join(PROCESSED, name)):
+            pytest.skip("sample invoice not present")
+    inbox = tmp_path / "Invoices"
+    (inbox / "processed").mkdir(parents=True)
+    monkeypatch.setattr(batch_process, "csv_path", str(tmp_path / "ledger.csv"))
+    monkeypatch.setattr(batch_process, "processed_path", str(inbox / "processed"))
+    monkeypatch.setattr(batch_process, "default_journal_path", lambda name: str(tmp_path / f"{name}_journal.jsonl"))
+    monkeypatch.setattr(ingest_daemon, "default_manifest_path", lambda name: str(tmp_path / f"{name}_manifest.json"))
+    return inbox
+
+
+def drop(inbox, name):
+    path = str(inbox / name)
+    shutil.copy(os.path.join(PROCESSED, name), path)
+    return path
+
+
+def ledger_names(inbox):
+    df = LedgerStore(batch_process.csv_path).read()
+    return sorted(df["File Name"]) if len(df) else []
+
+
+def test_debouncer_waits_for_files_to_stop_changing(tmp_path):
+    path = tmp_path / "a.pdf"
+    path.write_bytes(b"partial")
+    debouncer = Debouncer(settle=2.0)
+    debouncer.touch(str(path), 0.0)
+
+    assert debouncer.ready(0.0) == []  # first look only records the size and mtime
+    assert debouncer.ready(1.0) == []
+    path.write_bytes(b"partial, now complete")
+    assert debouncer.ready(2.5) == []  # changed: the timer restarts
+    assert debouncer.ready(4.0) == []
+    assert debouncer.ready(4.5) == [(str(path), 0.0)]
+    assert debouncer.pending == {}
+
+
+def test_debouncer_forgets_files_that_vanish(tmp_path):
+    path = tmp_path / "a.pdf"
+    path.write_bytes(b"x")
+    debouncer = Debouncer(settle=0)
+    debouncer.touch(str(path), 0.0)
+    path.unlink()
+    assert debouncer.ready(1.0) == []
+    assert debouncer.pending == {}
+
+
+def test_commit_groups_finished_files_into_batches(inbox, monkeypatch):
+    daemon = IngestDaemon(str(inbox), workers=1, use_inotify=False)
+    batches = []
+    monkeypatch.setattr(daemon, "commit_batch", lambda batch: batches.append([path for path, _ in batch]))
+
+    async def scenario():
+        done_queue = asyncio.Queue()
+        for number in range(5):
+            done_queue.put_nowait((f"{number}.pdf", None))
+        task = asyncio.create_task(daemon.commit(done_queue, linger=0.05, max_rows=2))
+        await done_queue.join()
+        # Arrives after the linger: a batch of its own
+        await asyncio.sleep(0.1)
+        done_queue.put_nowait(("5.pdf", None))
+        await done_queue.join()
+        task.cancel()
+
+    asyncio.run(scenario())
+    assert batches == [["0.pdf", "1.pdf"], ["2.pdf", "3.pdf"], ["4.pdf"], ["5.pdf"]]
+
+
+def test_commit_batch_journals_rows_and_files_invoices(inbox):
+    good = drop(inbox, INVOICES[0])
+    unreadable = str(inbox / "broken.pdf")
+    with open(unreadable, "wb") as f:
+        f.write(b"not a pdf")
+    daemon = IngestDaemon(str(inbox), workers=1, use_inotify=False)
+    daemon.in_flight.update({good, unreadable})
+    daemon.landed[good] = 0.0
+
+    daemon.commit_batch([(good, _extract_worker(good)), (unreadable, None)])
+    assert ledger_names(inbox) == [INVOICES[0]]
+    assert os.path.exists(inbox / "processed" / INVOICES[0])
+    assert daemon.failed == {unreadable}
+    assert daemon.in_flight == set()
+    assert INVOICES[0] in daemon.known
+    assert not os.path.exists(batch_process.default_journal_path("batch_process"))
+
+
+def test_once_ingests_the_backlog_with_a_shared_cache(inbox, tmp_path):
+    for name in INVOICES:
+        drop(inbox, name)
+    cache = TextCache(str(tmp_path / "cache"))
+    daemon = IngestDaemon(str(inbox), workers=2, settle=0, poll_interval=0.1, use_inotify=False, cache=cache)
+    asyncio.run(daemon.run(once=True))
+
+    assert ledger_names(inbox) == sorted(INVOICES)
+    assert sorted(os.listdir(inbox / "processed")) == sorted(INVOICES)
+    assert cache.misses == len(INVOICES)
@@ -0,0 +1,57 @@
+import os
+import subprocess
+
+import pandas as pd
+import pytest
+
+from invoice_filename import INVOICE_NAME_COLUMNS, parse_invoice_name, parse_invoice_names
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXTENSIONS = ('.pdf', '.png', '.jpg', '.jpeg')
+
+
+def repo_invoice_names():
+    listed = subprocess.run(['git', 'ls-files'], cwd=REPO, capture_output=True, text=True).stdout.splitlines()
+    return sorted({os.path.basename(path) for path in listed if path.lower().endswith(EXTENSIONS)})
+
+
+EDGE_NAMES = [
+    '13.11_big_173_12951.90_fee.pdf',
+    '13.11_big_0173_12951.9_fees2.pdf',
+    '13.11_big_173_12951.90_8.pdf',
+    '2.4_district_x_4_8800.00.pdf',
+    'Invoices/processed/29.05_Big_113.pdf',
+    'Finals Booking Confirmation.pdf',
+    'no_date_at_all.pdf',
+    'a\nb.pdf',
+    '',
+]
+
+
+def as_records(df):
+    return [{column: (None if pd.isna(value) else value) for column, value in zip(INVOICE_NAME_COLUMNS, values)}
+            for values in df[list(INVOICE_NAME_COLUMNS)].itertuples(index=False)]
+
+
+def scalar_records(names):
+    return [{column: getattr(parse_invoice_name(name), column) for column in INVOICE_NAME_COLUMNS} for name in names]
+
+
+def test_repo_has_invoice_names():
+    names = repo_invoice_names()
+    if not names:
+        pytest.skip('not a git checkout')
+    assert len(names) > 100
+
+
+@pytest.mark.parametrize('names', [repo_invoice_names(), EDGE_NAMES], ids=['repo', 'edge'])
+def test_batch_matches_scalar_parser(names):
+    assert as_records(parse_invoice_names(names)) == scalar_records(names)
+
+
+def test_batch_keeps_series_index_and_repeats():
+    names = pd.Series(['13.11_big_173_12951.90_fee.pdf', 'Finals Booking Confirmation.pdf',
+                       '13.11_big_173_12951.90_fee.pdf'], index=[10, 20, 30])
+    parsed = parse_invoice_names(names)
+    assert list(parsed.index) == [10, 20, 30]
+    assert as_records(parsed) == scalar_records(names)
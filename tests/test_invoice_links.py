@@ -0,0 +1,110 @@
+import random
+
+import numpy as np
+import pytest
+
+from invoice_links import InvoiceLinkIndex, MinHasher, normalize_text, shingle_hashes
+
+# Letters only: digits inside words would change the number fingerprint
+VOCABULARY = sorted({"".join(random.Random(number).choices("abcdefghijklmnopqrstuvwxyz", k=6))
+                     for number in range(2000)})
+
+
+def invoice_text(rng, words=300, amount="12951.90"):
+    body = [rng.choice(VOCABULARY) for _ in range(words)]
+    return " ".join(body) + f"\nBooking total Rs {amount}\n"
+
+
+def edit(rng, text, fraction):
+    words = text.split(" ")
+    for position in rng.sample(range(len(words) - 4), int(len(words) * fraction)):
+        words[position] = rng.choice(VOCABULARY)
+    return " ".join(words)
+
+
+def jaccard(first, second):
+    first = set(shingle_hashes(normalize_text(first).split()).tolist())
+    second = set(shingle_hashes(normalize_text(second).split()).tolist())
+    return len(first & second) / len(first | second)
+
+
+def test_minhash_estimates_jaccard_similarity():
+    rng = random.Random(7)
+    hasher = MinHasher(num_perm=256)
+    for fraction in (0.02, 0.1, 0.3):
+        first = invoice_text(rng)
+        second = edit(rng, first, fraction)
+        signatures = [hasher.signature(shingle_hashes(normalize_text(text).split())) for text in (first, second)]
+        estimate = (signatures[0] == signatures[1]).mean()
+        assert abs(estimate - jaccard(first, second)) < 0.1
+
+
+def test_near_duplicates_are_found_and_distinct_invoices_are_not():
+    rng = random.Random(3)
+    index = InvoiceLinkIndex()
+    originals = [invoice_text(rng, amount=f"{1000 + number}.50") for number in range(40)]
+    for number, text in enumerate(originals):
+        index.add(f"original_{number}.pdf", text=text)
+    for number, text in enumerate(originals):
+        index.add(f"rescan_{number}.pdf", text=edit(rng, text, 0.02))
+
+    groups = index.duplicate_groups()
+    assert sorted(groups) == sorted([f"original_{number}.pdf", f"rescan_{number}.pdf"] for number in range(40))
+    canonical, _ = index.resolve()
+    assert all(index._groups.reason[index.file_names.index(f"rescan_{number}.pdf")] == "near" for number in range(40))
+    assert len(set(canonical)) == 40
+
+
+def test_templated_invoices_with_different_numbers_stay_apart():
+    rng = random.Random(5)
+    template = " ".join(rng.choice(VOCABULARY) for _ in range(300))
+    index = InvoiceLinkIndex()
+    index.add("first.pdf", text=template + "\nBooking total Rs 1200.00 Qty 4")
+    index.add("second.pdf", text=template + "\nBooking total Rs 3300.00 Qty 11")
+    assert index.duplicate_groups() == []
+
+
+def test_exact_matches_by_content_text_and_filename():
+    index = InvoiceLinkIndex()
+    index.add("a.pdf", content_hash="abc")
+    index.add("a copy.pdf", content_hash="abc")
+    index.add("b.pdf", text="Booking ID  XY12345\nTotal 100")
+    index.add("b (1).pdf", text="booking id xy12345 total 100")
+    index.add("13.11_big_173_12951.90.pdf")
+    index.add("13.11_big_0173_12951.9_2.pdf")
+    assert sorted(index.duplicate_groups()) == [
+        ["13.11_big_173_12951.90.pdf", "13.11_big_0173_12951.9_2.pdf"],
+        ["a.pdf", "a copy.pdf"],
+        ["b.pdf", "b (1).pdf"],
+    ]
+    assert index.ledger_updates()["a copy.pdf"] == {"Duplicate Of": "a.pdf"}
+
+
+def test_fee_invoices_link_to_a_unique_ticket_invoice():
+    rows = [
+        {"File Name": "13.11_big_173_12951.90.pdf", "Ticket Price": 12951.90},
+        {"File Name": "13.11_big_173_12951.90_fee.pdf", "Ticket Price": 620.0},
+        {"File Name": "02.04_JSW_044.pdf", "Ticket Price": 5000.0},
+        {"File Name": "02.04_JSW_044_x.pdf", "Ticket Price": 120.0, "Event/Match": "Convenience Fee"},
+        # Two ticket invoices share the fee's keys: no link is guessed
+        {"File Name": "05.05_waste_300_900.00.pdf", "Ticket Price": 900.0},
+        {"File Name": "05.05_waste_301_900.00.pdf", "Ticket Price": 900.0},
+        {"File Name": "05.05_waste_900.00_fee.pdf", "Ticket Price": 40.0},
+    ]
+    index = InvoiceLinkIndex.from_rows(rows)
+    assert index.fee_links() == {
+        "13.11_big_173_12951.90_fee.pdf": "13.11_big_173_12951.90.pdf",
+        "02.04_JSW_044_x.pdf": "02.04_JSW_044.pdf",
+    }
+    assert index.ledger_updates()["02.04_JSW_044_x.pdf"] == {"Parent Invoice": "02.04_JSW_044.pdf"}
+    assert "2/3 fee invoices linked" in index.report()
+
+
+def test_bands_must_divide_the_permutations():
+    with pytest.raises(ValueError):
+        InvoiceLinkIndex(num_perm=100, bands=32)
+
+
+def test_empty_text_has_a_sentinel_signature():
+    signature = MinHasher(num_perm=8).signature(shingle_hashes([]))
+    assert signature.dtype == np.uint32 and (signature == np.iinfo(np.uint32).max).all()
@@ -0,0 +1,87 @@
+import os
+import shutil
+
+import pytest
+
+from invoice_manifest import InvoiceManifest
+
+EXTENSIONS = ('.pdf',)
+
+
+@pytest.fixture
+def base(tmp_path):
+    base = tmp_path / 'Invoices'
+    for rel_path in ['x.pdf', 'a/y.pdf', 'a/b/z.pdf', 'c/w.pdf', 'processed/done.pdf']:
+        path = base / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(rel_path)
+    return base
+
+
+def open_manifest(tmp_path, base):
+    return InvoiceManifest(str(tmp_path / 'manifest.json'), str(base))
+
+
+def skip_processed(name):
+    return name == 'processed'
+
+
+def process_all(manifest):
+    changed = manifest.scan(EXTENSIONS, skip_dir=skip_processed)
+    for path in changed:
+        manifest.record(path)
+    manifest.save()
+    return changed
+
+
+def test_second_run_finds_nothing_new(tmp_path, base):
+    assert len(process_all(open_manifest(tmp_path, base))) == 4
+    assert open_manifest(tmp_path, base).scan(EXTENSIONS, skip_dir=skip_processed) == []
+
+
+def test_new_and_rewritten_files_are_found(tmp_path, base):
+    process_all(open_manifest(tmp_path, base))
+    (base / 'a' / 'new.pdf').write_text('new')
+    (base / 'c' / 'w.pdf').write_text('rewritten in place')
+
+    manifest = open_manifest(tmp_path, base)
+    assert manifest.scan(EXTENSIONS, skip_dir=skip_processed) == [str(base / 'a' / 'new.pdf')]
+    assert str(base / 'c' / 'w.pdf') in manifest.scan(EXTENSIONS, skip_dir=skip_processed, verify=True)
+
+
+def test_unrecorded_files_are_found_again(tmp_path, base):
+    manifest = open_manifest(tmp_path, base)
+    changed = manifest.scan(EXTENSIONS, skip_dir=skip_processed)
+    for path in changed[1:]:
+        manifest.record(path)
+    manifest.save()
+    assert open_manifest(tmp_path, base).scan(EXTENSIONS, skip_dir=skip_processed) == changed[:1]
+
+
+def test_removed_directory_prunes_every_entry_below_it(tmp_path, base):
+    process_all(open_manifest(tmp_path, base))
+    shutil.rmtree(base / 'a')
+
+    manifest = open_manifest(tmp_path, base)
+    assert manifest.scan(EXTENSIONS, skip_dir=skip_processed) == []
+    assert sorted(manifest.files) == ['c/w.pdf', 'x.pdf']
+    assert 'a' not in manifest.dirs and 'a/b' not in manifest.dirs
+
+
+def test_renamed_directory_is_rescanned_under_its_new_name(tmp_path, base):
+    process_all(open_manifest(tmp_path, base))
+    os.rename(base / 'a', base / 'd')
+
+    manifest = open_manifest(tmp_path, base)
+    changed = manifest.scan(EXTENSIONS, skip_dir=skip_processed)
+    assert sorted(changed) == [str(base / 'd' / 'b' / 'z.pdf'), str(base / 'd' / 'y.pdf')]
+    assert sorted(manifest.files) == ['c/w.pdf', 'x.pdf']
+
+
+def test_forget_drops_a_moved_file(tmp_path, base):
+    manifest = open_manifest(tmp_path, base)
+    for path in manifest.scan(EXTENSIONS, skip_dir=skip_processed):
+        manifest.record(path)
+    manifest.forget(str(base / 'x.pdf'))
+    manifest.save()
+    assert sorted(open_manifest(tmp_path, base).files) == ['a/b/z.pdf', 'a/y.pdf', 'c/w.pdf']
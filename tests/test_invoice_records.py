@@ -0,0 +1,50 @@
+import math
+
+import pytest
+
+from invoice_records import InvoiceBatch, InvoiceRecord
+
+ROWS = [
+    {"File Name": "a.pdf", "Company": "JSW", "Stand Name": "North", "Ticket Quantity": 2, "Ticket Price": 1200.0,
+     "Confidence %": 90},
+    {"File Name": "b.pdf", "Company": "BookMyShow", "Stand Name": None, "Ticket Quantity": "Not specified",
+     "Ticket Price": None, "Confidence %": None},
+]
+
+
+def test_rows_round_trip():
+    batch = InvoiceBatch.from_rows(ROWS)
+    assert len(batch) == 2
+    assert batch.to_rows() == ROWS
+
+
+def test_to_pandas_decodes_columns():
+    df = InvoiceBatch.from_rows(ROWS).to_pandas()
+    assert list(df.columns) == list(ROWS[0])
+    assert list(df["Company"]) == ["JSW", "BookMyShow"]
+    assert list(df["Company"].cat.categories) == ["BookMyShow", "JSW"]
+    assert df["Stand Name"].isna().tolist() == [False, True]
+    assert df["Ticket Price"].iloc[0] == 1200.0 and math.isnan(df["Ticket Price"].iloc[1])
+    assert df["Confidence %"].iloc[0] == 90 and math.isnan(df["Confidence %"].iloc[1])
+
+
+def test_append_after_export_keeps_the_exported_frame():
+    batch = InvoiceBatch.from_rows(ROWS[:1])
+    df = batch.to_pandas()
+    batch.append(InvoiceRecord("c.pdf", company="JSW", price=300.0, confidence=70))
+    batch.append_row(ROWS[1])
+
+    assert len(batch) == 3
+    assert list(df["Ticket Price"]) == [1200.0]
+    assert list(df["Confidence %"]) == [90]
+    later = batch.to_pandas()
+    assert list(later["File Name"]) == ["a.pdf", "c.pdf", "b.pdf"]
+    assert list(later["Ticket Price"])[:2] == [1200.0, 300.0]
+    assert list(later["Company"]) == ["JSW", "JSW", "BookMyShow"]
+
+
+def test_to_arrow_needs_pyarrow():
+    pytest.importorskip("pyarrow")
+    table = InvoiceBatch.from_rows(ROWS).to_arrow()
+    assert table.column("Company").to_pylist() == ["JSW", "BookMyShow"]
+    assert table.column("Ticket Quantity").to_pylist() == ["2", "Not specified"]
@@ -0,0 +1,31 @@
+import pytest
+
+from ipl_schedule import default_schedule
+
+
+@pytest.fixture
+def schedule():
+    schedule = default_schedule()
+    if len(schedule.fixtures("CSK", "SRH")) < 2:
+        pytest.skip("2024 schedule not present")
+    return schedule
+
+
+@pytest.mark.parametrize("near, date", [
+    ("2024-04-08", "2024-04-07"),  # day after the first meeting
+    ("2024-04-17", "2024-04-07"),  # 10 days after vs 11 before
+    ("2024-04-18", "2024-04-28"),  # 11 days after vs 10 before
+    ("2024-04-28", "2024-04-28"),
+    ("2024-03-01", "2024-04-07"),  # before the season
+    ("2024-06-01", "2024-04-28"),  # after the season
+    (None, "2024-04-07"),
+])
+def test_lookup_picks_the_nearest_meeting(schedule, near, date):
+    assert schedule.lookup("CSK", "SRH", near) == date
+    assert schedule.lookup("SRH", "CSK", near) == date
+
+
+def test_equal_distance_prefers_the_later_fixture(schedule):
+    # Tickets are bought before the match
+    assert [fixture["date"] for fixture in schedule.fixtures("DC", "MI")][:2] == ["2024-03-27", "2024-04-16"]
+    assert schedule.lookup("DC", "MI", "2024-04-06") == "2024-04-16"
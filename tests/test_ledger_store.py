@@ -0,0 +1,99 @@
+import json
+import os
+import shutil
+
+import pytest
+
+from ledger_store import LedgerStore
+
+
+def rows(*names):
+    return [{'File Name': name, 'Ticket Price': 100.0} for name in names]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LedgerStore(str(tmp_path / 'ledger.csv'), compact_every=3)
+
+
+def names(store):
+    return sorted(LedgerStore(store.csv_path).read()['File Name'])
+
+
+def test_uncommitted_tail_is_dropped_on_open(store):
+    store.append_rows(rows('a.pdf'))
+    size = os.path.getsize(store.log_path)
+    with open(store.log_path, 'a') as f:
+        f.write(json.dumps({'op': 'append', 'row': rows('b.pdf')[0], 'txn': 2}) + '\n')
+        f.write('{"txn": 2, "comm')
+
+    reopened = LedgerStore(store.csv_path)
+    assert os.path.getsize(store.log_path) == size
+    assert reopened.pending_ops == 1
+    reopened.append_rows(rows('c.pdf'), tag='next')
+    assert names(store) == ['a.pdf', 'c.pdf']
+    assert reopened.has_tag('next')
+
+
+def test_updates_replay_over_appends(store):
+    store.append_rows(rows('a.pdf', 'b.pdf'))
+    store.update_rows({'b.pdf': {'Ticket Price': 250.0, 'Stand': 'North'}})
+    df = LedgerStore(store.csv_path).read().set_index('File Name')
+    assert df.loc['b.pdf', 'Ticket Price'] == 250.0
+    assert df.loc['b.pdf', 'Stand'] == 'North'
+    assert df.loc['a.pdf', 'Ticket Price'] == 100.0
+
+
+def test_compaction_folds_the_log_into_the_base(store):
+    store.append_rows(rows('a.pdf', 'b.pdf'))
+    assert store.maybe_compact() is None
+    store.append_rows(rows('c.pdf'))
+    assert store.maybe_compact() == 3
+    assert not os.path.exists(store.log_path)
+    assert not os.path.exists(store.log_path + '.compacting')
+    assert names(store) == ['a.pdf', 'b.pdf', 'c.pdf']
+    assert store.keys() == {'a.pdf', 'b.pdf', 'c.pdf'}
+
+
+def test_crash_before_the_new_base_is_written_folds_on_open(store):
+    store.append_rows(rows('a.pdf'))
+    store.compact()
+    store.append_rows(rows('b.pdf'))
+    compacting_path = store.log_path + '.compacting'
+    # Crash right after the log was set aside
+    os.replace(store.log_path, compacting_path)
+    os.utime(store.csv_path, (0, 0))
+
+    assert names(store) == ['a.pdf', 'b.pdf']
+    assert not os.path.exists(compacting_path)
+
+
+def test_crash_after_the_new_base_is_written_does_not_replay_the_log(store):
+    store.append_rows(rows('a.pdf', 'b.pdf'))
+    compacting_path = store.log_path + '.compacting'
+    shutil.copy(store.log_path, compacting_path + '.saved')
+    store.compact()
+    # Crash after the base was replaced but before the set-aside log was removed
+    os.replace(compacting_path + '.saved', compacting_path)
+    stat = os.stat(store.csv_path)
+    os.utime(compacting_path, ns=(stat.st_atime_ns, stat.st_mtime_ns - 1_000_000_000))
+
+    assert names(store) == ['a.pdf', 'b.pdf']
+    assert not os.path.exists(compacting_path)
+
+
+def test_int_update_into_a_mixed_string_column(tmp_path):
+    csv_path = str(tmp_path / 'ledger.csv')
+    with open(csv_path, 'w') as f:
+        f.write('File Name,Ticket Quantity,Ticket Price\na.pdf,Not specified,100.0\nb.pdf,2,200.0\n')
+    store = LedgerStore(csv_path)
+    store.update_rows({'a.pdf': {'Ticket Quantity': 4, 'Ticket Price': 'Various'}})
+
+    reopened = LedgerStore(csv_path)
+    df = reopened.read().set_index('File Name')
+    assert df.loc['a.pdf', 'Ticket Quantity'] == 4
+    assert df.loc['a.pdf', 'Ticket Price'] == 'Various'
+    assert str(df.loc['b.pdf', 'Ticket Quantity']) == '2'
+    assert reopened.keys() == {'a.pdf', 'b.pdf'}
+    assert reopened.compact() == 2
+    assert names(reopened) == ['a.pdf', 'b.pdf']
@@ -0,0 +1,146 @@
+import subprocess
+import threading
+import time
+
+import pytest
+from PIL import Image
+
+import ocr_service
+from ocr_service import PAGE_SEPARATOR, CLIBackend, OCRService
+
+
+class FakeTesseract:
+    """Stands in for the tesseract binary: each image's text is its width"""
+
+    def __init__(self, unreadable_width=None):
+        self.unreadable_width = unreadable_width
+        self.runs = []
+
+    def __call__(self, command, capture_output, text, env):
+        with open(command[1]) as f:
+            paths = f.read().split()
+        widths = []
+        for path in paths:
+            with Image.open(path) as image:
+                widths.append(image.width)
+        psm = command[command.index('--psm') + 1]
+        self.runs.append((psm, widths))
+        pages = [f"width {width}" for width in widths if len(widths) == 1 or width != self.unreadable_width]
+        return subprocess.CompletedProcess(command, 0, stdout=PAGE_SEPARATOR.join(pages) + PAGE_SEPARATOR)
+
+
+def images(*widths, psm=6):
+    return [(Image.new("L", (width, 10), 255), psm) for width in widths]
+
+
+def test_cli_backend_batches_each_psm_into_one_run(monkeypatch):
+    tesseract = FakeTesseract()
+    monkeypatch.setattr(ocr_service.subprocess, "run", tesseract)
+    texts = CLIBackend().recognize(images(11, 12, psm=6) + images(13, psm=4) + images(14, psm=6))
+    assert texts == ["width 11", "width 12", "width 13", "width 14"]
+    assert sorted(tesseract.runs) == [("4", [13]), ("6", [11, 12, 14])]
+
+
+def test_cli_backend_retries_singly_when_separators_do_not_line_up(monkeypatch):
+    tesseract = FakeTesseract(unreadable_width=12)
+    monkeypatch.setattr(ocr_service.subprocess, "run", tesseract)
+    texts = CLIBackend().recognize(images(11, 12, 13))
+    assert texts == ["width 11", "width 12", "width 13"]
+    assert tesseract.runs == [("6", [11, 12, 13]), ("6", [11]), ("6", [12]), ("6", [13])]
+
+
+class RecordingBackend:
+    name = "recording"
+
+    def __init__(self, gate=None, fail_on=None):
+        self.gate = gate
+        self.fail_on = fail_on
+        self.batches = []
+        self.closed = 0
+        self.lock = threading.Lock()
+
+    def recognize(self, prepared):
+        if self.gate is not None:
+            self.gate.wait()
+        with self.lock:
+            self.batches.append(list(prepared))
+        if self.fail_on in prepared:
+            raise RuntimeError("engine crashed")
+        return [f"text of {path}" for path in prepared]
+
+    def close(self):
+        with self.lock:
+            self.closed += 1
+
+
+@pytest.fixture(autouse=True)
+def no_preprocessing(monkeypatch):
+    def prepare(path, vendor=None):
+        if path == "corrupt.png":
+            raise OSError("cannot identify image file")
+        return path
+    monkeypatch.setattr(ocr_service, "prepare_image", prepare)
+
+
+def test_close_drains_queued_jobs():
+    backend = RecordingBackend()
+    service = OCRService(workers=2, batch_size=4, linger=0.01, backend=backend)
+    futures = [service.submit(f"{number}.png") for number in range(30)]
+    service.close()
+
+    assert all(future.done() for future in futures)
+    assert [future.result() for future in futures] == [f"text of {number}.png" for number in range(30)]
+    assert backend.closed == 2
+    with pytest.raises(RuntimeError):
+        service.submit("late.png")
+
+
+def test_queued_images_are_batched_up_to_batch_size():
+    gate = threading.Event()
+    backend = RecordingBackend(gate=gate)
+    service = OCRService(workers=1, batch_size=4, linger=0.5, max_queue=20, backend=backend)
+    futures = [service.submit(f"{number}.png") for number in range(9)]
+    gate.set()
+    service.close()
+
+    assert [future.result() for future in futures] == [f"text of {number}.png" for number in range(9)]
+    assert all(len(batch) <= 4 for batch in backend.batches)
+    assert len(backend.batches) <= 4
+    assert service.stats.batches == len(backend.batches)
+
+
+def test_submit_blocks_while_the_queue_is_full():
+    gate = threading.Event()
+    service = OCRService(workers=1, batch_size=1, linger=0, max_queue=2, backend=RecordingBackend(gate=gate))
+    submitted = []
+
+    def producer():
+        for number in range(6):
+            submitted.append(service.submit(f"{number}.png"))
+
+    thread = threading.Thread(target=producer)
+    thread.start()
+    time.sleep(0.3)
+    # One image in the blocked worker, two queued, the producer waiting on the fourth
+    assert len(submitted) == 3
+    gate.set()
+    thread.join(timeout=5)
+    service.close()
+    assert [future.result() for future in submitted] == [f"text of {number}.png" for number in range(6)]
+
+
+def test_failures_stay_with_their_images():
+    service = OCRService(workers=1, batch_size=8, linger=0.2, backend=RecordingBackend(fail_on="bad.png"))
+    corrupt = service.submit("corrupt.png")
+    fine = service.submit("fine.png")
+    service.close()
+    with pytest.raises(OSError):
+        corrupt.result()
+    assert fine.result() == "text of fine.png"
+
+    service = OCRService(workers=1, batch_size=8, linger=0.2, backend=RecordingBackend(fail_on="bad.png"))
+    batch = [service.submit("bad.png"), service.submit("other.png")]
+    service.close()
+    for future in batch:
+        with pytest.raises(RuntimeError):
+            future.result()
@@ -0,0 +1,65 @@
+import os
+import threading
+import time
+
+from text_cache import TextCache
+
+
+def entry(text):
+    return {"text": text, "pages": [{"page": 1, "chars": len(text), "source": "text"}], "complete": True}
+
+
+def test_round_trip_and_counters(tmp_path):
+    cache = TextCache(str(tmp_path))
+    assert cache.get("missing-1") is None
+    cache.put("abc-1", entry("hello"))
+    assert cache.get("abc-1") == entry("hello")
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_keys_follow_content_and_extractor_version(tmp_path):
+    cache = TextCache(str(tmp_path))
+    path = tmp_path / "invoice.pdf"
+    path.write_bytes(b"%PDF-1.4 invoice")
+    key = cache.key_for(str(path), "3")
+    assert key == cache.key_for_bytes(b"%PDF-1.4 invoice", "3")
+    assert key != cache.key_for(str(path), "4")
+    path.write_bytes(b"%PDF-1.4 changed")
+    assert key != cache.key_for(str(path), "3")
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = TextCache(str(tmp_path), max_bytes=10_000)
+    for number in range(3):
+        cache.put(f"k{number}-1", entry("x" * 3000))
+        past = time.time() - 100 + number
+        os.utime(cache._entry_path(f"k{number}-1"), (past, past))
+    # Reading k0 makes k1 the least recently used entry
+    assert cache.get("k0-1") is not None
+
+    reopened = TextCache(str(tmp_path), max_bytes=10_000)
+    reopened.put("k3-1", entry("x" * 3000))
+    assert reopened.evictions == 1
+    assert reopened.get("k1-1") is None
+    assert all(reopened.get(key) is not None for key in ("k0-1", "k2-1", "k3-1"))
+
+
+def test_concurrent_puts_keep_the_size_accounting(tmp_path):
+    cache = TextCache(str(tmp_path), max_bytes=50_000)
+
+    def writer(prefix):
+        for number in range(200):
+            cache.put(f"{prefix}{number:03d}-1", entry("x" * 1000))
+            cache.get(f"{prefix}{number // 2:03d}-1")
+
+    threads = [threading.Thread(target=writer, args=(f"t{thread}",)) for thread in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    on_disk = {name[:-5]: os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(str(tmp_path)) for name in names if name.endswith('.json')}
+    assert cache._index.keys() == on_disk.keys()
+    assert cache._total_bytes == sum(on_disk.values()) <= cache.max_bytes
+    assert cache.evictions == 8 * 200 - len(on_disk)
@@ -0,0 +1,94 @@
+import os
+
+import pytest
+
+from vendor_parsers import (FIRST_PAGE_CHARS, REGISTRY, KeywordAutomaton, VendorParser, VendorRegistry,
+                            company_for)
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def registry(*parsers):
+    vendors = VendorRegistry()
+    for parser in parsers:
+        vendors.register(parser)
+    return vendors
+
+
+def test_automaton_finds_overlapping_keywords():
+    automaton = KeywordAutomaton([(word, word) for word in ("he", "she", "his", "hers")])
+    assert sorted(automaton.iter("ushers")) == [(3, "he"), (3, "she"), (5, "hers")]
+
+
+def test_automaton_agrees_with_a_naive_search():
+    keywords = ["big", "bigtree", "tree", "ticket", "ticketgenie", "genie", "ee"]
+    text = "bigtree ticketgenie treetop big_tree eerie bigbig"
+    expected = sorted((start + len(word) - 1, word) for word in keywords
+                      for start in range(len(text)) if text.startswith(word, start))
+    assert sorted(KeywordAutomaton([(word, word) for word in keywords]).iter(text)) == expected
+
+
+def test_earlier_registration_wins_a_tie():
+    first = VendorParser("First", filename_tokens=["shared"], text_markers=["shared marker"])
+    second = VendorParser("Second", filename_tokens=["shared"], text_markers=["shared marker"])
+    assert registry(first, second).company("01.04_shared_12.pdf") == "First"
+    assert registry(second, first).company("01.04_shared_12.pdf") == "Second"
+    assert registry(second, first).company(text="Issued by Shared Marker Ltd") == "Second"
+
+
+def test_text_markers_beat_filename_tokens_and_registration_order():
+    first = VendorParser("First", filename_tokens=["alpha"])
+    second = VendorParser("Second", text_markers=["beta corp"])
+    found = registry(first, second).match("01.04_alpha_12.pdf", "Invoice from Beta Corp")
+    assert (found["parser"].name, found["source"], found["keyword"]) == ("Second", "text", "beta corp")
+
+
+@pytest.mark.parametrize("filename, company", [
+    ("13.11_big_173_12951.90_fee.pdf", "BookMyShow"),
+    ("13.11-BIG-173.pdf", "BookMyShow"),
+    ("bigger_invoice.pdf", "Unknown"),
+    ("walkthrough.pdf", "Unknown"),
+    ("07.05_JSW_043.pdf", "JSW GMR"),
+    ("15.03_Waste_3283.20_404_8.pdf", "Paytm Insider"),
+])
+def test_filename_tokens_count_only_as_whole_words(filename, company):
+    assert company_for(filename) == company
+
+
+def test_keywords_only_match_in_their_own_source():
+    # A filename token in the text, or a text-only marker in the filename, identifies nobody
+    assert company_for("invoice.pdf", "jsw") == "Unknown"
+    assert company_for("irelia sports.pdf") == "Unknown"
+    assert company_for("invoice.pdf", "Irelia Sports Pvt Ltd") == "Irelia Sports"
+
+
+def test_bigshare_text_overrides_the_big_filename_token():
+    assert company_for("29.05_Big_113.pdf") == "BookMyShow"
+    assert company_for("29.05_Big_113.pdf", "BIGSHARE SERVICES PVT. LTD.") == "Bigshare Services"
+
+
+def test_text_markers_are_read_from_the_first_page_only():
+    late = "x" * FIRST_PAGE_CHARS + " Irelia Sports"
+    assert company_for("invoice.pdf", late) == "Unknown"
+
+
+def test_registering_a_vendor_rebuilds_the_index():
+    vendors = registry(VendorParser("First", filename_tokens=["alpha"]))
+    assert vendors.company("alpha.pdf") == "First"
+    vendors.register(VendorParser("Second", filename_tokens=["gamma"]))
+    assert vendors.company("gamma.pdf") == "Second"
+
+
+def test_vendor_patterns_come_first_then_generic_ones():
+    pdf_path = os.path.join(REPO, "Invoices", "processed", "07.05_JSW_043.pdf")
+    if not os.path.exists(pdf_path):
+        pytest.skip("sample invoice not present")
+    from extraction_engine import extract_text
+    from field_extractor import extract_fields
+    text = extract_text(pdf_path)
+    company, found = REGISTRY.parse(text, os.path.basename(pdf_path))
+    assert company == "JSW GMR"
+    assert (found["quantity"]["value"], found["quantity"]["pattern"]) == (14, "oth")
+    assert extract_fields(text)["quantity"]["value"] != 14
+    # JSW lists no date patterns: the generic ones fill it in
+    assert found["invoice_date"]["value"] == "2024-05-10"
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Content-addressed on-disk cache for extracted invoice text
+Entries are keyed by file content hash plus extractor version, so re-runs
+over unchanged invoices skip PDF parsing and OCR entirely
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.invoice_cache', 'text')
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+def hash_file(file_path, chunk_size=1024 * 1024):
+    """Return the SHA-256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class TextCache:
+    """
+    Size-bounded LRU cache of extraction results stored as JSON files.
+
+    Safe to share between threads (e.g. the ingest daemon's executor):
+    counters, the size index and eviction are guarded by one lock, while
+    entry files are read and written outside it.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._index = None
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def key_for(self, file_path, extractor_version):
+        """Build the cache key for a file's current contents"""
+        return f"{hash_file(file_path)}-{extractor_version}"
+
+    def key_for_bytes(self, data, extractor_version):
+        """Cache key for an in-memory document; matches key_for on the same bytes"""
+        return f"{hashlib.sha256(data).hexdigest()}-{extractor_version}"
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + '.json')
+
+    def _load_index(self):
+        """Scan the cache directory once to learn entry sizes and access times (caller holds the lock)"""
+        if self._index is not None:
+            return
+        self._index = {}
+        self._total_bytes = 0
+        if not os.path.isdir(self.cache_dir):
+            return
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith('.json'):
+                    stat = entry.stat()
+                    self._index[entry.name[:-5]] = (stat.st_size, stat.st_mtime)
+                    self._total_bytes += stat.st_size
+
+    def get(self, key):
+        """Return the cached result for key, or None on a miss"""
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, 'r', encoding='utf-8') as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        # Touch the entry so eviction treats it as recently used
+        with self._lock:
+            try:
+                os.utime(entry_path)
+                if self._index is not None and key in self._index:
+                    self._index[key] = (self._index[key][0], os.path.getmtime(entry_path))
+            except OSError:
+                pass
+            self.hits += 1
+        return result
+
+    def put(self, key, result):
+        """Store a result atomically, evicting least recently used entries if over budget"""
+        entry_path = self._entry_path(key)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(entry_path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False)
+            os.replace(tmp_path, entry_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        with self._lock:
+            self._load_index()
+            if key in self._index:
+                self._total_bytes -= self._index[key][0]
+            try:
+                stat = os.stat(entry_path)
+            except OSError:
+                # Already evicted by a concurrent put that indexed it first
+                self._index.pop(key, None)
+                return
+            self._index[key] = (stat.st_size, stat.st_mtime)
+            self._total_bytes += stat.st_size
+            self._evict(keep=key)
+
+    def _evict(self, keep=None):
+        """Drop oldest entries until the cache fits in max_bytes (caller holds the lock)"""
+        if self._total_bytes <= self.max_bytes:
+            return
+        for key, (size, _) in sorted(self._index.items(), key=lambda item: item[1][1]):
+            if self._total_bytes <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            try:
+                os.remove(self._entry_path(key))
+            except OSError:
+                pass
+            del self._index[key]
+            self._total_bytes -= size
+            self.evictions += 1
+
+    def report(self):
+        """Return a printable hit/miss summary"""
+        lookups = self.hits + self.misses
+        hit_rate = self.hits / lookups * 100 if lookups else 0.0
+        return (f"  cache: {self.hits} hits, {self.misses} misses ({hit_rate:.1f}% hit rate), "
+                f"{self.evictions} evictions")
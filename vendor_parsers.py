@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Vendor parser registry with single-pass dispatch
+Every vendor registers the filename tokens and text markers that identify
+it, the field patterns its invoices actually use and its OCR settings.
+Dispatch runs one Aho-Corasick automaton over the filename and the start
+of the text, so detection costs one pass however many vendors exist, and
+only the matched vendor's patterns are run on the document
+"""
+
+from collections import deque
+
+from field_extractor import FIELDS, extract_fields, is_fee_invoice
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# Vendor markers sit in the header; scanning the first page is enough
+FIRST_PAGE_CHARS = 4000
+UNKNOWN = 'Unknown'
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton over lower-case keywords (pure Python fallback)"""
+
+    def __init__(self, keywords):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for keyword, value in keywords:
+            state = 0
+            for char in keyword:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                state = next_state
+            self.output[state].append(value)
+        # Breadth-first failure links; outputs are merged along them
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                if self.fail[next_state] == next_state:
+                    self.fail[next_state] = 0
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def iter(self, text):
+        """Yield (end index, value) for every keyword occurrence in text"""
+        goto = self.goto
+        fail = self.fail
+        output = self.output
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for value in output[state]:
+                yield index, value
+
+def build_automaton(keywords):
+    """Use pyahocorasick when installed, else the pure Python automaton"""
+    if ahocorasick is None:
+        return KeywordAutomaton(keywords)
+    grouped = {}
+    for keyword, value in keywords:
+        grouped.setdefault(keyword, []).append(value)
+    automaton = ahocorasick.Automaton()
+    for keyword, values in grouped.items():
+        automaton.add_word(keyword, values)
+    automaton.make_automaton()
+    return _PyAhoCorasick(automaton)
+
+class _PyAhoCorasick:
+    def __init__(self, automaton):
+        self.automaton = automaton
+
+    def iter(self, text):
+        for end, values in self.automaton.iter(text):
+            for value in values:
+                yield end, value
+
+class VendorParser:
+    """
+    One invoice vendor.
+
+    patterns maps a field to the pattern names (see field_extractor) its
+    layout uses, in priority order; fields not listed, or not found with
+    the vendor patterns, fall back to the generic set.
+    """
+
+    def __init__(self, name, filename_tokens=(), text_markers=(), patterns=None, ocr_psm=None):
+        self.name = name
+        self.filename_tokens = tuple(token.lower() for token in filename_tokens)
+        self.text_markers = tuple(marker.lower() for marker in text_markers)
+        self.patterns = patterns or {}
+        self.ocr_psm = ocr_psm
+        # Hashable form for field_extractor.compile_fields
+        self.allowed = frozenset((field, name) for field, names in self.patterns.items() for name in names)
+
+    def parse(self, text, fields=FIELDS, fee=False):
+        """
+        Extract fields with this vendor's patterns, then generically for any
+        still missing; fee limits price to the fee total (see is_fee_invoice).
+        """
+        fields = tuple(fields)
+        vendor_fields = tuple(field for field in fields if field in self.patterns)
+        found = extract_fields(text, fields=vendor_fields, patterns=self.allowed, fee=fee) if vendor_fields else {}
+        missing = tuple(field for field in fields if field not in found)
+        if missing:
+            found.update(extract_fields(text, fields=missing, fee=fee))
+        return found
+
+def _whole_word(text, start, end):
+    """True when text[start:end] is not part of a longer run of letters"""
+    return not (start > 0 and text[start - 1].isalpha()) and not (end < len(text) and text[end].isalpha())
+
+class VendorRegistry:
+    """Ordered vendor parsers; earlier registrations win ties"""
+
+    def __init__(self):
+        self.parsers = []
+        self._automaton = None
+
+    def register(self, parser):
+        self.parsers.append(parser)
+        self._automaton = None
+        return parser
+
+    def get(self, name):
+        for parser in self.parsers:
+            if parser.name == name:
+                return parser
+        return None
+
+    def _index(self):
+        if self._automaton is None:
+            keywords = []
+            for priority, parser in enumerate(self.parsers):
+                keywords += [(token, (priority, 'filename', token)) for token in parser.filename_tokens]
+                keywords += [(marker, (priority, 'text', marker)) for marker in parser.text_markers]
+            self._automaton = build_automaton(keywords)
+        return self._automaton
+
+    def match(self, filename=None, text=None):
+        """
+        Identify the vendor from a filename and/or document text in one pass.
+
+        Text markers beat filename tokens (the document names its issuer;
+        filenames are hand-typed); within a source the earlier vendor wins.
+        Filename tokens only count as whole words ('big' is not in
+        'bigger'). Returns {'parser', 'keyword', 'source'} or None.
+        """
+        filename = (filename or '').lower()
+        text = (text or '')[:FIRST_PAGE_CHARS].lower()
+        # One scan over both; positions tell which part a keyword ended in
+        haystack = filename + '\0' + text
+        boundary = len(filename)
+        best = None
+        for end, (priority, source, keyword) in self._index().iter(haystack):
+            in_filename = end < boundary
+            if (source == 'filename') != in_filename:
+                continue
+            if in_filename and not _whole_word(filename, end - len(keyword) + 1, end + 1):
+                continue
+            rank = (0 if source == 'text' else 1, priority)
+            if best is None or rank < best[0]:
+                best = (rank, keyword, source)
+        if best is None:
+            return None
+        return {'parser': self.parsers[best[0][1]], 'keyword': best[1], 'source': best[2]}
+
+    def detect(self, filename=None, text=None):
+        """Matched VendorParser, or None"""
+        found = self.match(filename, text)
+        return found['parser'] if found else None
+
+    def company(self, filename=None, text=None):
+        """Vendor name, or 'Unknown'"""
+        parser = self.detect(filename, text)
+        return parser.name if parser else UNKNOWN
+
+    def parse(self, text, filename=None, fields=FIELDS, fee=None):
+        """
+        Return (vendor name, extracted fields) using the matched vendor's
+        parser; fee defaults to is_fee_invoice(text, filename).
+        """
+        parser = self.detect(filename, text)
+        fee = is_fee_invoice(text, filename) if fee is None else fee
+        if parser is None:
+            return UNKNOWN, extract_fields(text, fields=fields, fee=fee)
+        return parser.name, parser.parse(text, fields, fee)
+
+REGISTRY = VendorRegistry()
+
+def register(parser):
+    """Add a vendor parser to the default registry"""
+    return REGISTRY.register(parser)
+
+register(VendorParser(
+    'BookMyShow',
+    filename_tokens=['bms', 'bookmyshow', 'bigtree', 'big_tree', 'big'],
+    text_markers=['bookmyshow', 'bigtree', 'big tree entertainment'],
+    patterns={'price': ['amount_paid', 'rupee', 'total'], 'quantity': ['no_of_tickets', 'tickets', 'quantity']},
+    ocr_psm=4))
+register(VendorParser(
+    'Paytm Insider',
+    filename_tokens=['waste', 'wasteland', 'insider', 'paytm'],
+    text_markers=['paytm', 'insider.in', 'paytm insider', 'wasteland', 'orbgen'],
+    patterns={'price': ['payment_amount', 'rupee', 'total'], 'quantity': ['tickets', 'quantity'],
+              'invoice_date': ['date_of_issue', 'day_month_year']},
+    ocr_psm=4))
+register(VendorParser(
+    'TicketGenie',
+    filename_tokens=['ticketgenie', 'genie', 'ticket'],
+    text_markers=['ticketgenie', 'ticket genie'],
+    patterns={'price': ['inr', 'rupee', 'total'], 'quantity': ['quantity', 'tickets', 'qty']},
+    ocr_psm=6))
+register(VendorParser(
+    'JSW GMR',
+    filename_tokens=['jsw', 'gmr'],
+    text_markers=['jsw gmr'],
+    patterns={'price': ['rs', 'inr', 'total', 'amount'], 'quantity': ['nos', 'ea', 'oth', 'quantity']},
+    ocr_psm=6))
+register(VendorParser('KPH Dream Sports', filename_tokens=['kph', 'dream'], text_markers=['kph dream']))
+register(VendorParser('Omio', filename_tokens=['omio'], text_markers=['omio']))
+register(VendorParser('Ticombo', filename_tokens=['ticombo'], text_markers=['ticombo']))
+register(VendorParser('Irelia Sports', text_markers=['irelia sports']))
+# Its invoices are filed as '..._Big_...' too; the text marker tells them from BookMyShow
+register(VendorParser('Bigshare Services', text_markers=['bigshare services']))
+register(VendorParser('Chelsea FC', filename_tokens=['chelsea'], text_markers=['chelsea']))
+register(VendorParser('Football Platform', filename_tokens=['football'], text_markers=['football']))
+register(VendorParser('Walk-in/Box Office', filename_tokens=['walk']))
+register(VendorParser('Dadabhai', filename_tokens=['dadabhai', 'inv2405']))
+
+def detect_vendor(filename=None, text=None):
+    return REGISTRY.detect(filename, text)
+
+def company_for(filename=None, text=None):
+    return REGISTRY.company(filename, text)